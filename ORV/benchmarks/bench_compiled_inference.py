@@ -0,0 +1,67 @@
+"""
+Compares per-call latency of Model.predict with the traced CompiledPredictor.
+
+Runs offline: the model is a randomly initialized VGG16 with the same
+input/output signature as build_vggface_classifier, so no VGGFace weights
+are downloaded.
+
+Usage (from ORV/):
+    python -m benchmarks.bench_compiled_inference --iterations 50 --batch-sizes 1 4 16
+"""
+import argparse
+import json
+import time
+import numpy as np
+import tensorflow as tf
+
+from src.ai.compiled_inference import CompiledPredictor, DEFAULT_BATCH_BUCKETS
+from benchmarks.fixtures import build_standin_classifier
+
+
+def time_calls(fn, batch, iterations, warmup=3):
+    for _ in range(warmup):
+        fn(batch)
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn(batch)
+        latencies.append((time.perf_counter() - start) * 1000.0)
+    latencies = np.array(latencies)
+    return {
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p90_ms": float(np.percentile(latencies, 90)),
+        "mean_ms": float(latencies.mean()),
+    }
+
+
+def run(iterations, batch_sizes):
+    model = build_standin_classifier()
+    predictor = CompiledPredictor(model, DEFAULT_BATCH_BUCKETS)
+    results = []
+    for batch_size in batch_sizes:
+        batch = np.random.uniform(-128, 128, size=(batch_size, 224, 224, 3)).astype(np.float32)
+        before = time_calls(lambda b: model.predict(b, verbose=0), batch, iterations)
+        after = time_calls(predictor, batch, iterations)
+        results.append({
+            "batch_size": batch_size,
+            "model_predict": before,
+            "compiled": after,
+            "speedup_p50": before["p50_ms"] / after["p50_ms"],
+        })
+        print(f"batch={batch_size:>3}  Model.predict p50={before['p50_ms']:8.2f} ms  "
+              f"compiled p50={after['p50_ms']:8.2f} ms  speedup={results[-1]['speedup_p50']:.2f}x")
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=30)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--output', help="Optional path of a JSON file for the results.")
+    args = parser.parse_args()
+
+    print(f"TensorFlow {tf.__version__}")
+    benchmark_results = run(args.iterations, args.batch_sizes)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"benchmark": "compiled_inference", "results": benchmark_results}, f, indent=2)
@@ -0,0 +1,77 @@
+"""
+Compares full-resolution JPEG decode + resize with the reduced-resolution decode path.
+
+Images are synthetic (smooth gradients plus noise) JPEGs at typical phone-camera
+resolutions, encoded in memory, so the benchmark needs no dataset.
+
+Usage (from ORV/):
+    python -m benchmarks.bench_decode --iterations 20 --resolutions 1280x720 1920x1080 4000x3000
+"""
+import argparse
+import json
+import time
+import cv2 as cv
+import numpy as np
+
+from src.ai.image_decoding import decode_image_for_size
+from benchmarks.fixtures import make_synthetic_jpeg
+
+
+def full_decode(image_bytes, target_size):
+    img = cv.imdecode(np.frombuffer(image_bytes, np.uint8), cv.IMREAD_COLOR)
+    return cv.resize(img, target_size)
+
+
+def reduced_decode(image_bytes, target_size):
+    return cv.resize(decode_image_for_size(image_bytes, target_size), target_size)
+
+
+def time_calls(fn, image_bytes, target_size, iterations, warmup=2):
+    for _ in range(warmup):
+        fn(image_bytes, target_size)
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn(image_bytes, target_size)
+        latencies.append((time.perf_counter() - start) * 1000.0)
+    return float(np.percentile(latencies, 50))
+
+
+def run(iterations, resolutions, target_size=(224, 224)):
+    results = []
+    for width, height in resolutions:
+        image_bytes = make_synthetic_jpeg(width, height)
+        megapixels = width * height / 1e6
+        before = time_calls(full_decode, image_bytes, target_size, iterations)
+        after = time_calls(reduced_decode, image_bytes, target_size, iterations)
+        results.append({
+            "resolution": f"{width}x{height}",
+            "jpeg_bytes": len(image_bytes),
+            "full_decode_p50_ms": before,
+            "reduced_decode_p50_ms": after,
+            "full_decode_ms_per_mp": before / megapixels,
+            "reduced_decode_ms_per_mp": after / megapixels,
+            "speedup_p50": before / after,
+        })
+        print(f"{width:>5}x{height:<5} full={before:7.2f} ms ({before / megapixels:6.2f} ms/MP)  "
+              f"reduced={after:7.2f} ms ({after / megapixels:6.2f} ms/MP)  speedup={before / after:.2f}x")
+    return results
+
+
+def parse_resolution(value):
+    width, height = value.lower().split('x')
+    return int(width), int(height)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--resolutions', type=parse_resolution, nargs='+',
+                        default=[(640, 480), (1280, 720), (1920, 1080), (4000, 3000)])
+    parser.add_argument('--output', help="Optional path of a JSON file for the results.")
+    args = parser.parse_args()
+
+    benchmark_results = run(args.iterations, args.resolutions)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"benchmark": "decode", "results": benchmark_results}, f, indent=2)
@@ -0,0 +1,245 @@
+"""
+Benchmark suite for the verification and data-loading hot paths.
+
+Everything runs offline in a temporary directory: inputs are synthetic JPEGs
+and the per-user model is a tiny stand-in with the input/output signature of
+build_vggface_classifier. Face cropping is disabled because synthetic frames
+contain no faces.
+
+Benchmarks:
+    verify    verify_user_with_image end to end, cold (empty model cache) and warm
+    sequence  FacesSequence.__getitem__ batches/sec, with and without augment=True
+    augment   apply_offline_augmentations images/sec
+    split     split_user_images_for_training files/sec
+
+Usage (from ORV/):
+    python -m benchmarks.bench_hot_paths --output results.json
+    python -m benchmarks.bench_hot_paths --only split augment --resolutions 1280x720
+
+Compare two result files with --compare OLD.json NEW.json.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import platform
+import subprocess
+import logging
+import numpy as np
+
+from benchmarks.fixtures import make_synthetic_jpeg, write_synthetic_images, build_tiny_classifier
+
+BENCHMARKS = ('verify', 'sequence', 'augment', 'split')
+USER_ID = "bench_user"
+
+logger = logging.getLogger("benchmarks")
+
+
+def _percentiles(latencies_ms):
+    latencies_ms = np.asarray(latencies_ms)
+    return {
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p90_ms": float(np.percentile(latencies_ms, 90)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+        "mean_ms": float(latencies_ms.mean()),
+    }
+
+
+def _bench_app_config(work_dir):
+    import config
+    app_config = {name: getattr(config, name) for name in dir(config) if name.isupper()}
+    app_config.update({
+        'DATA_DIR': os.path.join(work_dir, 'data'),
+        'MODELS_DIR': os.path.join(work_dir, 'models'),
+        'AI_VERIFICATION_MODE': 'classifier',
+        'AI_INFERENCE_BACKEND': 'keras',
+        'AI_FACE_CROP_ENABLED': False,
+        'AI_INFERENCE_POOL_PROCESSES': 0,
+        'OFFLINE_AUG_PROBABILITY': 1.0,
+    })
+    return app_config
+
+
+# --- Benchmarks ---
+def bench_verify(work_dir, app_config, resolutions, iterations):
+    from src.ai.model_cache import get_model_cache
+    from src.ai.verification_manager import verify_user_with_image
+
+    model_dir = os.path.join(app_config['MODELS_DIR'], USER_ID)
+    os.makedirs(model_dir, exist_ok=True)
+    build_tiny_classifier().save(os.path.join(model_dir, app_config['AI_BEST_MODEL_FILENAME']))
+
+    results = []
+    for width, height in resolutions:
+        image_bytes = make_synthetic_jpeg(width, height)
+
+        cold = []
+        for _ in range(max(1, iterations // 10)):
+            get_model_cache(app_config).clear()
+            start = time.perf_counter()
+            verify_user_with_image(USER_ID, image_bytes, app_config, logger=logger)
+            cold.append((time.perf_counter() - start) * 1000.0)
+
+        warm = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            verify_user_with_image(USER_ID, image_bytes, app_config, logger=logger)
+            warm.append((time.perf_counter() - start) * 1000.0)
+
+        results.append({"resolution": f"{width}x{height}", "cold": _percentiles(cold), "warm": _percentiles(warm)})
+        print(f"verify    {width}x{height}: cold p50={results[-1]['cold']['p50_ms']:.1f} ms  "
+              f"warm p50={results[-1]['warm']['p50_ms']:.1f} ms")
+    return results
+
+
+def bench_sequence(work_dir, app_config, resolutions, num_images):
+    from src.ai.model_components import FacesSequence
+
+    results = []
+    for width, height in resolutions:
+        data_dir = os.path.join(work_dir, f"sequence_{width}x{height}")
+        for cls in (USER_ID, "not_user"):
+            write_synthetic_images(os.path.join(data_dir, cls), num_images // 2, width, height)
+
+        for augment in (False, True):
+            sequence = FacesSequence(
+                directory=data_dir,
+                batch_size=int(app_config.get('AI_BATCH_SIZE', 16)),
+                image_size=app_config.get('AI_MODEL_INPUT_SIZE', (224, 224)),
+                class_names=["not_user", USER_ID],
+                augment=augment,
+                logger=logger
+            )
+            start = time.perf_counter()
+            num_loaded = sum(len(sequence[i][0]) for i in range(len(sequence)))
+            elapsed = time.perf_counter() - start
+            results.append({
+                "resolution": f"{width}x{height}",
+                "augment": augment,
+                "batches_per_sec": len(sequence) / elapsed,
+                "images_per_sec": num_loaded / elapsed,
+            })
+            print(f"sequence  {width}x{height} augment={augment}: {results[-1]['images_per_sec']:.1f} images/s")
+    return results
+
+
+def bench_augment(work_dir, app_config, resolutions, num_images):
+    from src.ai.data_processor import apply_offline_augmentations
+
+    results = []
+    for width, height in resolutions:
+        train_dir = os.path.join(work_dir, f"augment_{width}x{height}")
+        write_synthetic_images(train_dir, num_images, width, height)
+        start = time.perf_counter()
+        apply_offline_augmentations(USER_ID, train_dir, app_config, logger=logger)
+        elapsed = time.perf_counter() - start
+        results.append({"resolution": f"{width}x{height}", "images_per_sec": num_images / elapsed})
+        print(f"augment   {width}x{height}: {results[-1]['images_per_sec']:.1f} images/s")
+    return results
+
+
+def bench_split(work_dir, app_config, resolutions, num_images):
+    from src.ai.data_processor import split_user_images_for_training
+
+    results = []
+    for width, height in resolutions:
+        source_dir = os.path.join(work_dir, f"uploads_{width}x{height}")
+        write_synthetic_images(source_dir, num_images, width, height)
+        base_data_dir = os.path.join(work_dir, f"split_{width}x{height}")
+        start = time.perf_counter()
+        split_user_images_for_training(
+            USER_ID, source_dir, base_data_dir,
+            app_config.get('AI_TRAIN_RATIO', 0.8), app_config.get('AI_VALIDATION_RATIO', 0.15),
+            logger=logger
+        )
+        elapsed = time.perf_counter() - start
+        results.append({"resolution": f"{width}x{height}", "files_per_sec": num_images / elapsed})
+        print(f"split     {width}x{height}: {results[-1]['files_per_sec']:.1f} files/s")
+    return results
+
+
+# --- Suite Runner ---
+def _environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "commit": commit or None,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def run(benchmarks, resolutions, iterations, num_images):
+    work_dir = tempfile.mkdtemp(prefix="orv_bench_")
+    try:
+        app_config = _bench_app_config(work_dir)
+        results = {}
+        if 'verify' in benchmarks:
+            results['verify'] = bench_verify(work_dir, app_config, resolutions, iterations)
+        if 'sequence' in benchmarks:
+            results['sequence'] = bench_sequence(work_dir, app_config, resolutions, num_images)
+        if 'augment' in benchmarks:
+            results['augment'] = bench_augment(work_dir, app_config, resolutions, num_images)
+        if 'split' in benchmarks:
+            results['split'] = bench_split(work_dir, app_config, resolutions, num_images)
+        return results
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def _flatten(results):
+    """Maps 'benchmark/resolution[/augment]/metric' to numbers, for comparing two runs."""
+    flat = {}
+    for benchmark, rows in results.items():
+        for row in rows:
+            key = "/".join(str(row[k]) for k in ('resolution', 'augment') if k in row)
+            for metric, value in row.items():
+                if isinstance(value, dict):
+                    for sub_metric, sub_value in value.items():
+                        flat[f"{benchmark}/{key}/{metric}.{sub_metric}"] = sub_value
+                elif isinstance(value, float):
+                    flat[f"{benchmark}/{key}/{metric}"] = value
+    return flat
+
+
+def compare(old_path, new_path):
+    with open(old_path) as f:
+        old = _flatten(json.load(f)["results"])
+    with open(new_path) as f:
+        new = _flatten(json.load(f)["results"])
+    for name in sorted(old.keys() & new.keys()):
+        change = (new[name] - old[name]) / old[name] * 100.0 if old[name] else float('nan')
+        print(f"{name:<55} {old[name]:>12.2f} {new[name]:>12.2f} {change:>+8.1f}%")
+
+
+def parse_resolution(value):
+    width, height = value.lower().split('x')
+    return int(width), int(height)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--only', nargs='+', choices=BENCHMARKS, default=list(BENCHMARKS))
+    parser.add_argument('--resolutions', type=parse_resolution, nargs='+', default=[(640, 480), (1920, 1080)])
+    parser.add_argument('--iterations', type=int, default=30, help="Warm verification calls per resolution.")
+    parser.add_argument('--images', type=int, default=64, help="Images per data-loading benchmark.")
+    parser.add_argument('--output', help="Optional path of a JSON file for the results.")
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help="Compare two result files and exit.")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        sys.exit(0)
+
+    benchmark_results = run(args.only, args.resolutions, args.iterations, args.images)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"benchmark": "hot_paths", "environment": _environment(), "results": benchmark_results},
+                      f, indent=2)
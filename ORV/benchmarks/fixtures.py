@@ -0,0 +1,64 @@
+"""
+Synthetic inputs shared by the benchmarks, so they run offline without a dataset
+or the VGGFace weights.
+"""
+import os
+import cv2 as cv
+import numpy as np
+
+
+def make_synthetic_jpeg(width, height, quality=90, seed=0):
+    """Smooth gradients plus noise, encoded in memory; roughly as costly to decode as a camera frame."""
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, 255, width, dtype=np.float32)[np.newaxis, :]
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, np.newaxis]
+    base = np.stack([x + 0 * y, y + 0 * x, (x + y) / 2], axis=-1)
+    img = np.clip(base + rng.normal(0, 12, size=base.shape), 0, 255).astype(np.uint8)
+    ok, encoded = cv.imencode('.jpg', img, [cv.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise RuntimeError("Could not encode the synthetic JPEG.")
+    return encoded.tobytes()
+
+
+def write_synthetic_images(directory, count, width, height, prefix="frame"):
+    """Writes `count` distinct synthetic JPEGs to directory and returns their paths."""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for index in range(count):
+        path = os.path.join(directory, f"{prefix}_{index}.jpg")
+        with open(path, 'wb') as f:
+            f.write(make_synthetic_jpeg(width, height, seed=index))
+        paths.append(path)
+    return paths
+
+
+def build_standin_classifier(input_shape=(224, 224, 3)):
+    """VGG16 base + the fc1/bn1/classifier head of build_vggface_classifier, randomly initialized."""
+    from keras import layers, models
+    from keras.applications import VGG16
+
+    base = VGG16(weights=None, include_top=False, input_shape=input_shape)
+    x = layers.GlobalAveragePooling2D(name="gap")(base.output)
+    x = layers.Dense(512, name="fc1")(x)
+    x = layers.BatchNormalization(name="bn1")(x)
+    x = layers.ReLU(name="relu1")(x)
+    outputs = layers.Dense(1, activation='sigmoid', name='classifier')(x)
+    return models.Model(inputs=base.input, outputs=outputs, name="standin_classifier")
+
+
+def build_tiny_classifier(input_shape=(224, 224, 3)):
+    """A few-layer model with the input/output signature of build_vggface_classifier.
+
+    Keeps the benchmarks focused on the serving and data paths rather than on VGG16 FLOPs.
+    """
+    from keras import layers, models
+
+    inputs = layers.Input(shape=input_shape)
+    x = layers.Conv2D(8, 3, strides=4, activation='relu')(inputs)
+    x = layers.Conv2D(16, 3, strides=4, activation='relu')(x)
+    x = layers.GlobalAveragePooling2D(name="gap")(x)
+    x = layers.Dense(16, name="fc1")(x)
+    x = layers.BatchNormalization(name="bn1")(x)
+    x = layers.ReLU(name="relu1")(x)
+    outputs = layers.Dense(1, activation='sigmoid', name='classifier')(x)
+    return models.Model(inputs=inputs, outputs=outputs, name="tiny_standin_classifier")
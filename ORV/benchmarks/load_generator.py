@@ -0,0 +1,285 @@
+"""
+Load generator for the verification and upload API.
+
+Drives /user/verify, /user/verifyFrames and /user/updateImages either through
+the in-process Flask test client (main.create_app) or against a running server,
+and reports throughput, latency percentiles and error rates per endpoint.
+
+Load models:
+    --concurrency N        closed loop: N clients, each sends its next request when the previous returns
+    --rate R               open loop: R requests/s on a fixed schedule; latency includes time spent
+                           waiting for a free client, so an overloaded server shows up as growing latency
+    --ramp 1 2 4 8 16      runs one closed-loop step per concurrency level to find the saturation point
+
+Request mix:
+    By default users u0..u{--users - 1} are drawn from a Zipf-like distribution (a few hot
+    users, a long tail), which exercises the model cache realistically. --replay FILE replays
+    a recorded mix instead: a JSON-lines file of {"endpoint": "verify" | "verifyFrames" |
+    "updateImages", "user_id": "..."} entries, cycled in order.
+
+Usage (from ORV/):
+    python -m benchmarks.load_generator --in-process --concurrency 8 --duration 30
+    python -m benchmarks.load_generator --url http://127.0.0.1:3002 --rate 50 --duration 60 --output load.json
+    python -m benchmarks.load_generator --url http://127.0.0.1:3002 --ramp 1 2 4 8 16 32 --duration 20
+"""
+import os
+import io
+import json
+import time
+import uuid
+import random
+import argparse
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+from benchmarks.fixtures import make_synthetic_jpeg
+
+ENDPOINT_PATHS = {
+    "verify": "/user/verify",
+    "verifyFrames": "/user/verifyFrames",
+    "updateImages": "/user/updateImages",
+}
+
+
+# --- Request Mix ---
+class RequestMix:
+    """Yields (endpoint, user_id) pairs from a recorded replay file or a synthetic Zipf-like mix."""
+
+    def __init__(self, num_users=20, upload_fraction=0.0, frames_fraction=0.0, replay_path=None, seed=0):
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+        self._replay = None
+        self._replay_index = 0
+        if replay_path:
+            with open(replay_path) as f:
+                self._replay = [json.loads(line) for line in f if line.strip()]
+            if not self._replay:
+                raise ValueError(f"Replay file {replay_path} is empty.")
+        self.users = [f"u{i}" for i in range(num_users)]
+        weights = np.array([1.0 / (rank + 1) for rank in range(num_users)])
+        self._user_weights = list(weights / weights.sum())
+        self.upload_fraction = upload_fraction
+        self.frames_fraction = frames_fraction
+
+    def next(self):
+        with self._lock:
+            if self._replay is not None:
+                entry = self._replay[self._replay_index % len(self._replay)]
+                self._replay_index += 1
+                return entry["endpoint"], entry["user_id"]
+            user_id = self._rng.choices(self.users, weights=self._user_weights)[0]
+            draw = self._rng.random()
+        if draw < self.upload_fraction:
+            return "updateImages", user_id
+        if draw < self.upload_fraction + self.frames_fraction:
+            return "verifyFrames", user_id
+        return "verify", user_id
+
+
+# --- Transports ---
+def _multipart_body(fields, files):
+    """Encodes form fields and (field_name, filename, bytes) files as multipart/form-data."""
+    boundary = uuid.uuid4().hex
+    body = io.BytesIO()
+    for name, value in fields.items():
+        body.write(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, filename, content in files:
+        body.write(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                   f'Content-Type: image/jpeg\r\n\r\n'.encode())
+        body.write(content)
+        body.write(b'\r\n')
+    body.write(f'--{boundary}--\r\n'.encode())
+    return body.getvalue(), f'multipart/form-data; boundary={boundary}'
+
+
+class HttpTransport:
+    def __init__(self, base_url, timeout=60):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def post(self, path, fields, files):
+        body, content_type = _multipart_body(fields, files)
+        request = urllib.request.Request(self.base_url + path, data=body, method='POST',
+                                         headers={'Content-Type': content_type})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+
+class InProcessTransport:
+    """Calls the app through Flask test clients (one per thread, since clients keep state)."""
+
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def post(self, path, fields, files):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        data = dict(fields)
+        for name, filename, content in files:
+            data.setdefault(name, []).append((io.BytesIO(content), filename))
+        return client.post(path, data=data, content_type='multipart/form-data').status_code
+
+
+# --- Load Generation ---
+class LoadResult:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+
+    def record(self, endpoint, status, latency_ms):
+        with self._lock:
+            self.samples.setdefault(endpoint, []).append((status, latency_ms))
+
+    def summary(self, duration_seconds):
+        summary = {}
+        for endpoint, samples in self.samples.items():
+            latencies = np.array([latency for _, latency in samples])
+            statuses = {}
+            for status, _ in samples:
+                statuses[str(status)] = statuses.get(str(status), 0) + 1
+            errors = sum(count for status, count in statuses.items() if not status.startswith('2'))
+            summary[endpoint] = {
+                "requests": len(samples),
+                "throughput_rps": len(samples) / duration_seconds,
+                "error_rate": errors / len(samples),
+                "status_counts": statuses,
+                "p50_ms": float(np.percentile(latencies, 50)),
+                "p90_ms": float(np.percentile(latencies, 90)),
+                "p99_ms": float(np.percentile(latencies, 99)),
+                "max_ms": float(latencies.max()),
+            }
+        return summary
+
+
+class LoadGenerator:
+    def __init__(self, transport, mix, images, frames_per_request=5, upload_images=10):
+        self.transport = transport
+        self.mix = mix
+        self.images = images
+        self.frames_per_request = frames_per_request
+        self.upload_images = upload_images
+
+    def _send(self, endpoint, user_id):
+        image_count = {"verify": 1, "verifyFrames": self.frames_per_request, "updateImages": self.upload_images}[endpoint]
+        field_name = "image" if endpoint == "verify" else "images"
+        files = [(field_name, f"frame_{i}.jpg", random.choice(self.images)) for i in range(image_count)]
+        try:
+            return self.transport.post(ENDPOINT_PATHS[endpoint], {"userId": user_id}, files)
+        except Exception as e:
+            return type(e).__name__
+
+    def _one_request(self, result, scheduled_at=None):
+        endpoint, user_id = self.mix.next()
+        started_at = scheduled_at if scheduled_at is not None else time.perf_counter()
+        status = self._send(endpoint, user_id)
+        result.record(endpoint, status, (time.perf_counter() - started_at) * 1000.0)
+
+    def run_closed_loop(self, concurrency, duration_seconds):
+        result = LoadResult()
+        deadline = time.perf_counter() + duration_seconds
+
+        def client_loop():
+            while time.perf_counter() < deadline:
+                self._one_request(result)
+
+        threads = [threading.Thread(target=client_loop, daemon=True) for _ in range(concurrency)]
+        started_at = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return result.summary(time.perf_counter() - started_at)
+
+    def run_open_loop(self, rate, duration_seconds, max_in_flight=256):
+        result = LoadResult()
+        interval = 1.0 / rate
+        started_at = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+            next_at = started_at
+            while next_at < started_at + duration_seconds:
+                delay = next_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                # Latency is measured from the scheduled time, so queueing behind a slow server counts.
+                pool.submit(self._one_request, result, next_at)
+                next_at += interval
+        return result.summary(time.perf_counter() - started_at)
+
+
+def _load_images(images_dir, count=8):
+    if images_dir:
+        paths = sorted(os.path.join(images_dir, f) for f in os.listdir(images_dir)
+                       if f.lower().endswith(('.jpg', '.jpeg', '.png')))
+        if not paths:
+            raise ValueError(f"No images found in {images_dir}")
+        images = []
+        for path in paths[:count]:
+            with open(path, 'rb') as f:
+                images.append(f.read())
+        return images
+    return [make_synthetic_jpeg(1280, 720, seed=i) for i in range(count)]
+
+
+def _print_summary(label, summary):
+    for endpoint, stats in sorted(summary.items()):
+        print(f"{label:<16} {endpoint:<13} {stats['throughput_rps']:8.1f} rps  "
+              f"p50={stats['p50_ms']:8.1f} ms  p99={stats['p99_ms']:8.1f} ms  errors={stats['error_rate']:.1%}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--url', help="Base URL of a running server.")
+    target.add_argument('--in-process', action='store_true', help="Use main.create_app() and its test client.")
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument('--concurrency', type=int, default=4)
+    load.add_argument('--rate', type=float, help="Open-loop request rate (requests/s).")
+    load.add_argument('--ramp', type=int, nargs='+', help="Closed-loop concurrency levels to step through.")
+    parser.add_argument('--duration', type=float, default=30.0, help="Seconds per run (per step with --ramp).")
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--upload-fraction', type=float, default=0.0)
+    parser.add_argument('--frames-fraction', type=float, default=0.0)
+    parser.add_argument('--replay', help="JSON-lines file of recorded {endpoint, user_id} requests.")
+    parser.add_argument('--images-dir', help="Directory of real images to send instead of synthetic ones.")
+    parser.add_argument('--output', help="Optional path of a JSON file for the results.")
+    args = parser.parse_args()
+
+    if args.in_process:
+        from main import create_app
+        load_transport = InProcessTransport(create_app())
+    else:
+        load_transport = HttpTransport(args.url)
+
+    generator = LoadGenerator(
+        load_transport,
+        RequestMix(args.users, args.upload_fraction, args.frames_fraction, args.replay),
+        _load_images(args.images_dir)
+    )
+
+    runs = []
+    if args.ramp:
+        for concurrency in args.ramp:
+            step_summary = generator.run_closed_loop(concurrency, args.duration)
+            _print_summary(f"concurrency={concurrency}", step_summary)
+            runs.append({"mode": "closed_loop", "concurrency": concurrency, "endpoints": step_summary})
+    elif args.rate:
+        run_summary = generator.run_open_loop(args.rate, args.duration)
+        _print_summary(f"rate={args.rate:g}/s", run_summary)
+        runs.append({"mode": "open_loop", "rate": args.rate, "endpoints": run_summary})
+    else:
+        run_summary = generator.run_closed_loop(args.concurrency, args.duration)
+        _print_summary(f"concurrency={args.concurrency}", run_summary)
+        runs.append({"mode": "closed_loop", "concurrency": args.concurrency, "endpoints": run_summary})
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"benchmark": "load", "target": args.url or "in-process", "runs": runs}, f, indent=2)
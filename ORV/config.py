@@ -4,11 +4,34 @@ HOST = '0.0.0.0'
 PORT = 3002
 DEBUG = True
 
+# Production server (gunicorn.conf.py); each worker is a separate process
+SERVER_WORKERS = 2
+SERVER_THREADS = 4
+SERVER_TIMEOUT = 120
+# Per-worker TensorFlow threads; None gives each worker an equal share of the cores
+AI_TF_INTRA_OP_THREADS = None
+AI_TF_INTER_OP_THREADS = 1
+
 PROJECT_ROOT = os.path.abspath(os.path.dirname(__file__))
 
 BASE_UPLOAD_FOLDER = os.path.join(PROJECT_ROOT, 'uploads')
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
 
+# Upload limits; Flask refuses bodies over MAX_CONTENT_LENGTH before reading them
+UPLOAD_MAX_FILE_BYTES = 16 * 1024 * 1024
+UPLOAD_MAX_REQUEST_BYTES = 256 * 1024 * 1024
+MAX_CONTENT_LENGTH = UPLOAD_MAX_REQUEST_BYTES
+UPLOAD_CHUNK_BYTES = 64 * 1024
+
+# Video enrollment: a 'video' part of /user/updateImages is stored and sampled into frames by the user's training job;
+# candidates are taken at VIDEO_SAMPLE_FPS and, in 'motion' mode, kept only if the scene changed
+UPLOAD_MAX_VIDEO_BYTES = 128 * 1024 * 1024
+VIDEO_ALLOWED_EXTENSIONS = {'mp4', 'mov', 'webm', 'mkv', '3gp', 'avi'}
+VIDEO_SAMPLING_MODE = 'motion'  # 'rate' or 'motion'
+VIDEO_SAMPLE_FPS = 5.0
+VIDEO_MOTION_MIN_DIFF = 4.0
+VIDEO_MAX_FRAMES = 100
+
 # AI Model related paths
 DATA_DIR = os.path.join(PROJECT_ROOT, 'data')
 MODELS_DIR = 'models'
@@ -28,9 +51,128 @@ AI_MODEL_INPUT_SIZE = (224, 224)
 
 # AI Model and Verification Settings
 AI_BEST_MODEL_FILENAME = 'best_vggface_model.keras'
+AI_HEAD_FILENAME = 'head_weights.npz'
+AI_TEMPLATE_FILENAME = 'embedding.npy'
+# 'classifier': full per-user VGGFace model; 'head': shared backbone + per-user head;
+# 'template': no training, cosine similarity to the user's mean embedding
+AI_VERIFICATION_MODE = 'classifier'
+AI_TEMPLATE_SIMILARITY_THRESHOLD = 0.75
+AI_EMBEDDING_BATCH_SIZE = 32
+
+# 1:N identification index over enrolled templates (stored under MODELS_DIR)
+AI_INDEX_DIRNAME = '_index'
+AI_INDEX_DTYPE = 'float32'
+AI_INDEX_NUM_LISTS = 0  # > 0 enables the IVF coarse quantizer for large user counts
+AI_INDEX_NUM_PROBE = 4
+AI_IDENTIFY_TOP_K = 5
 AI_VERIFICATION_THRESHOLD = 0.5
 AI_VGGFACE_PREPROCESS_VERSION = 1
 
+# Loaded per-user models are kept in memory (LRU) up to this many bytes
+AI_MODEL_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+
+# Startup warm-up: load the backbone and these users' models before /ready reports true
+AI_WARMUP_ON_STARTUP = True
+AI_PRELOAD_USER_IDS = []
+# A failed warm-up is retried with a doubling backoff; after the last attempt /ready reports
+# ready (degraded) and models are loaded by the first requests instead
+AI_WARMUP_MAX_ATTEMPTS = 5
+AI_WARMUP_RETRY_BACKOFF_SECONDS = 5.0
+AI_WARMUP_RETRY_MAX_BACKOFF_SECONDS = 60.0
+
+# Concurrent verification requests are batched on one inference thread
+AI_INFERENCE_EXECUTOR_ENABLED = True
+AI_INFERENCE_MAX_BATCH_SIZE = 16
+AI_INFERENCE_MAX_WAIT_MS = 5
+AI_INFERENCE_TIMEOUT_SECONDS = 30
+# Traced fixed-signature inference instead of Model.predict; batches are padded to a bucket
+AI_COMPILED_INFERENCE = True
+AI_INFERENCE_BATCH_BUCKETS = (1, 2, 4, 8, 16)
+
+# 'keras' or 'tflite' (quantized artifacts exported after training / for the shared backbone)
+AI_INFERENCE_BACKEND = 'keras'
+AI_EXPORT_TFLITE = False
+AI_TFLITE_QUANTIZATION = 'dynamic'  # 'none', 'dynamic' or 'int8'
+AI_TFLITE_CALIBRATION_MAX_IMAGES = 100
+AI_TFLITE_FILENAME = 'model.tflite'
+AI_TFLITE_REPORT_FILENAME = 'tflite_report.json'
+AI_BACKBONE_TFLITE_FILENAME = 'backbone.tflite'
+AI_TFLITE_NUM_THREADS = None
+
+# Multi-frame verification (/user/verifyFrames)
+AI_MULTI_FRAME_MAX_FRAMES = 10
+AI_MULTI_FRAME_AGGREGATION = 'mean'  # 'mean', 'median' or 'vote'
+AI_MULTI_FRAME_CHUNK_SIZE = 4
+AI_MULTI_FRAME_MIN_FRAMES = 2
+AI_MULTI_FRAME_EARLY_EXIT_MARGIN = 0.2
+AI_MULTI_FRAME_DECODE_WORKERS = 4
+
+# Out-of-process inference: > 0 scores verification requests in this many spawned worker
+# processes; decoded frames are handed over through a shared-memory ring of AI_INFERENCE_POOL_SLOTS
+AI_INFERENCE_POOL_PROCESSES = 0
+AI_INFERENCE_POOL_SLOTS = 64
+AI_INFERENCE_POOL_SCORER = 'src.ai.verification_manager:score_user_frames'
+
+# Face detection at ingest: uploaded frames are stored as fixed-size face crops
+# (AI_MODEL_INPUT_SIZE) and frames without a face are rejected; verification crops the same way.
+# Models trained on full frames expect full-frame probes: retrain every user before enabling it
+AI_FACE_CROP_ENABLED = False
+AI_FACE_DETECTION_SIZE = 640  # frames are detected on at most this many pixels along the longer side
+AI_FACE_MIN_SIZE = 50
+AI_FACE_CROP_PADDING = 0.2
+AI_FACE_CROP_JPEG_QUALITY = 95
+
+# Ingest normalization: frames are decoded once at upload (in INGEST_WORKERS threads) and stored
+# downscaled to INGEST_SHORT_SIDE; with AI_FACE_CROP_ENABLED the face crop is stored instead
+INGEST_NORMALIZE_ENABLED = True
+INGEST_SHORT_SIDE = 256
+INGEST_JPEG_QUALITY = 90
+INGEST_WORKERS = 4
+# Keep the files as received in cold storage, outside the training data
+INGEST_KEEP_ORIGINALS = False
+INGEST_ORIGINALS_FOLDER = os.path.join(PROJECT_ROOT, 'uploads_originals')
+# Near-duplicate removal: a frame whose dHash is within INGEST_DEDUP_MAX_DISTANCE bits of an already
+# kept frame of the same upload is dropped; at most INGEST_DEDUP_MAX_FRAMES diverse frames are kept
+# (needs AI_FACE_CROP_ENABLED or INGEST_NORMALIZE_ENABLED, which compute the hashes while decoding)
+INGEST_DEDUP_ENABLED = True
+INGEST_DEDUP_MAX_DISTANCE = 5
+INGEST_DEDUP_MAX_FRAMES = 60
+
+# Frame quality pruning before the split: blurry (Laplacian variance), dark, overexposed or clipped
+# frames, and without face cropping frames whose face covers too little of the image, are not trained on
+AI_QUALITY_FILTER_ENABLED = True
+AI_QUALITY_ANALYSIS_SIZE = 128  # frames are scored as grayscale squares of this size
+AI_QUALITY_MIN_SHARPNESS = 40.0
+AI_QUALITY_MIN_BRIGHTNESS = 40
+AI_QUALITY_MAX_BRIGHTNESS = 215
+AI_QUALITY_MAX_CLIPPED_FRACTION = 0.25
+AI_QUALITY_MIN_FACE_FRACTION = 0.05
+AI_QUALITY_MIN_FRAMES = 10
+
+# Uploads return 202 with a job id; data preparation and training are queued in a SQLite job
+# database and run at most AI_JOB_WORKERS at a time on the host, whatever SERVER_WORKERS is (jobs
+# survive restarts), and are reported at /user/jobs/<id>. First enrollments are scheduled ahead of
+# retraining, and a user never has two jobs running at once
+AI_JOB_DB_PATH = os.path.join(PROJECT_ROOT, 'jobs', 'training_jobs.sqlite3')
+AI_JOB_WORKERS = 1
+AI_JOB_POLL_SECONDS = 2.0
+AI_JOB_PRIORITY_NEW_USER = 10
+AI_JOB_PRIORITY_RETRAIN = 0
+# A job that crashes, or whose worker stops renewing its lease, is retried up to AI_JOB_MAX_ATTEMPTS runs
+AI_JOB_MAX_ATTEMPTS = 3
+AI_JOB_RETRY_BACKOFF_SECONDS = 30.0
+AI_JOB_LEASE_SECONDS = 300.0
+AI_JOB_HISTORY_LIMIT = 1000
+# Each job runs in its own spawned process ('process'), so TensorFlow's memory goes back to the OS
+# when it ends; 'thread' runs it inside the server process. The memory cap is on address space
+# (RLIMIT_AS, POSIX only), which TensorFlow reserves generously, so leave headroom
+AI_JOB_ISOLATION = 'process'
+AI_JOB_RUNNER = 'src.ai.training_pipeline:run_user_training_job'
+AI_JOB_MEMORY_LIMIT_MB = None
+AI_JOB_TF_INTRA_OP_THREADS = None  # None: an equal share of the cores among SERVER_WORKERS + AI_JOB_WORKERS
+AI_JOB_TF_INTER_OP_THREADS = 1
+AI_JOB_TIMEOUT_SECONDS = 3 * 60 * 60
+
 # Data splitting ratios
 AI_TRAIN_RATIO = 0.8
 AI_VALIDATION_RATIO = 0.15
@@ -0,0 +1,59 @@
+"""
+Production server configuration.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+The master imports the app once (preload_app) and forks SERVER_WORKERS workers.
+TensorFlow is never imported in the master, because its thread pools do not
+survive fork; weights are shared instead through the memory-mapped TFLite
+backbone (AI_INFERENCE_BACKEND = 'tflite'), which is exported once before forking.
+"""
+import os
+import multiprocessing
+
+import config as app_settings
+
+# --- Server Settings ---
+bind = f"{app_settings.HOST}:{app_settings.PORT}"
+workers = int(os.environ.get('SERVER_WORKERS', app_settings.SERVER_WORKERS))
+threads = int(os.environ.get('SERVER_THREADS', app_settings.SERVER_THREADS))
+timeout = int(os.environ.get('SERVER_TIMEOUT', app_settings.SERVER_TIMEOUT))
+preload_app = True
+worker_class = 'gthread'
+accesslog = '-'
+
+
+def _app_config():
+    return {name: getattr(app_settings, name) for name in dir(app_settings) if name.isupper()}
+
+
+# --- Master Hooks ---
+def on_starting(server):
+    """Exports the shared TFLite backbone once, in a spawned process so TF never loads in the master."""
+    from src.ai.warmup import prepare_shared_artifacts
+
+    app_config = _app_config()
+    if app_config.get('AI_INFERENCE_BACKEND', 'keras') != 'tflite':
+        return
+    if app_config.get('AI_VERIFICATION_MODE', 'classifier') not in ('head', 'template'):
+        return
+    export_process = multiprocessing.get_context('spawn').Process(target=prepare_shared_artifacts, args=(app_config,))
+    export_process.start()
+    export_process.join()
+    if export_process.exitcode != 0:
+        server.log.error(f"TFLite backbone export failed with exit code {export_process.exitcode}.")
+
+
+# --- Worker Hooks ---
+def post_fork(server, worker):
+    """Caps per-worker inference threads, then starts this worker's warm-up and training workers."""
+    from wsgi import app
+    from src.ai.thread_limits import apply_thread_limits
+    from src.ai.warmup import start_warmup
+    from src.ai.training_jobs import start_training_workers
+
+    # Training processes size their thread share from the worker count actually in use.
+    app.config['SERVER_WORKERS'] = workers
+    apply_thread_limits(app.config, num_workers=workers, logger=app.logger)
+    start_warmup(app)
+    start_training_workers(app)
@@ -1,11 +1,19 @@
 from flask import Flask
 import os
 
-def create_app():
-    """Initializes and configures the Flask application."""
+def create_app(test_config=None, defer_warmup=False):
+    """Initializes and configures the Flask application.
+
+    test_config, if given, overrides values from config.py (e.g. TESTING=True,
+    which also skips the inference warm-up and the training workers). With
+    defer_warmup the caller starts both itself (the production server does so
+    in each forked worker).
+    """
     # --- App Initialization and Configuration ---
     app = Flask(__name__)
     app.config.from_pyfile('config.py') 
+    if test_config:
+        app.config.update(test_config)
 
     # --- Base Upload Folder Setup ---
     project_root_dir = os.path.dirname(os.path.abspath(__file__))
@@ -26,16 +34,31 @@ def create_app():
             else:
                 print(error_message)
 
+    # --- Inference Backend Check ---
+    # Classifier-mode TFLite models only exist when training exports them.
+    if (app.config.get('AI_INFERENCE_BACKEND', 'keras') == 'tflite'
+            and app.config.get('AI_VERIFICATION_MODE', 'classifier') == 'classifier'
+            and not app.config.get('AI_EXPORT_TFLITE', False)):
+        app.logger.warning("AI_INFERENCE_BACKEND is 'tflite' but AI_EXPORT_TFLITE is off, so no per-user "
+                           ".tflite models are written; falling back to the Keras backend.")
+        app.config['AI_INFERENCE_BACKEND'] = 'keras'
+
     # --- Blueprint Registration ---
     from src.server.routes import api_bp 
     app.register_blueprint(api_bp) 
-    return app
 
-# --- Application Instance Creation ---
-app = create_app()
+    # --- Inference Warm-up (background; /ready reports completion) and Training Workers ---
+    if not defer_warmup:
+        from src.ai.warmup import start_warmup
+        from src.ai.training_jobs import start_training_workers
+        start_warmup(app)
+        start_training_workers(app)
+    return app
 
-# --- Development Server Start ---
+# --- Development Server Start (production: gunicorn -c gunicorn.conf.py wsgi:app) ---
 if __name__ == '__main__':
+    # --- Application Instance Creation ---
+    app = create_app()
     with app.app_context():
         app.run(
             host=app.config.get('HOST', '0.0.0.0'), 
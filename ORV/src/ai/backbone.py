@@ -0,0 +1,92 @@
+import os
+import threading
+import logging
+import numpy as np
+
+from .model_components import build_vggface_backbone
+from .compiled_inference import CompiledPredictor, DEFAULT_BATCH_BUCKETS
+from .model_export import export_tflite_model, load_tflite_model
+
+module_logger = logging.getLogger(__name__)
+
+# --- Process-wide Backbone Instance ---
+_shared_backbone = None
+_shared_backbone_lock = threading.Lock()
+
+
+class SharedBackbone:
+    """The single frozen VGGFace feature extractor of this process.
+
+    `model` is a Keras model or a TFLiteModel; both expose predict() and output_shape.
+    """
+
+    def __init__(self, model, compiled=True, batch_buckets=DEFAULT_BATCH_BUCKETS):
+        self.model = model
+        self.feature_dim = int(model.output_shape[-1])
+        self.lock = threading.Lock()
+        self.predictor = CompiledPredictor(model, batch_buckets) if compiled else None
+
+    def compute_features(self, img_batch):
+        """Returns (N, feature_dim) float32 features for a preprocessed batch."""
+        with self.lock:
+            if self.predictor is not None:
+                features = self.predictor(img_batch)
+            else:
+                features = self.model.predict(img_batch, verbose=0)
+        return np.asarray(features, dtype=np.float32)
+
+
+def ensure_tflite_backbone(app_config, logger=None):
+    """
+    Exports the quantized backbone artifact if it does not exist yet.
+
+    The production server calls this once before forking workers, so every
+    worker memory-maps the same file instead of exporting its own.
+
+    Returns:
+        str: Path of the .tflite backbone.
+    """
+    if logger is None:
+        logger = module_logger
+    image_size = app_config.get('AI_MODEL_INPUT_SIZE', (224, 224))
+    input_shape = (image_size[0], image_size[1], 3)
+    tflite_path = os.path.join(app_config.get('MODELS_DIR'),
+                               app_config.get('AI_BACKBONE_TFLITE_FILENAME', 'backbone.tflite'))
+    if not os.path.exists(tflite_path):
+        quantization = app_config.get('AI_TFLITE_QUANTIZATION', 'dynamic')
+        calibration_dir = os.path.join(app_config.get('DATA_DIR', 'data'), 'validation', 'not_user')
+        calibration_paths = []
+        if os.path.isdir(calibration_dir):
+            calibration_paths = [os.path.join(calibration_dir, f) for f in sorted(os.listdir(calibration_dir))]
+        if quantization == 'int8' and not calibration_paths:
+            logger.warning("No calibration images for int8 backbone export; using dynamic-range quantization.")
+            quantization = 'dynamic'
+        logger.info(f"Exporting {quantization} TFLite backbone to {tflite_path}.")
+        keras_backbone = build_vggface_backbone(input_shape=input_shape, logger=logger)
+        export_tflite_model(keras_backbone, tflite_path, quantization, calibration_paths, app_config)
+    return tflite_path
+
+
+def get_shared_backbone(app_config, logger=None):
+    """Returns the process-wide backbone, building it on first use."""
+    global _shared_backbone
+    if logger is None:
+        logger = module_logger
+
+    with _shared_backbone_lock:
+        if _shared_backbone is None:
+            image_size = app_config.get('AI_MODEL_INPUT_SIZE', (224, 224))
+            input_shape = (image_size[0], image_size[1], 3)
+            logger.info("Loading shared VGGFace backbone.")
+            if app_config.get('AI_INFERENCE_BACKEND', 'keras') == 'tflite':
+                tflite_path = ensure_tflite_backbone(app_config, logger)
+                tflite_model = load_tflite_model(tflite_path, num_threads=app_config.get('AI_TFLITE_NUM_THREADS'))
+                _shared_backbone = SharedBackbone(tflite_model, compiled=False)
+                return _shared_backbone
+            model = build_vggface_backbone(input_shape=input_shape, logger=logger)
+            _shared_backbone = SharedBackbone(
+                model,
+                compiled=app_config.get('AI_COMPILED_INFERENCE', True),
+                batch_buckets=app_config.get('AI_INFERENCE_BATCH_BUCKETS', DEFAULT_BATCH_BUCKETS)
+            )
+        return _shared_backbone
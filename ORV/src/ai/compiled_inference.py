@@ -0,0 +1,57 @@
+import threading
+import numpy as np
+import tensorflow as tf
+
+DEFAULT_BATCH_BUCKETS = (1, 2, 4, 8, 16)
+
+
+class CompiledPredictor:
+    """
+    Fixed-signature inference for a Keras model.
+
+    Model.predict builds a data adapter and a distributed predict step on every
+    call, which dominates the latency of a single 224x224 image. This wrapper
+    traces the model once per batch-size bucket into a concrete tf.function and
+    reuses it: a batch is zero-padded up to the smallest bucket that fits, and
+    batches larger than the largest bucket are split.
+    """
+
+    def __init__(self, model, batch_buckets=DEFAULT_BATCH_BUCKETS):
+        self.model = model
+        self.input_shape = tuple(model.input_shape[1:])
+        self.batch_buckets = tuple(sorted({int(b) for b in batch_buckets}))
+        self._function = tf.function(lambda inputs: model(inputs, training=False))
+        self._concrete_functions = {}
+        self._lock = threading.Lock()
+
+    def _concrete_function(self, bucket):
+        concrete = self._concrete_functions.get(bucket)
+        if concrete is None:
+            with self._lock:
+                concrete = self._concrete_functions.get(bucket)
+                if concrete is None:
+                    spec = tf.TensorSpec(shape=(bucket,) + self.input_shape, dtype=tf.float32)
+                    concrete = self._function.get_concrete_function(spec)
+                    self._concrete_functions[bucket] = concrete
+        return concrete
+
+    def warm_up(self, buckets=None):
+        """Traces and runs every bucket once so the first real request pays no compile cost."""
+        for bucket in buckets or self.batch_buckets:
+            self(np.zeros((bucket,) + self.input_shape, dtype=np.float32))
+
+    def __call__(self, batch):
+        batch = np.asarray(batch, dtype=np.float32)
+        largest_bucket = self.batch_buckets[-1]
+        outputs = []
+        for start in range(0, len(batch), largest_bucket):
+            chunk = batch[start:start + largest_bucket]
+            num_images = len(chunk)
+            bucket = next(b for b in self.batch_buckets if b >= num_images)
+            if bucket != num_images:
+                padded = np.zeros((bucket,) + chunk.shape[1:], dtype=np.float32)
+                padded[:num_images] = chunk
+                chunk = padded
+            result = self._concrete_function(bucket)(tf.constant(chunk))
+            outputs.append(result.numpy()[:num_images])
+        return outputs[0] if len(outputs) == 1 else np.concatenate(outputs, axis=0)
@@ -7,13 +7,113 @@ import logging
 import cv2 as cv
 import numpy as np
 
+from .image_decoding import get_decode_pool, read_image_for_size
+
+# --- Frame quality scoring ---
+
+def score_frame_quality(gray_frames):
+    """
+    Scores a batch of equally sized grayscale frames at once.
+
+    Args:
+        gray_frames (np.ndarray): (N, H, W) uint8 frames.
+
+    Returns:
+        dict: (N,) arrays 'sharpness' (variance of the Laplacian), 'brightness'
+              (mean intensity) and 'clipped' (fraction of near-black or near-white pixels).
+    """
+    frames = gray_frames.astype(np.float32)
+    laplacian = (frames[:, :-2, 1:-1] + frames[:, 2:, 1:-1] + frames[:, 1:-1, :-2] + frames[:, 1:-1, 2:]
+                 - 4.0 * frames[:, 1:-1, 1:-1])
+    num_frames = len(gray_frames)
+    return {
+        "sharpness": laplacian.reshape(num_frames, -1).var(axis=1),
+        "brightness": frames.reshape(num_frames, -1).mean(axis=1),
+        "clipped": ((gray_frames <= 5) | (gray_frames >= 250)).reshape(num_frames, -1).mean(axis=1),
+    }
+
+def _face_fractions(image_paths, app_config):
+    """Fraction of each frame covered by its largest face (0.0 if none); used when frames are not face crops."""
+    from .face_detection import detect_largest_face
+
+    detection_size = int(app_config.get('AI_FACE_DETECTION_SIZE', 640))
+    def face_fraction(path):
+        img = read_image_for_size(path, (detection_size, detection_size))
+        if img is None:
+            return 0.0
+        face_box = detect_largest_face(img, detection_size, int(app_config.get('AI_FACE_MIN_SIZE', 50)))
+        if face_box is None:
+            return 0.0
+        return face_box[2] * face_box[3] / float(img.shape[0] * img.shape[1])
+    return np.array(list(get_decode_pool(app_config).map(face_fraction, image_paths)))
+
+def select_quality_frames(image_paths, app_config, logger=None):
+    """
+    Drops blurry, badly exposed and (without face cropping) small-face frames, scoring all frames in one batch.
+
+    At least AI_QUALITY_MIN_FRAMES frames are always kept; if too many fail, the
+    sharpest of the failing frames are kept as well.
+
+    Returns:
+        list: Paths of the frames to keep.
+        dict: Dropped path -> reason.
+    """
+    if logger is None:
+        logger = current_app.logger if current_app else logging.getLogger(__name__)
+
+    analysis_size = int(app_config.get('AI_QUALITY_ANALYSIS_SIZE', 128))
+    def load_gray(path):
+        img = read_image_for_size(path, (analysis_size, analysis_size))
+        if img is None:
+            return None
+        gray = cv.cvtColor(img, cv.COLOR_BGR2GRAY)
+        return cv.resize(gray, (analysis_size, analysis_size), interpolation=cv.INTER_AREA)
+
+    gray_frames = list(get_decode_pool(app_config).map(load_gray, image_paths))
+    dropped = {path: "unreadable" for path, gray in zip(image_paths, gray_frames) if gray is None}
+    readable_paths = [path for path, gray in zip(image_paths, gray_frames) if gray is not None]
+    if not readable_paths:
+        return [], dropped
+
+    # --- Vectorized Scoring and Thresholds ---
+    scores = score_frame_quality(np.stack([gray for gray in gray_frames if gray is not None]))
+    # Exposure is checked first: a dark frame also has little contrast left and so reads as blurry.
+    failures = [
+        ("too dark", scores["brightness"] < float(app_config.get('AI_QUALITY_MIN_BRIGHTNESS', 40))),
+        ("overexposed", scores["brightness"] > float(app_config.get('AI_QUALITY_MAX_BRIGHTNESS', 215))),
+        ("clipped", scores["clipped"] > float(app_config.get('AI_QUALITY_MAX_CLIPPED_FRACTION', 0.25))),
+        ("blurry", scores["sharpness"] < float(app_config.get('AI_QUALITY_MIN_SHARPNESS', 40.0))),
+    ]
+    if not app_config.get('AI_FACE_CROP_ENABLED', False):
+        face_fractions = _face_fractions(readable_paths, app_config)
+        failures.append(("face too small", face_fractions < float(app_config.get('AI_QUALITY_MIN_FACE_FRACTION', 0.05))))
+    failed = np.logical_or.reduce([mask for _, mask in failures])
+
+    # --- Keep a Minimum Number of Frames ---
+    min_frames = int(app_config.get('AI_QUALITY_MIN_FRAMES', 10))
+    shortfall = min_frames - int((~failed).sum())
+    if shortfall > 0:
+        failed_by_sharpness = [i for i in np.argsort(-scores["sharpness"]) if failed[i]]
+        failed[failed_by_sharpness[:shortfall]] = False
+
+    kept = []
+    for index, path in enumerate(readable_paths):
+        if failed[index]:
+            dropped[path] = next(reason for reason, mask in failures if mask[index])
+        else:
+            kept.append(path)
+    logger.info(f"Quality scoring kept {len(kept)} of {len(image_paths)} frames; "
+                f"dropped {len(dropped)} ({', '.join(sorted(set(dropped.values()))) or 'none'}).")
+    return kept, dropped
+
 def split_user_images_for_training(
     user_id: str,
     source_image_dir: str,
     base_data_dir: str,
     train_ratio: float,
     validation_ratio: float,
-    logger=None
+    logger=None,
+    app_config: dict = None
 ):
     """
     Splits images from a user's upload directory into train, validation, and test sets.
@@ -25,6 +125,7 @@ def split_user_images_for_training(
         train_ratio (float): Proportion of images for the training set.
         validation_ratio (float): Proportion of images for the validation set.
         logger: Optional logger instance.
+        app_config (dict): Optional; with AI_QUALITY_FILTER_ENABLED low-quality frames are left out.
     
     Returns:
         bool: True if successful, False otherwise.
@@ -51,6 +152,18 @@ def split_user_images_for_training(
         logger.warning(msg)
         return False, msg, None
 
+    # --- Quality Pruning ---
+    num_low_quality = 0
+    if app_config and app_config.get('AI_QUALITY_FILTER_ENABLED', False):
+        kept_paths, low_quality = select_quality_frames(
+            [os.path.join(source_image_dir, f) for f in all_images], app_config, logger)
+        all_images = [os.path.basename(p) for p in kept_paths]
+        num_low_quality = len(low_quality)
+        if not all_images:
+            msg = f"No usable images left after quality scoring in {source_image_dir}"
+            logger.warning(msg)
+            return False, msg, None
+
     num_total_images = len(all_images)
     random.shuffle(all_images)
 
@@ -100,7 +213,8 @@ def split_user_images_for_training(
 
     # --- Final Reporting ---
     msg = (f"Data for user {user_id} split: "
-           f"{len(train_images)} train, {len(validation_images)} validation, {len(test_images)} test. "
+           f"{len(train_images)} train, {len(validation_images)} validation, {len(test_images)} test, "
+           f"{num_low_quality} low-quality left out. "
            f"Train: {user_train_dir_path}, Val: {user_val_dir_path}, Test: {user_test_dir_path}")
     logger.info(msg)
     return True, msg, user_train_dir_path
@@ -179,10 +293,12 @@ def apply_offline_augmentations(
     user_id: str,
     user_train_data_path: str, # Path to 'data/train/user_id/'
     app_config: dict,
-    logger=None
+    logger=None,
+    progress_callback=None
 ):
     """
     Applies offline augmentations to images in a user's training data directory.
+    progress_callback, if given, is called as (processed, total) after each image.
     """
     if logger is None:
         logger = current_app.logger if current_app else logging.getLogger(__name__)
@@ -248,6 +364,8 @@ def apply_offline_augmentations(
     # Iterate over each original image found.
     for img_name in image_files:
         processed_count += 1
+        if progress_callback is not None:
+            progress_callback(processed_count, len(image_files))
         # Decide whether to augment this image based on the augmentation_probability.
         if random.random() < augmentation_probability:
             img_path = os.path.join(user_train_data_path, img_name)
@@ -0,0 +1,344 @@
+import os
+import json
+import threading
+import logging
+import contextlib
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; index updates are only serialized within a process there.
+    fcntl = None
+
+module_logger = logging.getLogger(__name__)
+
+# The IVF lists are retrained once the largest holds this many times its even share of rows.
+MAX_LIST_IMBALANCE = 3.0
+
+# --- Process-wide Index Instance ---
+_shared_index = None
+# Identity of the saved index _shared_index was loaded from or last saved as.
+_shared_index_version = None
+_shared_index_lock = threading.Lock()
+_update_lock = threading.Lock()
+
+
+class EmbeddingIndex:
+    """
+    In-memory 1:N index of L2-normalized user embeddings.
+
+    Embeddings live in one contiguous (capacity, D) matrix so a search is a
+    single matrix-vector product. With `num_lists` > 0 the index also keeps an
+    IVF-style coarse quantizer: rows are assigned to their nearest centroid and
+    a search only scores the rows of the `num_probe` closest lists (more if
+    those hold fewer than top_k rows). The lists are retrained when adds and
+    removes leave them too uneven.
+
+    The matrix is persisted as a .npy file that is memory-mapped on load, so a
+    restart does not re-embed every user.
+    """
+
+    def __init__(self, dim, dtype=np.float32, num_lists=0, num_probe=4, logger=None):
+        self.dim = int(dim)
+        self.dtype = np.dtype(dtype)
+        self.num_lists = int(num_lists)
+        self.num_probe = int(num_probe)
+        self.logger = logger if logger else module_logger
+
+        self._matrix = np.zeros((0, self.dim), dtype=self.dtype)
+        self._size = 0
+        self._user_ids = []
+        self._row_of = {}
+        self._centroids = None
+        self._assignments = np.zeros(0, dtype=np.int32)
+        self._updates_since_training = 0
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, user_id):
+        return user_id in self._row_of
+
+    @property
+    def user_ids(self):
+        with self._lock:
+            return list(self._user_ids)
+
+    # --- Incremental Updates ---
+    def _ensure_capacity(self, rows_needed):
+        capacity = self._matrix.shape[0]
+        if rows_needed <= capacity and self._matrix.flags.writeable:
+            return
+        new_capacity = max(rows_needed, capacity * 2, 16)
+        grown = np.zeros((new_capacity, self.dim), dtype=self.dtype)
+        grown[:self._size] = self._matrix[:self._size]
+        self._matrix = grown
+        assignments = np.zeros(new_capacity, dtype=np.int32)
+        assignments[:self._size] = self._assignments[:self._size]
+        self._assignments = assignments
+
+    def _nearest_centroid(self, vectors):
+        return np.argmax(vectors @ self._centroids.T, axis=1).astype(np.int32)
+
+    def add(self, user_id, embedding):
+        """Adds or replaces the embedding of user_id."""
+        vector = np.asarray(embedding, dtype=np.float32).reshape(self.dim)
+        vector = vector / max(float(np.linalg.norm(vector)), 1e-10)
+        with self._lock:
+            row = self._row_of.get(user_id)
+            if row is None:
+                self._ensure_capacity(self._size + 1)
+                row = self._size
+                self._size += 1
+                self._user_ids.append(user_id)
+                self._row_of[user_id] = row
+            else:
+                self._ensure_capacity(self._size)
+            self._matrix[row] = vector
+            if self._centroids is not None:
+                self._assignments[row] = self._nearest_centroid(vector[None, :])[0]
+                self._rebalance_quantizer()
+            elif self.num_lists > 0 and self._size >= 4 * self.num_lists:
+                self.train_quantizer()
+
+    def remove(self, user_id):
+        """Removes user_id by moving the last row into its slot. Returns True if it was present."""
+        with self._lock:
+            row = self._row_of.pop(user_id, None)
+            if row is None:
+                return False
+            self._ensure_capacity(self._size)
+            last = self._size - 1
+            if row != last:
+                moved_user = self._user_ids[last]
+                self._matrix[row] = self._matrix[last]
+                self._assignments[row] = self._assignments[last]
+                self._user_ids[row] = moved_user
+                self._row_of[moved_user] = row
+            self._user_ids.pop()
+            self._size -= 1
+            if self._centroids is not None:
+                self._rebalance_quantizer()
+            return True
+
+    # --- Coarse Quantizer ---
+    def _rebalance_quantizer(self):
+        """Retrains the IVF lists once updates make the largest list exceed MAX_LIST_IMBALANCE times
+        its even share. At most once per size // 10 updates, so clustered data cannot retrain on every add."""
+        self._updates_since_training += 1
+        if self._updates_since_training < max(1, self._size // 10):
+            return
+        list_sizes = np.bincount(self._assignments[:self._size], minlength=self.num_lists)
+        if self._size < self.num_lists or list_sizes.max() > MAX_LIST_IMBALANCE * self._size / self.num_lists:
+            self.train_quantizer()
+
+    def train_quantizer(self, iterations=10, seed=0):
+        """Runs spherical k-means over the indexed embeddings to build the IVF lists."""
+        with self._lock:
+            self._updates_since_training = 0
+            if self.num_lists <= 0 or self._size < self.num_lists:
+                self._centroids = None
+                return False
+            data = np.asarray(self._matrix[:self._size], dtype=np.float32)
+            rng = np.random.default_rng(seed)
+            centroids = data[rng.choice(self._size, self.num_lists, replace=False)].copy()
+            for _ in range(iterations):
+                assignments = np.argmax(data @ centroids.T, axis=1)
+                for list_id in range(self.num_lists):
+                    members = data[assignments == list_id]
+                    if len(members):
+                        centroid = members.sum(axis=0)
+                        centroids[list_id] = centroid / max(float(np.linalg.norm(centroid)), 1e-10)
+            self._centroids = centroids
+            self._ensure_capacity(self._size)
+            self._assignments[:self._size] = self._nearest_centroid(data)
+            return True
+
+    # --- Search ---
+    def search(self, query, top_k=5):
+        """
+        Returns the top_k most similar users as a list of (user_id, cosine_similarity).
+        """
+        query = np.asarray(query, dtype=np.float32).reshape(self.dim)
+        query = query / max(float(np.linalg.norm(query)), 1e-10)
+        with self._lock:
+            if self._size == 0:
+                return []
+            matrix = self._matrix[:self._size]
+            rows = None
+            if self._centroids is not None:
+                assignments = self._assignments[:self._size]
+                list_order = np.argsort(self._centroids @ query)[::-1]
+                # Probe further lists while the closest ones hold fewer than top_k rows (e.g. after removes).
+                covered = np.cumsum(np.bincount(assignments, minlength=len(list_order))[list_order])
+                num_probe = max(self.num_probe, int(np.searchsorted(covered, min(int(top_k), self._size))) + 1)
+                rows = np.flatnonzero(np.isin(assignments, list_order[:num_probe]))
+                matrix = matrix[rows]
+            scores = matrix.astype(np.float32, copy=False) @ query
+            k = min(int(top_k), len(scores))
+            if k <= 0:
+                return []
+            best = np.argpartition(-scores, k - 1)[:k]
+            best = best[np.argsort(-scores[best])]
+            if rows is not None:
+                return [(self._user_ids[rows[i]], float(scores[i])) for i in best]
+            return [(self._user_ids[i], float(scores[i])) for i in best]
+
+    # --- Persistence ---
+    def save(self, index_dir):
+        """Writes the matrix (.npy), user ids and quantizer state to index_dir."""
+        os.makedirs(index_dir, exist_ok=True)
+        with self._lock:
+            np.save(os.path.join(index_dir, 'embeddings.tmp.npy'), np.ascontiguousarray(self._matrix[:self._size]))
+            np.save(os.path.join(index_dir, 'assignments.tmp.npy'), self._assignments[:self._size])
+            replaced = ['embeddings.npy', 'assignments.npy']
+            if self._centroids is not None:
+                np.save(os.path.join(index_dir, 'centroids.tmp.npy'), self._centroids)
+                replaced.append('centroids.npy')
+            with open(os.path.join(index_dir, 'user_ids.tmp.json'), 'w') as f:
+                json.dump({"dim": self.dim, "dtype": self.dtype.name, "user_ids": self._user_ids}, f)
+            # user_ids.json goes last: it marks the save as complete.
+            for name in replaced + ['user_ids.json']:
+                base, ext = os.path.splitext(name)
+                os.replace(os.path.join(index_dir, f"{base}.tmp{ext}"), os.path.join(index_dir, name))
+            if self._centroids is None and os.path.exists(os.path.join(index_dir, 'centroids.npy')):
+                os.remove(os.path.join(index_dir, 'centroids.npy'))
+
+    @classmethod
+    def load(cls, index_dir, num_lists=0, num_probe=4, logger=None):
+        """Loads an index saved by save(); the matrix is memory-mapped read-only
+        and copied only when the index is first modified."""
+        with open(os.path.join(index_dir, 'user_ids.json')) as f:
+            meta = json.load(f)
+        index = cls(meta["dim"], dtype=meta["dtype"], num_lists=num_lists, num_probe=num_probe, logger=logger)
+        index._matrix = np.load(os.path.join(index_dir, 'embeddings.npy'), mmap_mode='r')
+        index._size = len(meta["user_ids"])
+        index._user_ids = list(meta["user_ids"])
+        index._row_of = {user_id: row for row, user_id in enumerate(index._user_ids)}
+        index._assignments = np.load(os.path.join(index_dir, 'assignments.npy'))
+        centroids_path = os.path.join(index_dir, 'centroids.npy')
+        if num_lists > 0 and os.path.exists(centroids_path):
+            index._centroids = np.load(centroids_path)
+        return index
+
+
+def _index_dir(app_config):
+    return os.path.join(app_config.get('MODELS_DIR'), app_config.get('AI_INDEX_DIRNAME', '_index'))
+
+
+def _build_index_from_templates(app_config, num_lists, num_probe, logger):
+    """Builds an index from the templates already stored under MODELS_DIR."""
+    models_dir = app_config.get('MODELS_DIR')
+    template_name = app_config.get('AI_TEMPLATE_FILENAME', 'embedding.npy')
+    if not models_dir or not os.path.isdir(models_dir):
+        return None
+
+    index = None
+    for user_id in sorted(os.listdir(models_dir)):
+        template_path = os.path.join(models_dir, user_id, template_name)
+        if not os.path.isfile(template_path):
+            continue
+        template = np.load(template_path)
+        if index is None:
+            index = EmbeddingIndex(template.shape[-1], dtype=app_config.get('AI_INDEX_DTYPE', 'float32'),
+                                   num_lists=num_lists, num_probe=num_probe, logger=logger)
+        index.add(user_id, template)
+    if index is not None:
+        logger.info(f"Built embedding index with {len(index)} users from stored templates.")
+    return index
+
+
+def _saved_version(index_dir):
+    """Identifies the saved index: user_ids.json is replaced last by every save."""
+    try:
+        stat = os.stat(os.path.join(index_dir, 'user_ids.json'))
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+@contextlib.contextmanager
+def _index_file_lock(index_dir, exclusive):
+    """Locks the saved index across processes: shared to load it, exclusive to modify it."""
+    if fcntl is None or (not exclusive and not os.path.isdir(index_dir)):
+        yield
+        return
+    os.makedirs(index_dir, exist_ok=True)
+    with open(os.path.join(index_dir, '.lock'), 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _refresh_shared_index(app_config, index_dir, dim, logger):
+    """Returns the process-wide index, (re)loading it if the saved index changed. Caller holds the file lock."""
+    global _shared_index, _shared_index_version
+    saved_version = _saved_version(index_dir)
+    with _shared_index_lock:
+        if _shared_index is not None and saved_version in (None, _shared_index_version):
+            return _shared_index
+        num_lists = int(app_config.get('AI_INDEX_NUM_LISTS', 0))
+        num_probe = int(app_config.get('AI_INDEX_NUM_PROBE', 4))
+        if saved_version is not None:
+            _shared_index = EmbeddingIndex.load(index_dir, num_lists=num_lists, num_probe=num_probe, logger=logger)
+            _shared_index_version = saved_version
+            logger.info(f"Loaded embedding index with {len(_shared_index)} users from {index_dir}")
+        else:
+            _shared_index = _build_index_from_templates(app_config, num_lists, num_probe, logger)
+        if _shared_index is None and dim is not None:
+            dtype = app_config.get('AI_INDEX_DTYPE', 'float32')
+            _shared_index = EmbeddingIndex(dim, dtype=dtype, num_lists=num_lists, num_probe=num_probe, logger=logger)
+        return _shared_index
+
+
+def get_embedding_index(app_config, dim=None, logger=None):
+    """Returns the process-wide index, creating it on first use.
+
+    The index is loaded from disk if it was saved before, otherwise it is built
+    from stored user templates. Returns None if neither exists and `dim` is not given.
+    It is reloaded when another process (e.g. a training job) saved a newer index.
+    """
+    if logger is None:
+        logger = module_logger
+    index_dir = _index_dir(app_config)
+    saved_version = _saved_version(index_dir)
+    with _shared_index_lock:
+        if _shared_index is not None and saved_version in (None, _shared_index_version):
+            return _shared_index
+    with _index_file_lock(index_dir, exclusive=False):
+        return _refresh_shared_index(app_config, index_dir, dim, logger)
+
+
+def _save_shared_index(index, index_dir):
+    global _shared_index_version
+    index.save(index_dir)
+    with _shared_index_lock:
+        if index is _shared_index:
+            _shared_index_version = _saved_version(index_dir)
+
+
+def update_embedding_index(app_config, update, dim=None, logger=None):
+    """
+    Applies update(index) to the latest saved index and saves it if update returns True.
+
+    The update runs under an exclusive file lock, so enrollments and removals
+    in other processes are reloaded first instead of being overwritten.
+
+    Returns:
+        bool: What update returned, or False if there is no index to update.
+    """
+    if logger is None:
+        logger = module_logger
+    index_dir = _index_dir(app_config)
+    with _update_lock, _index_file_lock(index_dir, exclusive=True):
+        index = _refresh_shared_index(app_config, index_dir, dim, logger)
+        if index is None:
+            return False
+        changed = update(index)
+        if changed:
+            _save_shared_index(index, index_dir)
+        return changed
+
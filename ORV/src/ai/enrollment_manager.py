@@ -0,0 +1,188 @@
+import os
+import numpy as np
+from flask import current_app
+import logging
+
+from .backbone import get_shared_backbone
+from .model_components import preprocess_face_image
+from .image_decoding import read_image_for_size
+from .model_cache import invalidate_user_models
+from .embedding_index import update_embedding_index
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+
+def l2_normalize(vectors, axis=-1, epsilon=1e-10):
+    """Scales vectors to unit length so a dot product is their cosine similarity."""
+    norms = np.linalg.norm(vectors, axis=axis, keepdims=True)
+    return vectors / np.maximum(norms, epsilon)
+
+
+def compute_image_embeddings(image_paths, app_config, logger=None):
+    """
+    Runs the shared VGGFace backbone over images in batches.
+
+    Args:
+        image_paths (list): Paths of the images to embed.
+        app_config (dict): Application configuration.
+        logger: Optional logger instance.
+
+    Returns:
+        np.ndarray: (N, D) L2-normalized embeddings of the images that could be read.
+    """
+    if logger is None:
+        logger = current_app.logger if current_app else logging.getLogger(__name__)
+
+    image_size_config = app_config.get('AI_MODEL_INPUT_SIZE', (224, 224))
+    cv_image_size = (image_size_config[1], image_size_config[0])
+    preprocess_version = int(app_config.get('AI_VGGFACE_PREPROCESS_VERSION', 1))
+    batch_size = int(app_config.get('AI_EMBEDDING_BATCH_SIZE', 32))
+
+    backbone = get_shared_backbone(app_config, logger=logger)
+    embedding_batches = []
+
+    # --- Batched Embedding ---
+    for start in range(0, len(image_paths), batch_size):
+        batch_images = []
+        for img_path in image_paths[start:start + batch_size]:
+            img = read_image_for_size(img_path, cv_image_size)
+            if img is None:
+                logger.warning(f"Could not read image {img_path}. Skipping.")
+                continue
+            batch_images.append(preprocess_face_image(img, cv_image_size, preprocess_version))
+        if batch_images:
+            embedding_batches.append(backbone.compute_features(np.stack(batch_images)))
+
+    if not embedding_batches:
+        return np.empty((0, backbone.feature_dim), dtype=np.float32)
+    return l2_normalize(np.concatenate(embedding_batches))
+
+
+def generate_user_template_embedding(embeddings):
+    """Averages per-image embeddings into a single normalized template."""
+    if len(embeddings) == 0:
+        return None
+    return l2_normalize(np.mean(embeddings, axis=0)).astype(np.float32)
+
+
+def get_template_path(user_id, app_config):
+    """
+    Returns the path of a user's template under MODELS_DIR.
+
+    Raises:
+        ValueError: If user_id would resolve outside MODELS_DIR.
+    """
+    models_dir = os.path.realpath(app_config.get('MODELS_DIR'))
+    user_dir = os.path.realpath(os.path.join(models_dir, str(user_id)))
+    if os.path.dirname(user_dir) != models_dir:
+        raise ValueError(f"Invalid user id: {user_id!r}")
+    return os.path.join(user_dir, app_config.get('AI_TEMPLATE_FILENAME', 'embedding.npy'))
+
+
+def save_user_embedding(template_path, embedding_array):
+    """Writes the template atomically so verification never reads a partial file."""
+    os.makedirs(os.path.dirname(template_path), exist_ok=True)
+    tmp_path = f"{template_path}.tmp.npy"
+    np.save(tmp_path, embedding_array)
+    os.replace(tmp_path, template_path)
+
+
+def load_user_embedding(template_path):
+    return np.load(template_path)
+
+
+def enroll_user_template(user_id: str, source_image_dir: str, app_config: dict, logger=None):
+    """
+    Enrolls a user by embedding their uploaded images and storing the mean template.
+    Replaces per-user training when AI_VERIFICATION_MODE is 'template'.
+
+    Returns:
+        bool: True if enrollment succeeded, False otherwise.
+        str: Message indicating status.
+    """
+    if logger is None:
+        logger = current_app.logger if current_app else logging.getLogger(__name__)
+
+    logger.info(f"Starting template enrollment for user_id: {user_id}")
+
+    # --- Image Discovery ---
+    if not os.path.isdir(source_image_dir):
+        msg = f"Source image directory not found: {source_image_dir}"
+        logger.error(msg)
+        return False, msg
+
+    image_paths = sorted(
+        os.path.join(source_image_dir, f) for f in os.listdir(source_image_dir)
+        if f.lower().endswith(IMAGE_EXTENSIONS)
+    )
+    if not image_paths:
+        msg = f"No images found for user {user_id} in {source_image_dir}"
+        logger.error(msg)
+        return False, msg
+
+    # --- Embedding and Template Generation ---
+    try:
+        embeddings = compute_image_embeddings(image_paths, app_config, logger=logger)
+    except Exception as e:
+        logger.error(f"Failed to compute embeddings for user {user_id}: {e}", exc_info=True)
+        return False, f"Embedding computation failed: {e}"
+
+    template = generate_user_template_embedding(embeddings)
+    if template is None:
+        msg = f"Could not embed any image for user {user_id}."
+        logger.error(msg)
+        return False, msg
+
+    # --- Save Template ---
+    try:
+        template_path = get_template_path(user_id, app_config)
+        save_user_embedding(template_path, template)
+    except Exception as e:
+        logger.error(f"Failed to save template for user {user_id}: {e}")
+        return False, f"Template saving failed: {e}"
+
+    invalidate_user_models(user_id)
+
+    # --- Identification Index Update ---
+    try:
+        def add_template(index):
+            index.add(user_id, template)
+            return True
+        update_embedding_index(app_config, add_template, dim=template.shape[-1], logger=logger)
+    except Exception as e:
+        logger.error(f"Failed to add user {user_id} to the identification index: {e}", exc_info=True)
+
+    msg = f"Template enrollment completed for user {user_id} from {len(embeddings)} images. Saved at {template_path}"
+    logger.info(msg)
+    return True, msg
+
+
+def remove_user_template(user_id: str, app_config: dict, logger=None):
+    """
+    Deletes a user's enrolled template and removes them from the identification index.
+
+    Returns:
+        bool: True if the user had a template or index entry, False otherwise.
+        str: Message indicating status.
+
+    Raises:
+        ValueError: If user_id would resolve outside MODELS_DIR.
+    """
+    if logger is None:
+        logger = current_app.logger if current_app else logging.getLogger(__name__)
+
+    removed = False
+    template_path = get_template_path(user_id, app_config)
+    if os.path.exists(template_path):
+        os.remove(template_path)
+        removed = True
+    invalidate_user_models(user_id)
+
+    if update_embedding_index(app_config, lambda index: index.remove(user_id), logger=logger):
+        removed = True
+
+    if not removed:
+        return False, f"No enrollment found for user {user_id}."
+    msg = f"Enrollment removed for user {user_id}."
+    logger.info(msg)
+    return True, msg
@@ -0,0 +1,129 @@
+import threading
+import cv2 as cv
+import numpy as np
+
+from .image_decoding import decode_image_for_size
+
+HAAR_CASCADE_PATH = cv.data.haarcascades + 'haarcascade_frontalface_default.xml'
+
+# CascadeClassifier instances are not safe to share between threads.
+_thread_local = threading.local()
+
+
+def _get_face_cascade():
+    cascade = getattr(_thread_local, "face_cascade", None)
+    if cascade is None:
+        cascade = cv.CascadeClassifier(HAAR_CASCADE_PATH)
+        if cascade.empty():
+            raise RuntimeError(f"Could not load the face cascade from {HAAR_CASCADE_PATH}")
+        _thread_local.face_cascade = cascade
+    return cascade
+
+
+def detect_largest_face(img_bgr, detection_size=640, min_face_size=50):
+    """
+    Finds the largest frontal face in a BGR image.
+
+    Detection runs on a copy downscaled so its longer side is at most
+    detection_size; the returned box is in the coordinates of img_bgr.
+
+    Returns:
+        tuple: (x, y, w, h) of the largest face, or None if no face was found.
+    """
+    h, w = img_bgr.shape[:2]
+    scale = min(1.0, float(detection_size) / max(h, w))
+    gray = cv.cvtColor(img_bgr, cv.COLOR_BGR2GRAY)
+    if scale < 1.0:
+        gray = cv.resize(gray, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv.INTER_AREA)
+
+    min_size = max(1, int(min_face_size * scale))
+    faces = _get_face_cascade().detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(min_size, min_size))
+    if len(faces) == 0:
+        return None
+
+    x, y, fw, fh = max(faces, key=lambda box: box[2] * box[3])
+    return (int(x / scale), int(y / scale), int(fw / scale), int(fh / scale))
+
+
+def crop_face(img_bgr, face_box, output_size=(224, 224), padding=0.2):
+    """Cuts a square crop around face_box, padded by a fraction of the face size, resized to output_size."""
+    h, w = img_bgr.shape[:2]
+    x, y, fw, fh = face_box
+    side = int(max(fw, fh) * (1.0 + 2.0 * padding))
+    center_x, center_y = x + fw // 2, y + fh // 2
+    x1 = max(0, center_x - side // 2)
+    y1 = max(0, center_y - side // 2)
+    x2 = min(w, x1 + side)
+    y2 = min(h, y1 + side)
+    face_crop = img_bgr[y1:y2, x1:x2]
+    return cv.resize(face_crop, tuple(output_size), interpolation=cv.INTER_AREA)
+
+
+def decode_face_crop(image_bytes, app_config):
+    """
+    Decodes an uploaded frame and returns the fixed-size face crop used by training and verification.
+
+    Args:
+        image_bytes (bytes): Encoded image.
+        app_config (dict): Application configuration (AI_FACE_* and AI_MODEL_INPUT_SIZE).
+
+    Returns:
+        np.ndarray: (H, W, 3) BGR face crop, or None if the frame could not be decoded.
+        str: None on success, otherwise the reason the frame was rejected.
+    """
+    detection_size = int(app_config.get('AI_FACE_DETECTION_SIZE', 640))
+    img = decode_image_for_size(image_bytes, (detection_size, detection_size))
+    if img is None:
+        return None, "Could not decode image"
+    return crop_largest_face(img, app_config)
+
+
+def crop_largest_face(img_bgr, app_config):
+    """
+    Returns the fixed-size crop of the largest face in an already decoded frame.
+
+    Returns:
+        np.ndarray: (H, W, 3) BGR face crop, or None if no face was found.
+        str: None on success, otherwise "No face detected".
+    """
+    image_size_config = app_config.get('AI_MODEL_INPUT_SIZE', (224, 224))
+    crop_size = (image_size_config[1], image_size_config[0])
+
+    face_box = detect_largest_face(
+        img_bgr,
+        detection_size=int(app_config.get('AI_FACE_DETECTION_SIZE', 640)),
+        min_face_size=int(app_config.get('AI_FACE_MIN_SIZE', 50))
+    )
+    if face_box is None:
+        return None, "No face detected"
+
+    return crop_face(img_bgr, face_box, crop_size, float(app_config.get('AI_FACE_CROP_PADDING', 0.2))), None
+
+
+def decode_model_frame(image_bytes, app_config):
+    """
+    Decodes an image into the uint8 BGR frame the model consumes (AI_MODEL_INPUT_SIZE).
+
+    With AI_FACE_CROP_ENABLED the frame is the face crop, cut exactly as at ingest.
+
+    Returns:
+        np.ndarray: (H, W, 3) uint8 frame, or None if undecodable or no face was found.
+    """
+    if app_config.get('AI_FACE_CROP_ENABLED', False):
+        face_crop, _ = decode_face_crop(image_bytes, app_config)
+        return face_crop
+
+    image_size_config = app_config.get('AI_MODEL_INPUT_SIZE', (224, 224))
+    cv_image_size = (image_size_config[1], image_size_config[0])
+    img = decode_image_for_size(image_bytes, cv_image_size)
+    if img is None:
+        return None
+    return cv.resize(img, cv_image_size)
+
+
+def encode_face_crop(face_crop, quality=95):
+    """Encodes a face crop (or any BGR frame) as JPEG bytes."""
+    ok, encoded = cv.imencode('.jpg', face_crop, [cv.IMWRITE_JPEG_QUALITY, int(quality)])
+    if not ok:
+        raise ValueError("Could not encode face crop")
+    return np.asarray(encoded).tobytes()
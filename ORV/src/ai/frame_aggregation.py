@@ -0,0 +1,47 @@
+import numpy as np
+
+AGGREGATION_METHODS = ('mean', 'median', 'vote')
+
+
+def aggregate_frame_scores(scores, threshold, method='mean'):
+    """
+    Combines per-frame scores into one decision.
+
+    'mean' and 'median' compare the aggregate score to the threshold. 'vote'
+    returns the fraction of frames at or above the threshold and matches on a
+    strict majority.
+
+    Returns:
+        tuple: (aggregate_score: float, is_match: bool)
+    """
+    scores = np.asarray(scores, dtype=np.float32)
+    if method == 'vote':
+        aggregate = float(np.mean(scores >= threshold))
+        return aggregate, aggregate > 0.5
+    if method == 'median':
+        aggregate = float(np.median(scores))
+    else:
+        aggregate = float(np.mean(scores))
+    return aggregate, aggregate >= threshold
+
+
+def is_decision_settled(scores, total_frames, threshold, method='mean', margin=0.2, min_frames=2):
+    """
+    Returns True when scoring the remaining frames is not expected to change the decision.
+
+    For 'vote' this is exact: a majority of all frames has already been reached
+    either way. For 'mean' and 'median' the aggregate of the frames scored so far
+    must be at least `margin` away from the threshold.
+    """
+    num_scored = len(scores)
+    if num_scored >= total_frames:
+        return True
+    if num_scored < min_frames:
+        return False
+
+    if method == 'vote':
+        votes_for = int(np.sum(np.asarray(scores) >= threshold))
+        return votes_for * 2 > total_frames or (num_scored - votes_for) * 2 >= total_frames
+
+    aggregate, _ = aggregate_frame_scores(scores, threshold, method)
+    return abs(aggregate - threshold) >= margin
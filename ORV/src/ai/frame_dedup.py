@@ -0,0 +1,66 @@
+import cv2 as cv
+import numpy as np
+
+# dHash compares horizontally adjacent pixels of a (DHASH_SIZE, DHASH_SIZE + 1) grayscale thumbnail.
+DHASH_SIZE = 8
+
+# Number of set bits for every byte value, for vectorized popcounts.
+_POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+
+def dhash_thumbnail(img_bgr):
+    """Returns the small grayscale thumbnail a frame's dHash is computed from."""
+    gray = cv.cvtColor(img_bgr, cv.COLOR_BGR2GRAY) if img_bgr.ndim == 3 else img_bgr
+    return cv.resize(gray, (DHASH_SIZE + 1, DHASH_SIZE), interpolation=cv.INTER_AREA)
+
+
+def dhash_bits(thumbnails):
+    """
+    Computes the dHashes of a batch of thumbnails at once.
+
+    Args:
+        thumbnails (np.ndarray): (N, DHASH_SIZE, DHASH_SIZE + 1) grayscale thumbnails.
+
+    Returns:
+        np.ndarray: (N, DHASH_SIZE * DHASH_SIZE / 8) uint8 packed hashes.
+    """
+    thumbnails = np.asarray(thumbnails, dtype=np.int16)
+    bits = thumbnails[:, :, 1:] > thumbnails[:, :, :-1]
+    return np.packbits(bits.reshape(len(thumbnails), -1), axis=1)
+
+
+def hamming_distances(hashes):
+    """Returns the (N, N) matrix of Hamming distances between packed hashes."""
+    return _POPCOUNT[hashes[:, None, :] ^ hashes[None, :, :]].sum(axis=2, dtype=np.int32)
+
+
+def select_diverse_frames(thumbnails, max_distance=5, max_frames=None):
+    """
+    Picks the frames to keep from one upload, in capture order.
+
+    A frame is dropped as a near-duplicate when its dHash is within max_distance
+    bits of a frame already kept. If more than max_frames remain, the most
+    mutually distant ones are kept (farthest-point selection).
+
+    Returns:
+        list: Sorted indices of the frames to keep.
+    """
+    if len(thumbnails) == 0:
+        return []
+    distances = hamming_distances(dhash_bits(thumbnails))
+
+    kept = []
+    for index in range(len(distances)):
+        if not kept or distances[index, kept].min() > max_distance:
+            kept.append(index)
+
+    if max_frames is not None and len(kept) > max_frames:
+        candidate_distances = distances[np.ix_(kept, kept)]
+        selected = [0]
+        nearest_selected = candidate_distances[0].copy()
+        for _ in range(max_frames - 1):
+            next_candidate = int(nearest_selected.argmax())
+            selected.append(next_candidate)
+            nearest_selected = np.minimum(nearest_selected, candidate_distances[next_candidate])
+        kept = [kept[i] for i in selected]
+    return sorted(kept)
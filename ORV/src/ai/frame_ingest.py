@@ -0,0 +1,108 @@
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import cv2 as cv
+
+from .image_decoding import decode_image_for_size
+from .face_detection import crop_largest_face, encode_face_crop
+from .frame_dedup import dhash_thumbnail
+
+# --- Shared Ingest Pool for Uploaded Frames ---
+_ingest_pool = None
+_ingest_pool_lock = threading.Lock()
+
+
+def get_ingest_pool(app_config):
+    """Returns the process-wide thread pool that normalizes uploaded frames (OpenCV releases the GIL)."""
+    global _ingest_pool
+    with _ingest_pool_lock:
+        if _ingest_pool is None:
+            _ingest_pool = ThreadPoolExecutor(
+                max_workers=int(app_config.get('INGEST_WORKERS', 4)),
+                thread_name_prefix="frame-ingest"
+            )
+        return _ingest_pool
+
+
+def downscale_to_short_side(img, short_side):
+    """Resizes img so its shorter side is short_side, keeping the aspect ratio; smaller images are kept as is."""
+    h, w = img.shape[:2]
+    scale = float(short_side) / min(h, w)
+    if scale >= 1.0:
+        return img
+    return cv.resize(img, (max(1, round(w * scale)), max(1, round(h * scale))), interpolation=cv.INTER_AREA)
+
+
+def normalize_image(img, app_config):
+    """
+    Turns a decoded frame into the image that is stored for training.
+
+    With AI_FACE_CROP_ENABLED this is the face crop; with INGEST_NORMALIZE_ENABLED the
+    frame downscaled so its short side is INGEST_SHORT_SIDE; otherwise the frame itself.
+
+    Returns:
+        np.ndarray: BGR image, or None if the frame was rejected.
+        str: None on success, otherwise the reason the frame was rejected.
+    """
+    if app_config.get('AI_FACE_CROP_ENABLED', False):
+        return crop_largest_face(img, app_config)
+    if app_config.get('INGEST_NORMALIZE_ENABLED', False):
+        return downscale_to_short_side(img, int(app_config.get('INGEST_SHORT_SIDE', 256))), None
+    return img, None
+
+
+def normalize_frame(image_bytes, app_config):
+    """Decodes an uploaded frame once, at the smallest size normalize_image needs, and normalizes it."""
+    if app_config.get('AI_FACE_CROP_ENABLED', False):
+        decode_size = int(app_config.get('AI_FACE_DETECTION_SIZE', 640))
+    else:
+        decode_size = int(app_config.get('INGEST_SHORT_SIDE', 256))
+    img = decode_image_for_size(image_bytes, (decode_size, decode_size))
+    if img is None:
+        return None, "Could not decode image"
+    return normalize_image(img, app_config)
+
+
+def _write_frame(frame, output_path, app_config):
+    """Encodes a normalized frame to output_path and returns its dHash thumbnail."""
+    if app_config.get('AI_FACE_CROP_ENABLED', False):
+        quality = app_config.get('AI_FACE_CROP_JPEG_QUALITY', 95)
+    else:
+        quality = app_config.get('INGEST_JPEG_QUALITY', 90)
+    with open(output_path, 'wb') as f:
+        f.write(encode_face_crop(frame, quality))
+    return dhash_thumbnail(frame)
+
+
+def ingest_frame(source_path, output_path, app_config, original_path=None):
+    """
+    Normalizes the frame at source_path into a JPEG at output_path and removes source_path.
+
+    If original_path is given the received file is moved there instead of being deleted.
+
+    Returns:
+        np.ndarray: The frame's dHash thumbnail (for near-duplicate removal), or None if rejected.
+        str: None on success, otherwise the reason the frame was rejected.
+    """
+    try:
+        with open(source_path, 'rb') as f:
+            frame, error = normalize_frame(f.read(), app_config)
+        if frame is None:
+            return None, error
+        thumbnail = _write_frame(frame, output_path, app_config)
+        if original_path:
+            os.makedirs(os.path.dirname(original_path), exist_ok=True)
+            shutil.move(source_path, original_path)
+        return thumbnail, None
+    finally:
+        if os.path.exists(source_path):
+            os.remove(source_path)
+
+
+def ingest_decoded_frame(frame, output_path, app_config):
+    """ingest_frame for a frame that is already decoded (sampled from an uploaded video)."""
+    frame, error = normalize_image(frame, app_config)
+    if frame is None:
+        return None, error
+    return _write_frame(frame, output_path, app_config), None
@@ -0,0 +1,92 @@
+import os
+import numpy as np
+
+# Layer names of the classifier head added by build_vggface_classifier.
+HIDDEN_LAYER_NAME = "fc1"
+BATCH_NORM_LAYER_NAME = "bn1"
+OUTPUT_LAYER_NAME = "classifier"
+
+
+def extract_head_weights(model):
+    """
+    Extracts the classifier head (fc1 -> bn1 -> relu -> classifier) of a trained
+    VGGFace classifier as plain NumPy arrays.
+
+    The inference-mode batch normalization is folded into the fc1 kernel and bias,
+    so evaluating the head is a single matmul, a ReLU and a dot product.
+    Dropout is the identity at inference time and is omitted.
+
+    Returns:
+        dict: hidden_kernel (F, H), hidden_bias (H,), output_kernel (H,), output_bias ().
+    """
+    fc1_kernel, fc1_bias = model.get_layer(HIDDEN_LAYER_NAME).get_weights()
+    bn_layer = model.get_layer(BATCH_NORM_LAYER_NAME)
+    gamma, beta, moving_mean, moving_variance = bn_layer.get_weights()
+    output_kernel, output_bias = model.get_layer(OUTPUT_LAYER_NAME).get_weights()
+
+    bn_scale = gamma / np.sqrt(moving_variance + bn_layer.epsilon)
+    return {
+        "hidden_kernel": (fc1_kernel * bn_scale).astype(np.float32),
+        "hidden_bias": ((fc1_bias - moving_mean) * bn_scale + beta).astype(np.float32),
+        "output_kernel": output_kernel[:, 0].astype(np.float32),
+        "output_bias": np.float32(output_bias[0]),
+    }
+
+
+def evaluate_head(head_weights, features):
+    """
+    Evaluates a head on backbone features.
+
+    Args:
+        head_weights (dict): Arrays as returned by extract_head_weights.
+        features (np.ndarray): (N, F) pooled backbone features.
+
+    Returns:
+        np.ndarray: (N,) sigmoid probabilities that each feature belongs to the user.
+    """
+    hidden = np.maximum(features @ head_weights["hidden_kernel"] + head_weights["hidden_bias"], 0.0)
+    logits = hidden @ head_weights["output_kernel"] + head_weights["output_bias"]
+    return 1.0 / (1.0 + np.exp(-logits))
+
+
+def save_head_weights(head_weights, head_path):
+    """Writes the head atomically so a concurrent reader never sees a partial file."""
+    os.makedirs(os.path.dirname(head_path) or '.', exist_ok=True)
+    tmp_path = f"{head_path}.tmp.npz"
+    np.savez(tmp_path, **head_weights)
+    os.replace(tmp_path, head_path)
+
+
+def load_head_weights(head_path):
+    with np.load(head_path) as data:
+        return {name: data[name] for name in data.files}
+
+
+def head_accuracy(head_weights, features, labels):
+    """Fraction of features the head classifies correctly at the 0.5 threshold."""
+    probabilities = evaluate_head(head_weights, features)
+    return float(np.mean((probabilities >= 0.5) == (np.asarray(labels).reshape(-1) >= 0.5)))
+
+
+def promote_head(candidate_weights, head_path, features=None, labels=None):
+    """
+    Replaces the live head at head_path with a newly trained candidate, atomically,
+    unless the head already there scores better on the validation features.
+
+    Without validation features, or without a previous head, the candidate is
+    always promoted.
+
+    Returns:
+        bool: True if the candidate became the live head.
+        str: Message indicating which head was kept and why.
+    """
+    if features is None or len(features) == 0 or not os.path.exists(head_path):
+        save_head_weights(candidate_weights, head_path)
+        return True, "Trained head saved."
+    candidate_accuracy = head_accuracy(candidate_weights, features, labels)
+    previous_accuracy = head_accuracy(load_head_weights(head_path), features, labels)
+    if candidate_accuracy < previous_accuracy:
+        return False, (f"Kept the previous head: validation accuracy {previous_accuracy:.4f} "
+                       f"beats the retrained head's {candidate_accuracy:.4f}.")
+    save_head_weights(candidate_weights, head_path)
+    return True, f"Retrained head saved (validation accuracy {candidate_accuracy:.4f}, previous {previous_accuracy:.4f})."
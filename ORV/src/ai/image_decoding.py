@@ -0,0 +1,115 @@
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import cv2 as cv
+import numpy as np
+
+# JPEG start-of-frame markers that carry the image dimensions (excludes DHT, JPG and DAC).
+_JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+# DCT-domain scale factors libjpeg can decode to directly, largest first.
+_REDUCED_COLOR_FLAGS = (
+    (8, cv.IMREAD_REDUCED_COLOR_8),
+    (4, cv.IMREAD_REDUCED_COLOR_4),
+    (2, cv.IMREAD_REDUCED_COLOR_2),
+)
+
+# --- Shared Decode Pool for Multi-frame Requests ---
+_decode_pool = None
+_decode_pool_lock = threading.Lock()
+
+
+def get_decode_pool(app_config):
+    """Returns the process-wide thread pool used to decode the frames of one request in parallel."""
+    global _decode_pool
+    with _decode_pool_lock:
+        if _decode_pool is None:
+            _decode_pool = ThreadPoolExecutor(
+                max_workers=int(app_config.get('AI_MULTI_FRAME_DECODE_WORKERS', 4)),
+                thread_name_prefix="frame-decode"
+            )
+        return _decode_pool
+
+
+def read_jpeg_size(data):
+    """
+    Reads (width, height) from a JPEG header without decoding the image.
+
+    Args:
+        data (bytes): At least the beginning of a JPEG file (up to and including the SOF segment).
+
+    Returns:
+        tuple: (width, height), or None if data is not a parseable JPEG.
+    """
+    if len(data) < 4 or data[0] != 0xFF or data[1] != 0xD8:
+        return None
+    offset = 2
+    while offset + 4 <= len(data):
+        if data[offset] != 0xFF:
+            return None
+        marker = data[offset + 1]
+        if marker == 0xFF:
+            offset += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            offset += 2
+            continue
+        segment_length = struct.unpack('>H', data[offset + 2:offset + 4])[0]
+        if marker in _JPEG_SOF_MARKERS:
+            if offset + 9 > len(data):
+                return None
+            height, width = struct.unpack('>HH', data[offset + 5:offset + 9])
+            return width, height
+        if marker == 0xDA:
+            return None
+        offset += 2 + segment_length
+    return None
+
+
+def choose_reduced_decode_flag(image_size, target_size):
+    """
+    Picks the largest libjpeg reduction that still leaves at least target_size pixels.
+
+    Args:
+        image_size (tuple): (width, height) of the encoded image.
+        target_size (tuple): (width, height) the image will be resized to.
+
+    Returns:
+        tuple: (scale_factor, imread_flag); (1, IMREAD_COLOR) if no reduction fits.
+    """
+    width, height = image_size
+    target_width, target_height = target_size
+    for factor, flag in _REDUCED_COLOR_FLAGS:
+        if width // factor >= target_width and height // factor >= target_height:
+            return factor, flag
+    return 1, cv.IMREAD_COLOR
+
+
+def decode_image_for_size(image_bytes, target_size):
+    """
+    Decodes image bytes to BGR, decoding JPEGs directly at a reduced resolution
+    whenever the result is still at least target_size (width, height).
+
+    Returns:
+        np.ndarray: BGR image, or None if the bytes could not be decoded.
+    """
+    buffer = np.frombuffer(image_bytes, np.uint8)
+    flag = cv.IMREAD_COLOR
+    jpeg_size = read_jpeg_size(image_bytes[:65536])
+    if jpeg_size is not None:
+        _, flag = choose_reduced_decode_flag(jpeg_size, target_size)
+    return cv.imdecode(buffer, flag)
+
+
+def read_image_for_size(image_path, target_size):
+    """File-path counterpart of decode_image_for_size, used by the training data loaders."""
+    flag = cv.IMREAD_COLOR
+    try:
+        with open(image_path, 'rb') as f:
+            header = f.read(65536)
+    except OSError:
+        return None
+    jpeg_size = read_jpeg_size(header)
+    if jpeg_size is not None:
+        _, flag = choose_reduced_decode_flag(jpeg_size, target_size)
+    return cv.imread(image_path, flag)
@@ -0,0 +1,162 @@
+import time
+import queue
+import threading
+import logging
+from concurrent.futures import Future
+import numpy as np
+
+module_logger = logging.getLogger(__name__)
+
+# --- Process-wide Executor Instance ---
+_shared_executor = None
+_shared_executor_lock = threading.Lock()
+
+
+class _InferenceRequest:
+    __slots__ = ("model_key", "predict_fn", "inputs", "future", "enqueued_at")
+
+    def __init__(self, model_key, predict_fn, inputs):
+        self.model_key = model_key
+        self.predict_fn = predict_fn
+        self.inputs = inputs
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class InferenceExecutor:
+    """
+    Dynamic micro-batching executor with a single dedicated inference thread.
+
+    Requests submitted from request threads are collected for up to
+    `max_wait_ms` or until `max_batch_size` images are waiting. Requests for
+    the same model are stacked into one batch, run through the model once, and
+    each caller's slice of the output is delivered through its Future.
+    """
+
+    def __init__(self, max_batch_size=16, max_wait_ms=5.0, logger=None):
+        self.max_batch_size = int(max_batch_size)
+        self.max_wait_seconds = float(max_wait_ms) / 1000.0
+        self.logger = logger if logger else module_logger
+
+        self._queue = queue.Queue()
+        self._stopped = threading.Event()
+        self.batches_run = 0
+        self.images_run = 0
+        self._thread = threading.Thread(target=self._run, name="inference-executor", daemon=True)
+        self._thread.start()
+
+    def submit(self, model_key, predict_fn, inputs):
+        """
+        Queues a batch of inputs for predict_fn.
+
+        Args:
+            model_key: Hashable identity of the model; only requests with equal keys are stacked.
+            predict_fn: Callable taking an (N, ...) array and returning N outputs along axis 0.
+            inputs (np.ndarray): (n, ...) inputs for this request.
+
+        Returns:
+            concurrent.futures.Future resolving to this request's (n, ...) outputs.
+        """
+        if self._stopped.is_set():
+            raise RuntimeError("Inference executor has been shut down.")
+        request = _InferenceRequest(model_key, predict_fn, inputs)
+        self._queue.put(request)
+        return request.future
+
+    def predict(self, model_key, predict_fn, inputs, timeout=None):
+        """Submits inputs and blocks until their outputs are available."""
+        return self.submit(model_key, predict_fn, inputs).result(timeout=timeout)
+
+    def stats(self):
+        return {
+            "batches_run": self.batches_run,
+            "images_run": self.images_run,
+            "queue_depth": self._queue.qsize(),
+        }
+
+    def shutdown(self):
+        self._stopped.set()
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+    # --- Batch Collection ---
+    def _collect_batch(self, first_request):
+        pending = [first_request]
+        num_images = len(first_request.inputs)
+        deadline = time.perf_counter() + self.max_wait_seconds
+        while num_images < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is None:
+                self._queue.put(None)
+                break
+            pending.append(request)
+            num_images += len(request.inputs)
+        return pending
+
+    def _run(self):
+        while not self._stopped.is_set():
+            first_request = self._queue.get()
+            if first_request is None:
+                break
+            pending = self._collect_batch(first_request)
+
+            groups = {}
+            for request in pending:
+                groups.setdefault(request.model_key, []).append(request)
+            for requests in groups.values():
+                self._run_group(requests)
+
+        # --- Fail Requests Left After Shutdown ---
+        while True:
+            try:
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is not None:
+                request.future.set_exception(RuntimeError("Inference executor has been shut down."))
+
+    def _run_group(self, requests):
+        try:
+            if len(requests) == 1:
+                stacked = requests[0].inputs
+            else:
+                stacked = np.concatenate([r.inputs for r in requests], axis=0)
+            outputs = requests[0].predict_fn(stacked)
+        except Exception as e:
+            self.logger.error(f"Batched inference failed for {len(requests)} requests: {e}", exc_info=True)
+            for request in requests:
+                request.future.set_exception(e)
+            return
+
+        self.batches_run += 1
+        self.images_run += len(stacked)
+        offset = 0
+        for request in requests:
+            count = len(request.inputs)
+            request.future.set_result(outputs[offset:offset + count])
+            offset += count
+
+
+def get_inference_executor(app_config):
+    """Returns the process-wide inference executor, starting it on first use."""
+    global _shared_executor
+    with _shared_executor_lock:
+        if _shared_executor is None:
+            _shared_executor = InferenceExecutor(
+                max_batch_size=int(app_config.get('AI_INFERENCE_MAX_BATCH_SIZE', 16)),
+                max_wait_ms=float(app_config.get('AI_INFERENCE_MAX_WAIT_MS', 5)),
+            )
+        return _shared_executor
+
+
+def get_executor_stats():
+    """Returns the executor's counters, or None if no executor was started in this process."""
+    with _shared_executor_lock:
+        executor = _shared_executor
+    return executor.stats() if executor is not None else None
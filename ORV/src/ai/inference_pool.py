@@ -0,0 +1,304 @@
+import queue
+import logging
+import importlib
+import itertools
+import threading
+import multiprocessing
+import multiprocessing.connection
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+import numpy as np
+
+module_logger = logging.getLogger(__name__)
+
+DEFAULT_SCORER = 'src.ai.verification_manager:score_user_frames'
+
+# --- Process-wide Pool Instance ---
+_shared_pool = None
+_shared_pool_lock = threading.Lock()
+
+
+def _resolve_scorer(scorer_path):
+    module_name, function_name = scorer_path.split(':')
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def _worker_main(worker_index, shm_name, num_slots, frame_shape, task_queue, result_conn, scorer_path, app_config):
+    """
+    Inference worker process: reads frames from the shared slot ring, scores them and returns small results.
+
+    Only slot indices and results cross the process boundary; frames are never pickled.
+    Results go over this worker's own pipe: a queue shared by all workers has a
+    cross-process write lock, and a worker killed while holding it would block the others.
+    """
+    # A worker scores in-process; it must not start a pool of its own.
+    app_config = dict(app_config, AI_INFERENCE_POOL_PROCESSES=0)
+
+    from .thread_limits import apply_thread_limits
+    apply_thread_limits(app_config, num_workers=app_config.get('AI_INFERENCE_POOL_NUM_WORKERS', 1))
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    slot_frames = np.ndarray((num_slots,) + tuple(frame_shape), dtype=np.uint8, buffer=shm.buf)
+    try:
+        scorer = _resolve_scorer(scorer_path)
+        if app_config.get('AI_WARMUP_ON_STARTUP', True) and not app_config.get('TESTING', False):
+            from .warmup import warm_up_inference
+            warm_up_inference(app_config)
+        result_conn.send(("ready", worker_index, None, None))
+
+        while True:
+            task = task_queue.get()
+            if task is None:
+                break
+            request_id, user_id, slots = task
+            try:
+                # Fancy indexing copies the frames out, so the slots can be reused as soon as we reply.
+                result = scorer(user_id, slot_frames[list(slots)], app_config)
+                result_conn.send(("result", request_id, result, None))
+            except Exception as e:
+                result_conn.send(("result", request_id, None, f"{type(e).__name__}: {e}"))
+    finally:
+        del slot_frames
+        shm.close()
+        result_conn.close()
+
+
+class _PoolRequest:
+    __slots__ = ("request_id", "slots", "future", "worker_index")
+
+    def __init__(self, request_id, slots, worker_index):
+        self.request_id = request_id
+        self.slots = slots
+        self.future = Future()
+        self.worker_index = worker_index
+
+
+class InferencePool:
+    """
+    A pool of spawned inference processes fed through a shared-memory ring of frame slots.
+
+    The web process writes decoded uint8 frames into free slots and sends only
+    (request_id, user_id, slot indices) to a worker. The worker calls the scorer
+    (a "module:function" path taking (user_id, frames, app_config)) and returns
+    its small, picklable result. A worker that dies fails its in-flight requests
+    and is restarted; the web process keeps serving.
+    """
+
+    def __init__(self, num_processes, frame_shape=(224, 224, 3), num_slots=64,
+                 scorer_path=DEFAULT_SCORER, app_config=None, logger=None):
+        self.num_processes = int(num_processes)
+        self.frame_shape = tuple(frame_shape)
+        self.num_slots = int(num_slots)
+        self.scorer_path = scorer_path
+        self.app_config = dict(app_config or {}, AI_INFERENCE_POOL_NUM_WORKERS=self.num_processes)
+        self.logger = logger if logger else module_logger
+        self.restarts = 0
+
+        frame_bytes = int(np.prod(self.frame_shape))
+        self._shm = shared_memory.SharedMemory(create=True, size=frame_bytes * self.num_slots)
+        self._slot_frames = np.ndarray((self.num_slots,) + self.frame_shape, dtype=np.uint8, buffer=self._shm.buf)
+        self._free_slots = queue.Queue()
+        for slot in range(self.num_slots):
+            self._free_slots.put(slot)
+        self._slot_acquire_lock = threading.Lock()
+
+        self._context = multiprocessing.get_context('spawn')
+        self._request_ids = itertools.count()
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._ready_workers = set()
+        self._ready_event = threading.Event()
+        self._stopped = threading.Event()
+
+        self._processes = [None] * self.num_processes
+        self._task_queues = [None] * self.num_processes
+        self._result_conns = [None] * self.num_processes
+        for worker_index in range(self.num_processes):
+            self._start_worker(worker_index)
+
+        self._collector = threading.Thread(target=self._collect_results, name="inference-pool-results", daemon=True)
+        self._collector.start()
+
+    # --- Worker Lifecycle ---
+    def _start_worker(self, worker_index):
+        task_queue = self._context.Queue()
+        result_reader, result_writer = self._context.Pipe(duplex=False)
+        process = self._context.Process(
+            target=_worker_main,
+            args=(worker_index, self._shm.name, self.num_slots, self.frame_shape,
+                  task_queue, result_writer, self.scorer_path, self.app_config),
+            name=f"inference-worker-{worker_index}",
+            daemon=True
+        )
+        process.start()
+        # Only the worker keeps the write end, so its exit shows up as EOF on the reader.
+        result_writer.close()
+        if self._result_conns[worker_index] is not None:
+            self._result_conns[worker_index].close()
+        self._task_queues[worker_index] = task_queue
+        self._result_conns[worker_index] = result_reader
+        self._processes[worker_index] = process
+
+    def _restart_dead_workers(self):
+        for worker_index, process in enumerate(self._processes):
+            if process.is_alive() or self._stopped.is_set():
+                continue
+            self.logger.error(f"Inference worker {worker_index} exited with code {process.exitcode}; restarting it.")
+            with self._pending_lock:
+                lost = [r for r in self._pending.values() if r.worker_index == worker_index]
+                for request in lost:
+                    del self._pending[request.request_id]
+                self._ready_workers.discard(worker_index)
+                # Replaced under the lock so no new request is queued for the dead process.
+                self._start_worker(worker_index)
+                self.restarts += 1
+            for request in lost:
+                self._release_slots(request.slots)
+                request.future.set_exception(
+                    RuntimeError(f"Inference worker exited with code {process.exitcode} during the request."))
+
+    def wait_until_ready(self, timeout=None):
+        """Blocks until every worker has loaded its scorer (and warmed up). Returns True if they did."""
+        return self._ready_event.wait(timeout)
+
+    # --- Slot Ring ---
+    def _acquire_slots(self, count, timeout):
+        if count > self.num_slots:
+            raise ValueError(f"A request may use at most {self.num_slots} frames, got {count}.")
+        # Slots for one request are taken together so concurrent requests cannot deadlock on partial sets.
+        with self._slot_acquire_lock:
+            slots = []
+            try:
+                for _ in range(count):
+                    slots.append(self._free_slots.get(timeout=timeout))
+            except queue.Empty:
+                self._release_slots(slots)
+                raise TimeoutError("No free frame slots in the inference pool.")
+            return slots
+
+    def _release_slots(self, slots):
+        for slot in slots:
+            self._free_slots.put(slot)
+
+    # --- Requests ---
+    def submit(self, user_id, frames, timeout=None):
+        """
+        Copies frames into shared memory and queues them for the least busy worker.
+
+        Args:
+            user_id (str): Passed through to the scorer.
+            frames (np.ndarray): (N, H, W, 3) uint8 frames matching frame_shape.
+
+        Returns:
+            concurrent.futures.Future resolving to the scorer's result.
+        """
+        if self._stopped.is_set():
+            raise RuntimeError("Inference pool has been shut down.")
+        frames = np.asarray(frames, dtype=np.uint8)
+        if frames.shape[1:] != self.frame_shape:
+            raise ValueError(f"Frames must have shape (N,) + {self.frame_shape}, got {frames.shape}.")
+
+        slots = self._acquire_slots(len(frames), timeout)
+        self._slot_frames[slots] = frames
+
+        with self._pending_lock:
+            in_flight = [0] * self.num_processes
+            for request in self._pending.values():
+                in_flight[request.worker_index] += 1
+            worker_index = min(range(self.num_processes), key=lambda i: in_flight[i])
+            request = _PoolRequest(next(self._request_ids), slots, worker_index)
+            self._pending[request.request_id] = request
+            self._task_queues[worker_index].put((request.request_id, user_id, slots))
+        return request.future
+
+    def score(self, user_id, frames, timeout=None):
+        """Submits frames and blocks until the scorer's result is available."""
+        return self.submit(user_id, frames, timeout=timeout).result(timeout=timeout)
+
+    def _collect_results(self):
+        # Runs in a single thread, which is also the only one that restarts workers and replaces their pipes.
+        while not self._stopped.is_set():
+            result_conns = list(self._result_conns)
+            for result_conn in multiprocessing.connection.wait(result_conns, timeout=0.5):
+                try:
+                    message = result_conn.recv()
+                except (EOFError, OSError):
+                    # The worker exited; wait for it to be reaped so it is restarted below.
+                    self._processes[result_conns.index(result_conn)].join(timeout=1)
+                    continue
+                self._handle_message(*message)
+            self._restart_dead_workers()
+
+    def _handle_message(self, kind, key, result, error):
+        if kind == "ready":
+            with self._pending_lock:
+                self._ready_workers.add(key)
+                if len(self._ready_workers) == self.num_processes:
+                    self._ready_event.set()
+            return
+
+        with self._pending_lock:
+            request = self._pending.pop(key, None)
+        if request is None:
+            return
+        self._release_slots(request.slots)
+        if error is not None:
+            request.future.set_exception(RuntimeError(error))
+        else:
+            request.future.set_result(result)
+
+    def stats(self):
+        with self._pending_lock:
+            in_flight = len(self._pending)
+            ready_workers = len(self._ready_workers)
+        return {
+            "processes": self.num_processes,
+            "alive": sum(1 for p in self._processes if p is not None and p.is_alive()),
+            "ready": ready_workers,
+            "restarts": self.restarts,
+            "in_flight": in_flight,
+            "free_slots": self._free_slots.qsize(),
+        }
+
+    def shutdown(self):
+        self._stopped.set()
+        for task_queue in self._task_queues:
+            task_queue.put(None)
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._collector.join(timeout=2)
+        for result_conn in self._result_conns:
+            result_conn.close()
+        with self._pending_lock:
+            pending = list(self._pending.values())
+            self._pending.clear()
+        for request in pending:
+            request.future.set_exception(RuntimeError("Inference pool has been shut down."))
+        del self._slot_frames
+        self._shm.close()
+        self._shm.unlink()
+
+
+def get_inference_pool(app_config):
+    """Returns the process-wide inference pool, starting its workers on first use."""
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            image_size = app_config.get('AI_MODEL_INPUT_SIZE', (224, 224))
+            _shared_pool = InferencePool(
+                num_processes=int(app_config.get('AI_INFERENCE_POOL_PROCESSES', 0)),
+                frame_shape=(image_size[0], image_size[1], 3),
+                num_slots=int(app_config.get('AI_INFERENCE_POOL_SLOTS', 64)),
+                scorer_path=app_config.get('AI_INFERENCE_POOL_SCORER', DEFAULT_SCORER),
+                app_config=app_config,
+            )
+        return _shared_pool
+
+
+def get_pool_stats():
+    """Returns the pool's counters, or None if no pool was started in this process."""
+    with _shared_pool_lock:
+        pool = _shared_pool
+    return pool.stats() if pool is not None else None
@@ -0,0 +1,183 @@
+import os
+import threading
+from collections import OrderedDict
+import logging
+
+import numpy as np
+
+from .metrics import MODEL_CACHE_LOOKUPS
+
+module_logger = logging.getLogger(__name__)
+
+# --- Process-wide Cache Instance ---
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+class CachedModel:
+    """A loaded model shared between request threads.
+
+    `lock` serializes inference on `model`, since Keras builds its predict
+    function lazily and is not safe to call concurrently on first use.
+    `compiled_predictor` holds the model's traced inference function once built,
+    so it is dropped together with the model on eviction.
+    """
+
+    def __init__(self, key, identity, model, size_bytes):
+        self.key = key
+        self.identity = identity
+        self.model = model
+        self.size_bytes = size_bytes
+        self.lock = threading.Lock()
+        self.compiled_predictor = None
+
+
+def _file_identity(model_path):
+    """Returns (mtime_ns, size) of the model file; raises OSError if it is missing."""
+    stat_result = os.stat(model_path)
+    return stat_result.st_mtime_ns, stat_result.st_size
+
+
+def estimate_model_bytes(model, model_path=None):
+    """Estimates the resident size of a loaded model from its weights,
+    falling back to the on-disk size when the object exposes no weights."""
+    weights = getattr(model, 'weights', None)
+    if weights:
+        return int(sum(int(np.prod(w.shape)) * w.dtype.size for w in weights))
+    if isinstance(model, dict):
+        return int(sum(np.asarray(v).nbytes for v in model.values()))
+    if model_path and os.path.exists(model_path):
+        return os.path.getsize(model_path)
+    return 0
+
+
+class ModelCache:
+    """LRU cache of loaded models keyed by user and model file identity.
+
+    An entry is reused only while the file's mtime and size are unchanged, so
+    a model rewritten by training is reloaded on the next request. Entries are
+    evicted least-recently-used first once `max_bytes` is exceeded; the most
+    recently loaded model is always kept, even if it alone exceeds the budget.
+    """
+
+    def __init__(self, loader, max_bytes, sizer=estimate_model_bytes, logger=None):
+        self._loader = loader
+        self._sizer = sizer
+        self.max_bytes = int(max_bytes)
+        self.logger = logger if logger else module_logger
+
+        self._entries = OrderedDict()
+        self._loading_locks = {}
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _lookup(self, key, identity):
+        entry = self._entries.get(key)
+        if entry is not None and entry.identity == identity:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            MODEL_CACHE_LOOKUPS.labels("hit").inc()
+            return entry
+        return None
+
+    def get(self, user_id, model_path, loader=None):
+        """Returns a CachedModel for the given file, loading it on a miss.
+
+        `loader` overrides the cache's default loader for this file type.
+        Concurrent misses for the same key wait for a single load instead of
+        deserializing the model once per thread.
+        """
+        model_path = os.path.abspath(model_path)
+        key = (user_id, model_path)
+        identity = _file_identity(model_path)
+
+        # --- Fast Path: Cache Hit ---
+        with self._lock:
+            entry = self._lookup(key, identity)
+            if entry is not None:
+                return entry
+            loading_lock = self._loading_locks.setdefault(key, threading.Lock())
+
+        # --- Slow Path: Single Load per Key ---
+        with loading_lock:
+            with self._lock:
+                entry = self._lookup(key, identity)
+                if entry is not None:
+                    return entry
+                self.misses += 1
+                MODEL_CACHE_LOOKUPS.labels("miss").inc()
+
+            try:
+                self.logger.info(f"Model cache miss for user {user_id}; loading {model_path}")
+                model = (loader or self._loader)(model_path)
+                # Tagged with the identity seen before loading: if training rewrote the file
+                # meanwhile, the next request sees a different identity and reloads.
+                entry = CachedModel(key, identity, model, self._sizer(model, model_path))
+
+                with self._lock:
+                    previous = self._entries.pop(key, None)
+                    if previous is not None:
+                        self.current_bytes -= previous.size_bytes
+                    self._entries[key] = entry
+                    self.current_bytes += entry.size_bytes
+                    self._evict_over_budget()
+            finally:
+                with self._lock:
+                    self._loading_locks.pop(key, None)
+
+        return entry
+
+    def _evict_over_budget(self):
+        while self.current_bytes > self.max_bytes and len(self._entries) > 1:
+            evicted_key, evicted = self._entries.popitem(last=False)
+            self.current_bytes -= evicted.size_bytes
+            self.evictions += 1
+            self.logger.info(f"Evicted model for user {evicted_key[0]} from cache ({evicted.size_bytes} bytes).")
+
+    def invalidate(self, user_id):
+        """Drops every cached model belonging to user_id."""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == user_id]:
+                self.current_bytes -= self._entries.pop(key).size_bytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "current_bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+def _load_keras_model(model_path):
+    from keras.models import load_model
+    return load_model(model_path, compile=False)
+
+
+def get_model_cache(app_config):
+    """Returns the process-wide model cache, creating it on first use."""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            max_bytes = int(app_config.get('AI_MODEL_CACHE_MAX_BYTES', 1024 * 1024 * 1024))
+            _shared_cache = ModelCache(loader=_load_keras_model, max_bytes=max_bytes)
+        return _shared_cache
+
+
+def invalidate_user_models(user_id):
+    """Drops cached models for user_id, if a cache exists in this process."""
+    with _shared_cache_lock:
+        cache = _shared_cache
+    if cache is not None:
+        cache.invalidate(user_id)
@@ -5,11 +5,22 @@ import numpy as np
 import tensorflow as tf
 from keras import layers, models, regularizers
 from keras.utils import Sequence
+from keras.callbacks import Callback
 from keras_vggface.vggface import VGGFace
 from keras_vggface.utils import preprocess_input as vggface_preprocess_input
 from flask import current_app
 import logging
 
+from .head_model import extract_head_weights, save_head_weights
+from .image_decoding import read_image_for_size
+
+# --- Shared Image Preprocessing ---
+def preprocess_face_image(img_bgr, cv_image_size, preprocess_version=1):
+    """Converts a decoded BGR image into a VGGFace-preprocessed float32 array."""
+    img_rgb = cv.cvtColor(img_bgr, cv.COLOR_BGR2RGB)
+    img_resized = cv.resize(img_rgb, cv_image_size)
+    return vggface_preprocess_input(img_resized.astype(np.float32), version=preprocess_version)
+
 class FacesSequence(Sequence):
     def __init__(self, directory, batch_size, image_size, class_names, augment=False, logger=None):
         self.directory = directory
@@ -47,7 +58,7 @@ class FacesSequence(Sequence):
 
         # --- Image Loading and Preprocessing ---
         for img_path, label in batch_samples:
-            img = cv.imread(img_path)
+            img = read_image_for_size(img_path, self.image_size)
             if img is None:
                 self.logger.warning(f"Could not read image {img_path}. Skipping.")
                 continue
@@ -148,4 +159,48 @@ def build_vggface_classifier(input_shape, l2_reg_factor, dropout_dense_rate, log
     final_model = models.Model(inputs=inputs, outputs=outputs, name="vggface_binary_classifier")
     logger.info("Custom VGGFace classifier head built based on build_vggface_model.")
 
-    return final_model, base_model_object
\ No newline at end of file
+    return final_model, base_model_object
+
+# --- Shared Backbone Building Function ---
+def build_vggface_backbone(input_shape, logger=None):
+    """Builds the frozen VGGFace feature extractor shared by all users.
+
+    The output matches the "gap" layer of build_vggface_classifier, so heads
+    trained on a frozen base can be evaluated on these features directly.
+    """
+    if logger is None:
+        logger = current_app.logger if current_app else logging.getLogger(__name__)
+
+    base_model_object = VGGFace(model='vgg16',
+                                weights='vggface',
+                                include_top=False,
+                                input_shape=input_shape,
+                                pooling=None)
+    base_model_object.trainable = False
+
+    features = layers.GlobalAveragePooling2D(name="gap")(base_model_object.output)
+    backbone = models.Model(inputs=base_model_object.input, outputs=features, name="vggface_backbone")
+    logger.info(f"VGGFace backbone built. Feature dimension: {backbone.output_shape[-1]}")
+    return backbone
+
+# --- Head Checkpoint Callback ---
+class HeadCheckpoint(Callback):
+    """Saves only the classifier head whenever the monitored metric improves.
+
+    Used instead of ModelCheckpoint when the backbone is shared, so training
+    never writes a VGG16-sized file per user.
+    """
+    def __init__(self, head_path, monitor="val_accuracy", logger=None):
+        super().__init__()
+        self.head_path = head_path
+        self.monitor = monitor
+        self.best = -np.inf
+        self.logger = logger if logger else logging.getLogger(__name__)
+
+    def on_epoch_end(self, epoch, logs=None):
+        current = (logs or {}).get(self.monitor)
+        if current is None or current <= self.best:
+            return
+        self.best = current
+        save_head_weights(extract_head_weights(self.model), self.head_path)
+        self.logger.info(f"Epoch {epoch + 1}: {self.monitor} improved to {current:.4f}, head saved to {self.head_path}")
@@ -0,0 +1,187 @@
+import os
+import json
+import threading
+import numpy as np
+import tensorflow as tf
+from flask import current_app
+import logging
+
+from .model_components import FacesSequence, preprocess_face_image
+from .image_decoding import read_image_for_size
+
+QUANTIZATION_MODES = ('none', 'dynamic', 'int8')
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+
+class TFLiteModel:
+    """
+    A TFLite interpreter exposing the subset of the Keras model API used for verification.
+
+    The interpreter is created from a file path, so TFLite memory-maps the flatbuffer
+    instead of copying the weights. Interpreters are not thread-safe; calls are serialized,
+    but each call runs the whole batch in one invoke (the input is resized to the batch
+    shape, which is kept until a batch of another size arrives).
+    """
+
+    def __init__(self, model_path, num_threads=None):
+        self.model_path = model_path
+        self._interpreter = tf.lite.Interpreter(model_path=model_path, num_threads=num_threads)
+        self._interpreter.allocate_tensors()
+        self._input_details = self._interpreter.get_input_details()[0]
+        self._output_details = self._interpreter.get_output_details()[0]
+        self.input_shape = tuple(int(d) for d in self._input_details['shape'])
+        self.output_shape = tuple(int(d) for d in self._output_details['shape'])
+        self._batch_shape = self.input_shape
+        self._lock = threading.Lock()
+
+    def predict(self, img_batch, verbose=0):
+        """Runs the whole (N, ...) batch in one interpreter invoke and returns the (N, ...) outputs."""
+        img_batch = np.asarray(img_batch, dtype=np.float32)
+        with self._lock:
+            if img_batch.shape != self._batch_shape:
+                self._interpreter.resize_tensor_input(self._input_details['index'], img_batch.shape)
+                self._interpreter.allocate_tensors()
+                self._batch_shape = img_batch.shape
+            self._interpreter.set_tensor(self._input_details['index'], img_batch)
+            self._interpreter.invoke()
+            return self._interpreter.get_tensor(self._output_details['index']).copy()
+
+
+def load_tflite_model(model_path, num_threads=None):
+    return TFLiteModel(model_path, num_threads=num_threads)
+
+
+def _calibration_dataset(image_paths, cv_image_size, preprocess_version):
+    """Yields single preprocessed images for int8 calibration."""
+    def generator():
+        for img_path in image_paths:
+            img = read_image_for_size(img_path, cv_image_size)
+            if img is None:
+                continue
+            yield [preprocess_face_image(img, cv_image_size, preprocess_version)[np.newaxis, ...]]
+    return generator
+
+
+def export_tflite_model(model, output_path, quantization='dynamic', calibration_image_paths=None, app_config=None):
+    """
+    Converts a Keras model to a post-training-quantized TFLite flatbuffer.
+
+    Args:
+        model: Keras model to convert.
+        output_path (str): Destination .tflite path (written atomically).
+        quantization (str): 'none', 'dynamic' (int8 weights, float activations) or
+            'int8' (int8 weights and activations, calibrated on calibration_image_paths).
+        calibration_image_paths (list): Image paths used as the representative dataset for 'int8'.
+        app_config (dict): Application configuration (image size, preprocessing version).
+
+    Returns:
+        int: Size of the written file in bytes.
+    """
+    app_config = app_config or {}
+    if quantization not in QUANTIZATION_MODES:
+        raise ValueError(f"Unknown quantization mode '{quantization}'. Expected one of {QUANTIZATION_MODES}.")
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    if quantization in ('dynamic', 'int8'):
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if quantization == 'int8':
+        if not calibration_image_paths:
+            raise ValueError("int8 quantization requires calibration images.")
+        image_size_config = app_config.get('AI_MODEL_INPUT_SIZE', (224, 224))
+        max_calibration = int(app_config.get('AI_TFLITE_CALIBRATION_MAX_IMAGES', 100))
+        converter.representative_dataset = _calibration_dataset(
+            calibration_image_paths[:max_calibration],
+            (image_size_config[1], image_size_config[0]),
+            int(app_config.get('AI_VGGFACE_PREPROCESS_VERSION', 1))
+        )
+        # Inputs and outputs stay float32 so the existing preprocessing is reused unchanged.
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+
+    tflite_bytes = converter.convert()
+
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    tmp_path = f"{output_path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(tflite_bytes)
+    os.replace(tmp_path, output_path)
+    return len(tflite_bytes)
+
+
+def _binary_accuracy(predict_fn, sequence):
+    correct = 0
+    total = 0
+    for batch_index in range(len(sequence)):
+        images, labels = sequence[batch_index]
+        if len(images) == 0:
+            continue
+        probabilities = np.asarray(predict_fn(images)).reshape(-1)
+        correct += int(np.sum((probabilities >= 0.5) == (labels >= 0.5)))
+        total += len(labels)
+    return (correct / total) if total else None, total
+
+
+def export_user_model(user_id: str, model, base_data_dir: str, user_model_dir: str, app_config: dict, logger=None):
+    """
+    Exports a trained per-user classifier to TFLite and reports the accuracy change on data/test.
+
+    Calibration uses the user's and not_user's validation split. The report is written
+    next to the artifact as AI_TFLITE_REPORT_FILENAME.
+
+    Returns:
+        bool: True if the export succeeded, False otherwise.
+        str: Message indicating status.
+    """
+    if logger is None:
+        logger = current_app.logger if current_app else logging.getLogger(__name__)
+
+    quantization = app_config.get('AI_TFLITE_QUANTIZATION', 'dynamic')
+    tflite_path = os.path.join(user_model_dir, app_config.get('AI_TFLITE_FILENAME', 'model.tflite'))
+    report_path = os.path.join(user_model_dir, app_config.get('AI_TFLITE_REPORT_FILENAME', 'tflite_report.json'))
+
+    # --- Calibration Images from the Validation Split ---
+    calibration_paths = []
+    for cls in (user_id, "not_user"):
+        cls_dir = os.path.join(base_data_dir, 'validation', cls)
+        if os.path.isdir(cls_dir):
+            calibration_paths.extend(
+                os.path.join(cls_dir, f) for f in sorted(os.listdir(cls_dir)) if f.lower().endswith(IMAGE_EXTENSIONS)
+            )
+
+    # --- Conversion ---
+    try:
+        size_bytes = export_tflite_model(model, tflite_path, quantization, calibration_paths, app_config)
+        logger.info(f"Exported {quantization} TFLite model for user {user_id} to {tflite_path} ({size_bytes} bytes).")
+    except Exception as e:
+        logger.error(f"TFLite export failed for user {user_id}: {e}", exc_info=True)
+        return False, f"TFLite export failed: {e}"
+
+    # --- Accuracy Delta on the Test Split ---
+    report = {"user_id": user_id, "quantization": quantization, "tflite_bytes": size_bytes,
+              "calibration_images": len(calibration_paths)}
+    try:
+        image_size = app_config.get('AI_MODEL_INPUT_SIZE', (224, 224))
+        test_sequence = FacesSequence(
+            directory=os.path.join(base_data_dir, 'test'),
+            batch_size=int(app_config.get('AI_BATCH_SIZE', 16)),
+            image_size=image_size,
+            class_names=["not_user", user_id],
+            augment=False,
+            logger=logger
+        )
+        tflite_model = load_tflite_model(tflite_path)
+        keras_accuracy, num_test = _binary_accuracy(lambda x: model.predict(x, verbose=0), test_sequence)
+        tflite_accuracy, _ = _binary_accuracy(tflite_model.predict, test_sequence)
+        report.update({
+            "test_images": num_test,
+            "keras_accuracy": keras_accuracy,
+            "tflite_accuracy": tflite_accuracy,
+            "accuracy_delta": (tflite_accuracy - keras_accuracy) if num_test else None,
+        })
+        logger.info(f"TFLite accuracy report for user {user_id}: {report}")
+    except Exception as e:
+        logger.warning(f"Could not evaluate the TFLite model for user {user_id} on the test split: {e}")
+
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    return True, f"TFLite model exported to {tflite_path}"
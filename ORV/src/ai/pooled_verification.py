@@ -0,0 +1,136 @@
+import time
+import logging
+import functools
+import numpy as np
+from flask import current_app
+
+from .face_detection import decode_model_frame
+from .image_decoding import get_decode_pool
+from .inference_pool import get_inference_pool
+from .metrics import VERIFY_STAGE_SECONDS
+from .frame_aggregation import aggregate_frame_scores, is_decision_settled, AGGREGATION_METHODS
+
+# Verification through the out-of-process inference pool (AI_INFERENCE_POOL_PROCESSES > 0).
+# Same signatures and results as verification_manager, but this process only decodes
+# frames; TensorFlow is loaded and run in the pool's worker processes.
+
+
+def _decode_frame(image_bytes: bytes, app_config: dict):
+    started_at = time.perf_counter()
+    frame = decode_model_frame(image_bytes, app_config)
+    VERIFY_STAGE_SECONDS.labels("decode").observe(time.perf_counter() - started_at)
+    return frame
+
+
+def _score_frames(user_id: str, frames, app_config: dict):
+    """Scores frames in the pool; the predict stage includes the hand-off and model loading in the worker."""
+    started_at = time.perf_counter()
+    timeout = float(app_config.get('AI_INFERENCE_TIMEOUT_SECONDS', 30))
+    result = get_inference_pool(app_config).score(user_id, np.stack(frames), timeout=timeout)
+    VERIFY_STAGE_SECONDS.labels("predict").observe(time.perf_counter() - started_at)
+    return result
+
+
+def verify_user_with_image(user_id: str, image_bytes: bytes, app_config: dict, logger=None):
+    """
+    Verifies one image against user_id's model in the inference pool.
+
+    Returns:
+        tuple: (is_match: bool, probability: float, message: str)
+    """
+    if logger is None:
+        logger = current_app.logger if current_app else logging.getLogger(__name__)
+
+    # --- Image Decoding ---
+    try:
+        frame = _decode_frame(image_bytes, app_config)
+    except Exception as e:
+        msg = f"Verification failed: Error during image preprocessing: {e}"
+        logger.error(msg, exc_info=True)
+        return False, 0.0, msg
+    if frame is None:
+        msg = "Verification failed: Could not decode image or detect a face."
+        logger.error(msg)
+        return False, 0.0, msg
+
+    # --- Prediction in the Pool ---
+    try:
+        scores, verification_threshold, error_message = _score_frames(user_id, [frame], app_config)
+    except Exception as e:
+        msg = f"Verification failed: Error during model prediction: {e}"
+        logger.error(msg, exc_info=True)
+        return False, 0.0, msg
+    if scores is None:
+        return False, 0.0, error_message
+
+    # --- Decision Making ---
+    prediction_prob = scores[0]
+    is_match = prediction_prob >= verification_threshold
+    outcome = "VERIFIED" if is_match else "NOT VERIFIED"
+    message = f"User {user_id} {outcome}. Probability: {prediction_prob:.4f} (Threshold: {verification_threshold})"
+    logger.info(message)
+    return bool(is_match), float(prediction_prob), message
+
+
+def verify_user_with_images(user_id: str, images_bytes: list, app_config: dict, aggregation: str = None, logger=None):
+    """
+    Multi-frame verification in the inference pool, with the same chunking and
+    early exit as verification_manager.verify_user_with_images.
+
+    Returns:
+        tuple: (is_match: bool, aggregate_score: float, frame_scores: list, message: str)
+    """
+    if logger is None:
+        logger = current_app.logger if current_app else logging.getLogger(__name__)
+
+    aggregation = aggregation or app_config.get('AI_MULTI_FRAME_AGGREGATION', 'mean')
+    if aggregation not in AGGREGATION_METHODS:
+        return False, 0.0, [], f"Verification failed: Unknown aggregation '{aggregation}'."
+    chunk_size = max(1, int(app_config.get('AI_MULTI_FRAME_CHUNK_SIZE', 4)))
+    min_frames = int(app_config.get('AI_MULTI_FRAME_MIN_FRAMES', 2))
+    early_exit_margin = float(app_config.get('AI_MULTI_FRAME_EARLY_EXIT_MARGIN', 0.2))
+
+    # --- Parallel Image Decoding ---
+    try:
+        decode = functools.partial(_decode_frame, app_config=app_config)
+        frames = list(get_decode_pool(app_config).map(decode, images_bytes))
+    except Exception as e:
+        msg = f"Verification failed: Error during image preprocessing: {e}"
+        logger.error(msg, exc_info=True)
+        return False, 0.0, [], msg
+
+    frame_scores = [None] * len(images_bytes)
+    decodable_frames = [i for i, frame in enumerate(frames) if frame is not None]
+    if not decodable_frames:
+        msg = "Verification failed: Could not decode or detect a face in any image."
+        logger.error(msg)
+        return False, 0.0, frame_scores, msg
+
+    # --- Chunked Prediction with Early Exit ---
+    scores = []
+    verification_threshold = 0.0
+    try:
+        for start in range(0, len(decodable_frames), chunk_size):
+            chunk = decodable_frames[start:start + chunk_size]
+            chunk_scores, verification_threshold, error_message = _score_frames(
+                user_id, [frames[i] for i in chunk], app_config)
+            if chunk_scores is None:
+                return False, 0.0, frame_scores, error_message
+            for frame_index, score in zip(chunk, chunk_scores):
+                frame_scores[frame_index] = score
+                scores.append(score)
+            if is_decision_settled(scores, len(decodable_frames), verification_threshold,
+                                   aggregation, early_exit_margin, min_frames):
+                break
+    except Exception as e:
+        msg = f"Verification failed: Error during model prediction: {e}"
+        logger.error(msg, exc_info=True)
+        return False, 0.0, frame_scores, msg
+
+    # --- Decision Making ---
+    aggregate_score, is_match = aggregate_frame_scores(scores, verification_threshold, aggregation)
+    outcome = "VERIFIED" if is_match else "NOT VERIFIED"
+    message = (f"User {user_id} {outcome}. {aggregation.capitalize()} score: {aggregate_score:.4f} "
+               f"over {len(scores)} of {len(images_bytes)} frames (Threshold: {verification_threshold})")
+    logger.info(message)
+    return bool(is_match), aggregate_score, frame_scores, message
@@ -0,0 +1,52 @@
+import os
+import sys
+import logging
+
+module_logger = logging.getLogger(__name__)
+
+
+def resolve_thread_limits(app_config, num_workers=1):
+    """
+    Returns (intra_op_threads, inter_op_threads) for one worker process.
+
+    Unset intra-op threads default to an even share of the cores, so N
+    workers together use the machine once instead of N times over.
+    """
+    intra_op = app_config.get('AI_TF_INTRA_OP_THREADS')
+    if intra_op is None:
+        intra_op = max(1, (os.cpu_count() or 1) // max(1, int(num_workers)))
+    inter_op = app_config.get('AI_TF_INTER_OP_THREADS') or 1
+    return int(intra_op), int(inter_op)
+
+
+def apply_thread_limits(app_config, num_workers=1, logger=None):
+    """
+    Caps TensorFlow, TFLite and OpenMP threads for this process.
+
+    Must run before TensorFlow is imported for the environment variables to
+    take effect; if TensorFlow is already loaded the runtime setters are tried too.
+    Updates app_config['AI_TFLITE_NUM_THREADS'] in place when it is unset.
+
+    Returns:
+        tuple: (intra_op_threads, inter_op_threads) that were applied.
+    """
+    if logger is None:
+        logger = module_logger
+
+    intra_op, inter_op = resolve_thread_limits(app_config, num_workers)
+    os.environ['TF_NUM_INTRAOP_THREADS'] = str(intra_op)
+    os.environ['TF_NUM_INTEROP_THREADS'] = str(inter_op)
+    os.environ['OMP_NUM_THREADS'] = str(intra_op)
+    if app_config.get('AI_TFLITE_NUM_THREADS') is None:
+        app_config['AI_TFLITE_NUM_THREADS'] = intra_op
+
+    if 'tensorflow' in sys.modules:
+        tf = sys.modules['tensorflow']
+        try:
+            tf.config.threading.set_intra_op_parallelism_threads(intra_op)
+            tf.config.threading.set_inter_op_parallelism_threads(inter_op)
+        except RuntimeError as e:
+            logger.warning(f"TensorFlow is already initialized; thread limits only partially applied: {e}")
+
+    logger.info(f"Thread limits for pid {os.getpid()}: intra-op={intra_op}, inter-op={inter_op}.")
+    return intra_op, inter_op
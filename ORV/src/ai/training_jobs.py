@@ -0,0 +1,473 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+import contextlib
+
+from .metrics import UPLOAD_STAGE_SECONDS, TRAINING_PHASE_SECONDS
+
+module_logger = logging.getLogger(__name__)
+
+# Stages a job runs through, per verification mode. 'video' samples uploaded videos into frames.
+TRAINING_STAGES = ("video", "split", "augment", "train")
+ENROLLMENT_STAGES = ("video", "enroll")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    source_dir TEXT NOT NULL,
+    stages TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    state TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    stage_progress REAL NOT NULL DEFAULT 0,
+    stage_seconds TEXT NOT NULL DEFAULT '{}',
+    message TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_id TEXT,
+    heartbeat_at REAL,
+    created_at REAL NOT NULL,
+    queued_at REAL NOT NULL,
+    available_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_by_schedule ON jobs (state, priority DESC, queued_at);
+"""
+
+_shared_queues = {}
+_shared_pools = {}
+_shared_lock = threading.Lock()
+
+
+def _job_progress(row):
+    if row["state"] == "succeeded":
+        return 1.0
+    stages = json.loads(row["stages"])
+    if row["stage"] not in stages:
+        return 0.0
+    return (stages.index(row["stage"]) + row["stage_progress"]) / len(stages)
+
+
+class JobQueue:
+    """
+    Durable training job queue in a local SQLite database, shared by every
+    server process on the host.
+
+    Jobs are claimed highest priority first, FIFO within a priority. A claimed
+    job holds a lease that its worker renews; a job whose lease runs out (its
+    process died or was restarted) is queued again. A job that raises is
+    retried after retry_backoff_seconds until it has run max_attempts times.
+
+    At most max_running jobs run at once across all processes using the
+    database, however many workers poll it, and a user never has two jobs
+    running at the same time.
+    """
+
+    def __init__(self, db_path, max_attempts=3, retry_backoff_seconds=30.0, lease_seconds=300.0,
+                 max_finished_jobs=1000, max_running=None):
+        self.db_path = db_path
+        self.max_running = max_running
+        self.max_attempts = max_attempts
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.lease_seconds = lease_seconds
+        self.max_finished_jobs = max_finished_jobs
+        db_dir = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(db_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextlib.contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30.0, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        """A write transaction; BEGIN IMMEDIATE serializes claims across processes."""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    # --- Producer Side ---
+    def enqueue(self, user_id, source_dir, stages, priority=0):
+        """
+        Queues a job and returns its id. If the user already has a job waiting
+        for the same images it is reused (at the higher of the two priorities),
+        since it will pick up the new upload when it runs.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            waiting = conn.execute(
+                "SELECT job_id FROM jobs WHERE state = 'queued' AND attempts = 0 AND user_id = ? AND source_dir = ?",
+                (user_id, source_dir)
+            ).fetchone()
+            if waiting is not None:
+                conn.execute("UPDATE jobs SET priority = MAX(priority, ?) WHERE job_id = ?",
+                             (priority, waiting["job_id"]))
+                return waiting["job_id"]
+            job_id = uuid.uuid4().hex
+            conn.execute(
+                "INSERT INTO jobs (job_id, user_id, source_dir, stages, priority, state, stage, "
+                "created_at, queued_at, available_at) VALUES (?, ?, ?, ?, ?, 'queued', 'queued', ?, ?, ?)",
+                (job_id, user_id, source_dir, json.dumps(list(stages)), priority, now, now, now)
+            )
+            return job_id
+
+    # --- Worker Side ---
+    def claim(self):
+        """
+        Takes the next runnable job, or returns None if there is none, max_running
+        jobs are already running, or every waiting job's user has one running.
+
+        Returns:
+            dict: job_id, user_id, source_dir, stages, attempts, lease_id and queued_seconds.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            self._expire_leases(conn, now)
+            if self.max_running is not None:
+                running = conn.execute("SELECT COUNT(*) FROM jobs WHERE state = 'running'").fetchone()[0]
+                if running >= self.max_running:
+                    return None
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE state = 'queued' AND available_at <= ? "
+                "AND user_id NOT IN (SELECT user_id FROM jobs WHERE state = 'running') "
+                "ORDER BY priority DESC, queued_at LIMIT 1", (now,)
+            ).fetchone()
+            if row is None:
+                return None
+            lease_id = uuid.uuid4().hex
+            conn.execute(
+                "UPDATE jobs SET state = 'running', stage = 'starting', stage_progress = 0, attempts = attempts + 1, "
+                "lease_id = ?, heartbeat_at = ?, started_at = COALESCE(started_at, ?) WHERE job_id = ?",
+                (lease_id, now, now, row["job_id"])
+            )
+        return {
+            "job_id": row["job_id"],
+            "user_id": row["user_id"],
+            "source_dir": row["source_dir"],
+            "stages": tuple(json.loads(row["stages"])),
+            "attempts": row["attempts"] + 1,
+            "lease_id": lease_id,
+            "queued_seconds": now - row["queued_at"],
+        }
+
+    def _expire_leases(self, conn, now):
+        expired = conn.execute(
+            "SELECT job_id, attempts FROM jobs WHERE state = 'running' AND heartbeat_at < ?",
+            (now - self.lease_seconds,)
+        ).fetchall()
+        for row in expired:
+            module_logger.warning(f"Training job {row['job_id']} lost its worker; rescheduling.")
+            # The job did not fail by itself, so it may run again right away.
+            self._retry_or_fail(conn, row["job_id"], row["attempts"], "Worker stopped while running the job.", now,
+                                backoff_seconds=0.0)
+
+    def _retry_or_fail(self, conn, job_id, attempts, message, now, backoff_seconds=None):
+        if backoff_seconds is None:
+            backoff_seconds = self.retry_backoff_seconds
+        if attempts < self.max_attempts:
+            conn.execute(
+                "UPDATE jobs SET state = 'queued', stage = 'queued', stage_progress = 0, lease_id = NULL, "
+                "message = ?, queued_at = ?, available_at = ? WHERE job_id = ?",
+                (f"Attempt {attempts} failed, retrying: {message}", now, now + backoff_seconds, job_id)
+            )
+        else:
+            conn.execute(
+                "UPDATE jobs SET state = 'failed', lease_id = NULL, message = ?, finished_at = ? WHERE job_id = ?",
+                (message, now, job_id)
+            )
+            self._trim_history(conn)
+
+    def _trim_history(self, conn):
+        conn.execute(
+            "DELETE FROM jobs WHERE state IN ('succeeded', 'failed') AND job_id NOT IN ("
+            "SELECT job_id FROM jobs WHERE state IN ('succeeded', 'failed') ORDER BY finished_at DESC LIMIT ?)",
+            (self.max_finished_jobs,)
+        )
+
+    def heartbeat(self, lease_ids):
+        """Renews the leases of the jobs this process is running."""
+        if not lease_ids:
+            return
+        with self._transaction() as conn:
+            conn.executemany("UPDATE jobs SET heartbeat_at = ? WHERE lease_id = ?",
+                             [(time.time(), lease_id) for lease_id in lease_ids])
+
+    def _update_running(self, lease_id, assignments, values):
+        # Updates go through the lease so a worker that lost its job cannot overwrite the new attempt.
+        with self._transaction() as conn:
+            conn.execute(f"UPDATE jobs SET {assignments}, heartbeat_at = ? WHERE lease_id = ? AND state = 'running'",
+                         (*values, time.time(), lease_id))
+
+    def start_stage(self, lease_id, stage):
+        self._update_running(lease_id, "stage = ?, stage_progress = 0", (stage,))
+
+    def report_progress(self, lease_id, fraction):
+        self._update_running(lease_id, "stage_progress = ?", (min(1.0, fraction),))
+
+    def finish_stage(self, lease_id, stage, seconds, message=None):
+        with self._transaction() as conn:
+            row = conn.execute("SELECT stage_seconds, message FROM jobs WHERE lease_id = ? AND state = 'running'",
+                               (lease_id,)).fetchone()
+            if row is None:
+                return
+            stage_seconds = json.loads(row["stage_seconds"])
+            stage_seconds[stage] = seconds
+            conn.execute(
+                "UPDATE jobs SET stage_seconds = ?, stage_progress = 1, message = ?, heartbeat_at = ? WHERE lease_id = ?",
+                (json.dumps(stage_seconds), message if message is not None else row["message"], time.time(), lease_id)
+            )
+
+    def complete(self, lease_id, succeeded, message):
+        """Records the outcome of a job that ran to the end; failures reported this way are not retried."""
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET state = ?, stage = CASE WHEN ? THEN 'done' ELSE stage END, lease_id = NULL, "
+                "message = ?, finished_at = ? WHERE lease_id = ? AND state = 'running'",
+                ("succeeded" if succeeded else "failed", succeeded, message, time.time(), lease_id)
+            )
+            self._trim_history(conn)
+
+    def holds_lease(self, lease_id):
+        """True while lease_id still owns a running job (it has not expired and been handed to another worker)."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT 1 FROM jobs WHERE lease_id = ? AND state = 'running'", (lease_id,)).fetchone()
+        return row is not None
+
+    def fail_attempt(self, lease_id, message):
+        """Records a crashed attempt: the job is retried after the backoff unless it is out of attempts."""
+        with self._transaction() as conn:
+            row = conn.execute("SELECT job_id, attempts FROM jobs WHERE lease_id = ? AND state = 'running'",
+                               (lease_id,)).fetchone()
+            if row is not None:
+                self._retry_or_fail(conn, row["job_id"], row["attempts"], message, time.time())
+
+    # --- Status ---
+    def snapshot(self, job_id):
+        """Returns the job's status dict, or None for an unknown (or expired) job id."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            queue_position = None
+            if row["state"] == "queued":
+                queue_position = conn.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE state = 'queued' AND "
+                    "(priority > ? OR (priority = ? AND queued_at < ?))",
+                    (row["priority"], row["priority"], row["queued_at"])
+                ).fetchone()[0]
+        if row["started_at"] is not None:
+            queue_wait = row["started_at"] - row["created_at"]
+        else:
+            queue_wait = time.time() - row["created_at"]
+        return {
+            "job_id": row["job_id"],
+            "user_id": row["user_id"],
+            "state": row["state"],
+            "stage": row["stage"],
+            "progress": round(_job_progress(row), 4),
+            "message": row["message"],
+            "priority": row["priority"],
+            "attempts": row["attempts"],
+            "queue_position": queue_position,
+            "created_at": row["created_at"],
+            "started_at": row["started_at"],
+            "finished_at": row["finished_at"],
+            "timings": {"queue_wait": queue_wait, **json.loads(row["stage_seconds"])},
+        }
+
+    def stats(self):
+        """Queue depth, running jobs and how long the oldest queued job has been waiting."""
+        with self._connect() as conn:
+            counts = dict(conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+            oldest = conn.execute("SELECT MIN(queued_at) FROM jobs WHERE state = 'queued'").fetchone()[0]
+        return {
+            "queued": counts.get("queued", 0),
+            "running": counts.get("running", 0),
+            "oldest_queued_seconds": time.time() - oldest if oldest is not None else 0.0,
+        }
+
+
+class JobReporter:
+    """Handed to a running job to report its stage and progress under its lease."""
+
+    def __init__(self, job_queue, lease_id):
+        self._queue = job_queue
+        self._lease_id = lease_id
+
+    def start_stage(self, stage):
+        self._queue.start_stage(self._lease_id, stage)
+
+    def report_progress(self, done, total):
+        if total > 0:
+            self._queue.report_progress(self._lease_id, done / float(total))
+
+    def finish_stage(self, stage, seconds, message=None):
+        UPLOAD_STAGE_SECONDS.labels(stage).observe(seconds)
+        self._queue.finish_stage(self._lease_id, stage, seconds, message)
+
+    def record_phase(self, phase, seconds):
+        TRAINING_PHASE_SECONDS.labels(phase).observe(seconds)
+
+    def holds_lease(self):
+        return self._queue.holds_lease(self._lease_id)
+
+
+class TrainingWorkerPool:
+    """
+    num_workers threads that take jobs from the queue and run them with
+    runner(job, reporter), which returns (success, message). Workers poll the
+    database, so jobs queued by other server processes are picked up too;
+    notify() wakes them at once for jobs queued by this process.
+    """
+
+    def __init__(self, job_queue, runner, num_workers=1, poll_seconds=2.0, logger=None):
+        self.job_queue = job_queue
+        self.runner = runner
+        self.num_workers = num_workers
+        self.poll_seconds = poll_seconds
+        self.logger = logger or module_logger
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._running_leases = set()
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def start(self):
+        for index in range(self.num_workers):
+            thread = threading.Thread(target=self._work, name=f"training-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        heartbeat_thread = threading.Thread(target=self._heartbeat, name="training-heartbeat", daemon=True)
+        heartbeat_thread.start()
+        self._threads.append(heartbeat_thread)
+
+    def notify(self):
+        self._wakeup.set()
+
+    def shutdown(self, timeout=None):
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _work(self):
+        while not self._stopping.is_set():
+            try:
+                job = self.job_queue.claim()
+            except sqlite3.Error as e:
+                self.logger.error(f"Could not claim a training job: {e}")
+                job = None
+            if job is None:
+                self._wakeup.wait(self.poll_seconds)
+                self._wakeup.clear()
+                continue
+            self._run(job)
+
+    def _run(self, job):
+        lease_id = job["lease_id"]
+        with self._lock:
+            self._running_leases.add(lease_id)
+        UPLOAD_STAGE_SECONDS.labels("queue_wait").observe(job["queued_seconds"])
+        self.logger.info(f"Running training job {job['job_id']} for user {job['user_id']} (attempt {job['attempts']}).")
+        try:
+            success, message = self.runner(job, JobReporter(self.job_queue, lease_id))
+            self.job_queue.complete(lease_id, success, message)
+        except Exception as e:
+            self.logger.error(f"Training job {job['job_id']} for user {job['user_id']} crashed: {e}", exc_info=True)
+            self.job_queue.fail_attempt(lease_id, f"Training job failed: {e}")
+        finally:
+            with self._lock:
+                self._running_leases.discard(lease_id)
+
+    def _heartbeat(self):
+        interval = self.job_queue.lease_seconds / 3.0
+        while not self._stopping.wait(interval):
+            with self._lock:
+                lease_ids = list(self._running_leases)
+            try:
+                self.job_queue.heartbeat(lease_ids)
+            except sqlite3.Error as e:
+                self.logger.error(f"Could not renew training job leases: {e}")
+
+
+def get_job_queue(app_config):
+    """
+    Returns this process's handle on the configured job database, creating it on first use.
+    AI_JOB_WORKERS caps the jobs running on the host, across all server processes.
+    """
+    db_path = app_config.get('AI_JOB_DB_PATH', 'training_jobs.sqlite3')
+    max_running = int(app_config.get('AI_JOB_WORKERS', 1))
+    with _shared_lock:
+        if db_path not in _shared_queues:
+            _shared_queues[db_path] = JobQueue(
+                db_path,
+                max_attempts=int(app_config.get('AI_JOB_MAX_ATTEMPTS', 3)),
+                retry_backoff_seconds=float(app_config.get('AI_JOB_RETRY_BACKOFF_SECONDS', 30.0)),
+                lease_seconds=float(app_config.get('AI_JOB_LEASE_SECONDS', 300.0)),
+                max_finished_jobs=int(app_config.get('AI_JOB_HISTORY_LIMIT', 1000)),
+                max_running=max_running if max_running > 0 else None,
+            )
+        return _shared_queues[db_path]
+
+
+def _run_training_job(app_config, logger):
+    def runner(job, reporter):
+        from .training_process import run_job_in_subprocess, resolve_job_runner
+        if app_config.get('AI_JOB_ISOLATION', 'process') == 'process':
+            return run_job_in_subprocess(job, reporter, app_config, logger)
+        # Resolved on first use: the pipeline pulls in TensorFlow.
+        return resolve_job_runner(app_config)(job, reporter, app_config, logger)
+    return runner
+
+
+def start_training_workers(app):
+    """
+    Starts this process's training workers (AI_JOB_WORKERS threads), which also
+    resume jobs left queued or interrupted by a previous run. Every gunicorn
+    worker runs a pool, but the queue lets only AI_JOB_WORKERS jobs run on the
+    host at once; the other pools' threads wait in claim(). Not started under
+    TESTING.
+    """
+    num_workers = int(app.config.get('AI_JOB_WORKERS', 1))
+    if num_workers <= 0 or app.config.get('TESTING', False):
+        return None
+    app_config = dict(app.config)
+    job_queue = get_job_queue(app_config)
+    with _shared_lock:
+        pool = _shared_pools.get(job_queue.db_path)
+        if pool is None:
+            pool = TrainingWorkerPool(
+                job_queue,
+                _run_training_job(app_config, app.logger),
+                num_workers=num_workers,
+                poll_seconds=float(app_config.get('AI_JOB_POLL_SECONDS', 2.0)),
+                logger=app.logger
+            )
+            pool.start()
+            _shared_pools[job_queue.db_path] = pool
+    return pool
+
+
+def notify_training_workers(app_config):
+    """Wakes this process's training workers, if it runs any, so a new job starts without polling delay."""
+    with _shared_lock:
+        pool = _shared_pools.get(app_config.get('AI_JOB_DB_PATH', 'training_jobs.sqlite3'))
+    if pool is not None:
+        pool.notify()
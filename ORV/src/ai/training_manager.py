@@ -1,21 +1,47 @@
 import os
+import time
+import numpy as np
 import tensorflow as tf
 from keras import optimizers
-from keras.callbacks import ModelCheckpoint, ReduceLROnPlateau, EarlyStopping
+from keras.callbacks import ModelCheckpoint, ReduceLROnPlateau, EarlyStopping, LambdaCallback
 from flask import current_app
 import logging
 
-from .model_components import FacesSequence, build_vggface_classifier
+from .model_components import FacesSequence, build_vggface_classifier, HeadCheckpoint
+from .head_model import extract_head_weights, load_head_weights, promote_head
+from .model_cache import invalidate_user_models
+from .model_export import export_user_model
+from .metrics import TRAINING_PHASE_SECONDS
+
+def _validation_features(training_model, val_sequence):
+    """Returns the pooled backbone features and labels of the validation set, or (None, None) without one."""
+    if len(val_sequence.samples) == 0:
+        return None, None
+    feature_model = tf.keras.Model(training_model.input, training_model.get_layer("gap").output)
+    features, labels = [], []
+    for batch_index in range(len(val_sequence)):
+        images, batch_labels = val_sequence[batch_index]
+        if len(images) == 0:
+            continue
+        features.append(feature_model.predict(images, verbose=0))
+        labels.append(np.asarray(batch_labels).reshape(-1))
+    if not features:
+        return None, None
+    return np.concatenate(features), np.concatenate(labels)
 
 def train_model_for_user(
     user_id: str,
     base_data_dir: str, 
     base_models_dir: str, 
     app_config: dict, 
-    logger=None
+    logger=None,
+    progress_callback=None,
+    phase_callback=None
 ):
     if logger is None:
         logger = current_app.logger if current_app else logging.getLogger(__name__)
+    # A training process hands phase timings to its parent, which serves /metrics.
+    record_phase = phase_callback or (lambda phase, seconds: TRAINING_PHASE_SECONDS.labels(phase).observe(seconds))
 
     logger.info(f"Starting training process for user_id: {user_id}")
 
@@ -28,6 +54,8 @@ def train_model_for_user(
     lr_finetune = app_config.get('AI_LEARNING_RATE_FINETUNE', 0.00005) 
     optimal_l2_reg = app_config.get('AI_OPTIMAL_L2_REG', 0.0005)     
     optimal_dropout_dense = app_config.get('AI_OPTIMAL_DROPOUT_DENSE', 0.5) 
+    # In 'head' mode the backbone stays frozen and shared, so only the head is trained and saved.
+    head_only = app_config.get('AI_VERIFICATION_MODE', 'classifier') == 'head'
 
     # --- Path Definitions ---
     train_data_root_path = os.path.join(base_data_dir, 'train') 
@@ -37,6 +65,9 @@ def train_model_for_user(
     os.makedirs(user_model_save_dir, exist_ok=True)
     model_checkpoint_path = os.path.join(user_model_save_dir, 'best_vggface_model.keras')
     full_model_save_path = os.path.join(user_model_save_dir, 'full_vggface_model.keras')
+    head_save_path = os.path.join(user_model_save_dir, app_config.get('AI_HEAD_FILENAME', 'head_weights.npz'))
+    # Checkpoints go to a candidate file; the live head is only replaced once training is done.
+    candidate_head_path = f"{os.path.splitext(head_save_path)[0]}.candidate.npz"
 
     # --- Class Names Definition ---
     class_names = ["not_user", user_id] 
@@ -101,13 +132,18 @@ def train_model_for_user(
         return False, f"Model building failed: {e}"
 
     # --- Callback Definitions ---
-    checkpoint = ModelCheckpoint(
-        model_checkpoint_path, 
-        monitor="val_accuracy",
-        save_best_only=True,
-        mode="max",
-        verbose=1
-    )
+    if head_only:
+        if os.path.exists(candidate_head_path):
+            os.remove(candidate_head_path)
+        checkpoint = HeadCheckpoint(candidate_head_path, monitor="val_accuracy", logger=logger)
+    else:
+        checkpoint = ModelCheckpoint(
+            model_checkpoint_path, 
+            monitor="val_accuracy",
+            save_best_only=True,
+            mode="max",
+            verbose=1
+        )
     early_stopping = EarlyStopping(
         monitor="val_loss",
         patience=5, 
@@ -129,6 +165,12 @@ def train_model_for_user(
     if len(val_sequence.samples) == 0: 
         logger.warning("No validation data; removing validation-dependent callbacks (ModelCheckpoint, EarlyStopping, ReduceLROnPlateau).")
         callbacks_list = []
+    if progress_callback is not None:
+        # Reports (epochs finished, epochs planned); early stopping may end training sooner.
+        total_epochs = initial_epochs + (0 if head_only else fine_tune_epochs)
+        callbacks_list.append(LambdaCallback(
+            on_epoch_end=lambda epoch, logs: progress_callback(epoch + 1, total_epochs)
+        ))
 
     # --- Phase 1: Training Classifier Head ---
     logger.info(f"--- Phase 1: Training classifier head for user {user_id} ---")
@@ -137,6 +179,7 @@ def train_model_for_user(
         loss="binary_crossentropy", 
         metrics=["accuracy"]
     )
+    phase_started_at = time.perf_counter()
     try:
         history_initial = training_model.fit(
             train_sequence,
@@ -149,6 +192,28 @@ def train_model_for_user(
     except Exception as e:
         logger.error(f"Error during initial training phase for user {user_id}: {e}")
         return False, f"Initial training phase failed: {e}"
+    record_phase("head", time.perf_counter() - phase_started_at)
+
+    if head_only:
+        try:
+            if os.path.exists(candidate_head_path):
+                candidate_head = load_head_weights(candidate_head_path)
+            else:
+                candidate_head = extract_head_weights(training_model)
+            features, labels = _validation_features(training_model, val_sequence)
+            promoted, promote_message = promote_head(candidate_head, head_save_path, features, labels)
+            logger.info(f"{promote_message} User {user_id}, head at {head_save_path}; skipping backbone fine-tuning.")
+        except Exception as e:
+            logger.error(f"Failed to save head for user {user_id}: {e}")
+            return False, f"Head saving failed: {e}"
+        finally:
+            if os.path.exists(candidate_head_path):
+                os.remove(candidate_head_path)
+
+        if promoted:
+            invalidate_user_models(user_id)
+        logger.info(f"Training completed successfully for user {user_id}.")
+        return True, f"Training completed. {promote_message}"
 
     # --- Phase 2: Fine-tuning Model ---
     logger.info(f"--- Phase 2: Fine-tuning model for user {user_id} ---")
@@ -170,6 +235,7 @@ def train_model_for_user(
     
     total_epochs_for_finetune_phase = start_epoch_for_finetune + fine_tune_epochs
 
+    phase_started_at = time.perf_counter()
     try:
         training_model.fit(
             train_sequence,
@@ -183,6 +249,7 @@ def train_model_for_user(
     except Exception as e:
         logger.error(f"Error during fine-tuning phase for user {user_id}: {e}")
         return False, f"Fine-tuning phase failed: {e}"
+    record_phase("fine_tune", time.perf_counter() - phase_started_at)
 
     # --- Save Final Model ---
     try:
@@ -197,5 +264,22 @@ def train_model_for_user(
         logger.error(f"Failed to save final model for user {user_id}: {e}")
         return False, f"Model saving failed: {e}"
 
+    # --- Optional Quantized Export ---
+    if app_config.get('AI_EXPORT_TFLITE', False):
+        phase_started_at = time.perf_counter()
+        export_source_model = training_model
+        if os.path.exists(model_checkpoint_path):
+            try:
+                export_source_model = tf.keras.models.load_model(model_checkpoint_path, compile=False)
+            except Exception as e:
+                logger.warning(f"Could not load best checkpoint for export, exporting final model instead: {e}")
+        export_success, export_message = export_user_model(
+            user_id, export_source_model, base_data_dir, user_model_save_dir, app_config, logger
+        )
+        if not export_success:
+            logger.warning(f"Quantized export for user {user_id} failed: {export_message}")
+        record_phase("tflite_export", time.perf_counter() - phase_started_at)
+
+    invalidate_user_models(user_id)
     logger.info(f"Training completed successfully for user {user_id}.")
     return True, f"Training completed. Model saved at {user_model_save_dir}"
@@ -1,90 +1,150 @@
 import os
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '1' 
 
-import threading
+import time
 from flask import current_app 
 import logging
 
 from .data_processor import split_user_images_for_training, apply_offline_augmentations 
 from .training_manager import train_model_for_user
+from .enrollment_manager import enroll_user_template
+from .video_sampling import ingest_pending_videos
+from .training_jobs import get_job_queue, notify_training_workers, TRAINING_STAGES, ENROLLMENT_STAGES
 
-def start_user_training_pipeline(user_id: str, source_uploaded_images_dir: str):
+def _run_job_stage(reporter, stage: str, target, **kwargs):
+    """Runs one stage of a job, reporting its duration (for /metrics and the job's status)."""
+    reporter.start_stage(stage)
+    started_at = time.perf_counter()
+    result = target(**kwargs)
+    reporter.finish_stage(stage, time.perf_counter() - started_at, message=result[1])
+    return result
+
+def run_user_training_job(job: dict, reporter, app_config: dict, logger=None):
     """
-    Orchestrates the data preparation and initiates model training for a user.
-    This function is intended to be called from the Flask server.
-    Training itself will run in a background thread.
+    Training worker entry point: samples uploaded videos into frames, prepares
+    the user's data (split, offline augmentation) and trains the model, or
+    enrolls the template in 'template' mode, reporting stage, progress and
+    timings through reporter.
 
-    Args:
-        user_id (str): The ID of the user.
-        source_uploaded_images_dir (str): Path to the directory where this user's
-                                          images were initially uploaded by the server.
     Returns:
-        bool: True if training initiation was successful, False otherwise.
+        bool: True if training (or enrollment) succeeded, False otherwise.
         str: Message indicating status.
     """
-    logger = current_app.logger if current_app else logging.getLogger(__name__)
-    app_config = current_app.config
-
-    # --- Configuration Loading ---
+    if logger is None:
+        logger = logging.getLogger(__name__)
+    job_id = job["job_id"]
+    user_id = job["user_id"]
+    source_uploaded_images_dir = job["source_dir"]
     base_data_dir = app_config.get('DATA_DIR')
     base_models_dir = app_config.get('MODELS_DIR')
-    train_ratio = app_config.get('AI_TRAIN_RATIO', 0.8)
-    val_ratio = app_config.get('AI_VALIDATION_RATIO', 0.15)
 
-    if not all([base_data_dir, base_models_dir]):
-        logger.error("DATA_DIR or MODELS_DIR not configured in Flask app.")
-        return False, "Server configuration error for AI paths."
+    # --- Step 0: Video Sampling ---
+    if "video" in job["stages"]:
+        video_success, video_message = _run_job_stage(
+            reporter, "video", ingest_pending_videos,
+            user_id=user_id,
+            source_image_dir=source_uploaded_images_dir,
+            app_config=app_config,
+            logger=logger,
+            progress_callback=reporter.report_progress
+        )
+        if not video_success:
+            logger.warning(f"Video sampling for user {user_id} reported an issue: {video_message}")
 
-    logger.info(f"Initiating training pipeline for user: {user_id}")
-    logger.info(f"Source images for {user_id} from: {source_uploaded_images_dir}")
+    # --- Template Mode: Enrollment Replaces Splitting and Training ---
+    if "enroll" in job["stages"]:
+        return _run_job_stage(
+            reporter, "enroll", enroll_user_template,
+            user_id=user_id, source_image_dir=source_uploaded_images_dir,
+            app_config=app_config, logger=logger
+        )
 
     # --- Step 1: Data Preparation and Splitting ---
-    logger.info(f"Preparing data for user {user_id}...")
-    split_success, split_message, user_train_data_path = split_user_images_for_training( 
+    logger.info(f"Preparing data for user {user_id} (job {job_id})...")
+    split_success, split_message, user_train_data_path = _run_job_stage(
+        reporter, "split", split_user_images_for_training,
         user_id=user_id,
         source_image_dir=source_uploaded_images_dir,
         base_data_dir=base_data_dir,
-        train_ratio=train_ratio,
-        validation_ratio=val_ratio,
-        logger=logger
+        train_ratio=app_config.get('AI_TRAIN_RATIO', 0.8),
+        validation_ratio=app_config.get('AI_VALIDATION_RATIO', 0.15),
+        logger=logger,
+        app_config=app_config
     )
-
     if not split_success:
         logger.error(f"Data preparation failed for user {user_id}: {split_message}")
         return False, f"Data preparation failed: {split_message}"
     logger.info(f"Data preparation successful for user {user_id}: {split_message}")
 
     # --- Step 1.5: Offline Augmentation ---
-    if user_train_data_path: 
-        logger.info(f"Starting offline augmentation for user {user_id} training data.")
-        aug_success, aug_message = apply_offline_augmentations( 
-            user_id=user_id,
-            user_train_data_path=user_train_data_path,
-            app_config=dict(app_config), 
-            logger=logger
-        )
-        if not aug_success:
-            logger.warning(f"Offline augmentation step for user {user_id} reported an issue: {aug_message}")
-        else:
-            logger.info(f"Offline augmentation step for user {user_id} completed: {aug_message}")
+    aug_success, aug_message = _run_job_stage(
+        reporter, "augment", apply_offline_augmentations,
+        user_id=user_id,
+        user_train_data_path=user_train_data_path,
+        app_config=app_config,
+        logger=logger,
+        progress_callback=reporter.report_progress
+    )
+    if not aug_success:
+        logger.warning(f"Offline augmentation step for user {user_id} reported an issue: {aug_message}")
+
+    # --- Step 2: Training ---
+    return _run_job_stage(
+        reporter, "train", train_model_for_user,
+        user_id=user_id,
+        base_data_dir=base_data_dir,
+        base_models_dir=base_models_dir,
+        app_config=app_config,
+        logger=logger,
+        progress_callback=reporter.report_progress,
+        phase_callback=reporter.record_phase
+    )
+
+def start_user_training_pipeline(user_id: str, source_uploaded_images_dir: str):
+    """
+    Queues data preparation and model training for a user's uploaded images.
+    This function is intended to be called from the Flask server; the job is
+    stored in the persistent job queue and run by the training workers, so the
+    request returns immediately.
+
+    Args:
+        user_id (str): The ID of the user.
+        source_uploaded_images_dir (str): Path to the directory where this user's
+                                          images were initially uploaded by the server.
+    Returns:
+        bool: True if the job was queued, False otherwise.
+        str: Message indicating status.
+        str: The job id to query at /user/jobs/<id>, or None.
+    """
+    logger = current_app.logger if current_app else logging.getLogger(__name__)
+    app_config = current_app.config
+
+    # --- Configuration Validation ---
+    if not all([app_config.get('DATA_DIR'), app_config.get('MODELS_DIR')]):
+        logger.error("DATA_DIR or MODELS_DIR not configured in Flask app.")
+        return False, "Server configuration error for AI paths.", None
+
+    logger.info(f"Initiating training pipeline for user: {user_id}")
+    logger.info(f"Source images for {user_id} from: {source_uploaded_images_dir}")
+
+    # --- Job Scheduling: First Enrollments Go Ahead of Retraining ---
+    template_mode = app_config.get('AI_VERIFICATION_MODE', 'classifier') == 'template'
+    if os.path.isdir(os.path.join(app_config.get('MODELS_DIR'), user_id)):
+        priority = int(app_config.get('AI_JOB_PRIORITY_RETRAIN', 0))
     else:
-        logger.error(f"Skipping offline augmentation for user {user_id} due to previous data splitting failure or invalid path.")
-    
-    # --- Step 2: Launch Training in Background Thread ---
-    logger.info(f"Attempting to launch training for user {user_id} in a background thread.")
+        priority = int(app_config.get('AI_JOB_PRIORITY_NEW_USER', 10))
     try:
-        thread_app_config = dict(app_config)
-
-        training_thread = threading.Thread(
-            target=train_model_for_user,
-            args=(user_id, base_data_dir, base_models_dir, thread_app_config, logger)
+        job_id = get_job_queue(app_config).enqueue(
+            user_id, source_uploaded_images_dir,
+            ENROLLMENT_STAGES if template_mode else TRAINING_STAGES,
+            priority=priority
         )
-        training_thread.daemon = True 
-        training_thread.start()
-        
-        msg = f"AI model training initiated in background for user {user_id}."
-        logger.info(msg)
-        return True, msg
     except Exception as e:
-        logger.error(f"Failed to start training thread for user {user_id}: {e}")
-        return False, f"Failed to start training thread: {e}"
+        logger.error(f"Failed to queue training job for user {user_id}: {e}")
+        return False, f"Failed to queue training job: {e}", None
+    notify_training_workers(app_config)
+
+    kind = "Template enrollment" if template_mode else "Data preparation and training"
+    msg = f"{kind} queued for user {user_id} (job {job_id})."
+    logger.info(msg)
+    return True, msg, job_id
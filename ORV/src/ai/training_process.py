@@ -0,0 +1,195 @@
+import os
+import time
+import logging
+import threading
+import importlib
+import multiprocessing
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; memory caps are skipped there.
+    resource = None
+
+module_logger = logging.getLogger(__name__)
+
+# How often the parent checks that its job still holds the lease while the training process runs.
+LEASE_CHECK_SECONDS = 5.0
+
+# Failures that would recur on retry under the same memory limit; the job is failed, not retried.
+_OUT_OF_MEMORY_ERRORS = ('MemoryError', 'ResourceExhaustedError')
+
+
+def resolve_job_runner(app_config):
+    """Imports the AI_JOB_RUNNER function ('module:function'), which runs one job as runner(job, reporter, app_config, logger)."""
+    runner_path = app_config.get('AI_JOB_RUNNER', 'src.ai.training_pipeline:run_user_training_job')
+    module_name, function_name = runner_path.split(':')
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+class _PipeReporter:
+    """JobReporter stand-in inside the training process; forwards every report to the parent."""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def start_stage(self, stage):
+        self._conn.send(("start_stage", (stage,)))
+
+    def report_progress(self, done, total):
+        self._conn.send(("report_progress", (done, total)))
+
+    def finish_stage(self, stage, seconds, message=None):
+        self._conn.send(("finish_stage", (stage, seconds, message)))
+
+    def record_phase(self, phase, seconds):
+        self._conn.send(("record_phase", (phase, seconds)))
+
+
+class _PipeLogHandler(logging.Handler):
+    """Streams the training process's log records to the parent, which logs them under its own logger."""
+
+    def __init__(self, conn):
+        super().__init__()
+        self._conn = conn
+
+    def emit(self, record):
+        try:
+            self._conn.send(("log", (record.levelno, self.format(record))))
+        except Exception:
+            self.handleError(record)
+
+
+def _apply_memory_limit(limit_mb, logger):
+    """Caps this process's address space, so a runaway job fails with MemoryError instead of swapping the host."""
+    if not limit_mb or resource is None:
+        return
+    limit_bytes = int(limit_mb) * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit_bytes, limit_bytes))
+    logger.info(f"Training process {os.getpid()} address space capped at {int(limit_mb)} MB.")
+
+
+def _host_cpu_consumers(app_config):
+    """
+    Number of processes that share the host's cores while a job runs: the
+    SERVER_WORKERS serving processes plus up to AI_JOB_WORKERS concurrent jobs,
+    which the job queue caps host-wide.
+    """
+    serving_processes = max(1, int(app_config.get('SERVER_WORKERS', 1)))
+    concurrent_jobs = max(1, int(app_config.get('AI_JOB_WORKERS', 1)))
+    return serving_processes + concurrent_jobs
+
+
+def _exit_with_parent():
+    """Stops the training process when its parent dies (e.g. SIGKILL), so an orphan never keeps
+    training after the job's lease expires and another worker has started it again."""
+    multiprocessing.parent_process().join()
+    os._exit(1)
+
+
+def _training_process_main(job, app_config, conn):
+    """
+    Training process entry point: applies the thread and memory caps, runs the
+    job and sends ("result", (success, message)) or ("error", message) back.
+    Running out of memory is reported as a failed result, so the job is not retried.
+    """
+    threading.Thread(target=_exit_with_parent, name="parent-watch", daemon=True).start()
+    logger = logging.getLogger(f"training_job.{job['job_id']}")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.addHandler(_PipeLogHandler(conn))
+    try:
+        # A training process runs its job in-process; it must not start job workers of its own.
+        cpu_consumers = _host_cpu_consumers(app_config)
+        app_config = dict(app_config, AI_JOB_WORKERS=0)
+        if app_config.get('AI_JOB_TF_INTRA_OP_THREADS') is not None:
+            app_config['AI_TF_INTRA_OP_THREADS'] = app_config['AI_JOB_TF_INTRA_OP_THREADS']
+        if app_config.get('AI_JOB_TF_INTER_OP_THREADS') is not None:
+            app_config['AI_TF_INTER_OP_THREADS'] = app_config['AI_JOB_TF_INTER_OP_THREADS']
+
+        from .thread_limits import apply_thread_limits
+        apply_thread_limits(app_config, num_workers=cpu_consumers, logger=logger)
+        _apply_memory_limit(app_config.get('AI_JOB_MEMORY_LIMIT_MB'), logger)
+
+        runner = resolve_job_runner(app_config)
+        success, message = runner(job, _PipeReporter(conn), app_config, logger)
+        conn.send(("result", (success, message)))
+    except Exception as e:
+        if type(e).__name__ in _OUT_OF_MEMORY_ERRORS:
+            conn.send(("result", (False, f"Training process ran out of memory (AI_JOB_MEMORY_LIMIT_MB): {e}")))
+            return
+        logger.error(f"Training job {job['job_id']} raised: {e}", exc_info=True)
+        conn.send(("error", f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
+
+def run_job_in_subprocess(job, reporter, app_config, logger=None):
+    """
+    Runs one training job in a freshly spawned process, so the memory
+    TensorFlow allocates for it is returned to the OS when the job ends and
+    the serving process stays flat. Stage reports and log records are streamed
+    back while it runs.
+
+    Returns:
+        bool: True if the job succeeded, False otherwise.
+        str: Message indicating status.
+
+    The process is killed if the job loses its lease (reporter.holds_lease()),
+    so it never trains alongside the worker that was given the job after it.
+
+    Raises:
+        RuntimeError: If the process raised, crashed, ran past AI_JOB_TIMEOUT_SECONDS
+                      or lost its lease; the worker pool then retries the job.
+    """
+    if logger is None:
+        logger = module_logger
+    timeout = app_config.get('AI_JOB_TIMEOUT_SECONDS')
+    deadline = time.monotonic() + float(timeout) if timeout else None
+
+    context = multiprocessing.get_context('spawn')
+    result_conn, child_conn = context.Pipe(duplex=False)
+    process = context.Process(
+        target=_training_process_main,
+        args=(job, dict(app_config), child_conn),
+        name=f"training-{job['job_id']}",
+        daemon=True
+    )
+    process.start()
+    child_conn.close()
+    logger.info(f"Training job {job['job_id']} for user {job['user_id']} running in process {process.pid}.")
+
+    outcome = None
+    next_lease_check = time.monotonic() + LEASE_CHECK_SECONDS
+    try:
+        while True:
+            if deadline is not None and time.monotonic() > deadline:
+                process.kill()
+                raise RuntimeError(f"Training process exceeded {timeout} s and was stopped.")
+            if time.monotonic() > next_lease_check:
+                if not reporter.holds_lease():
+                    process.kill()
+                    raise RuntimeError("Training job lost its lease; its process was stopped.")
+                next_lease_check = time.monotonic() + LEASE_CHECK_SECONDS
+            if not result_conn.poll(1.0):
+                continue
+            try:
+                kind, payload = result_conn.recv()
+            except EOFError:
+                break
+            if kind == "log":
+                level, message = payload
+                logger.log(level, message)
+            elif kind in ("result", "error"):
+                outcome = (kind, payload)
+            else:
+                getattr(reporter, kind)(*payload)
+    finally:
+        result_conn.close()
+        process.join()
+
+    if outcome is None:
+        raise RuntimeError(f"Training process exited with code {process.exitcode} before reporting a result.")
+    kind, payload = outcome
+    if kind == "error":
+        raise RuntimeError(payload)
+    return payload
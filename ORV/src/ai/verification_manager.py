@@ -1,70 +1,231 @@
 import os
-import cv2 as cv
+import time
 import numpy as np
-from keras.models import load_model
-from keras_vggface.utils import preprocess_input as vggface_preprocess_input
 from flask import current_app
 import logging
+import functools
 
-def verify_user_with_image(user_id: str, image_bytes: bytes, app_config: dict, logger=None):
+from .model_cache import get_model_cache
+from .head_model import load_head_weights, evaluate_head
+from .backbone import get_shared_backbone
+from .model_components import preprocess_face_image
+from .image_decoding import get_decode_pool
+from .face_detection import decode_model_frame
+from .enrollment_manager import load_user_embedding, l2_normalize
+from .embedding_index import get_embedding_index
+from .inference_executor import get_inference_executor
+from .compiled_inference import CompiledPredictor, DEFAULT_BATCH_BUCKETS
+from .model_export import load_tflite_model
+from .warmup import make_dummy_batch
+from .metrics import VERIFY_STAGE_SECONDS
+from .frame_aggregation import aggregate_frame_scores, is_decision_settled, AGGREGATION_METHODS
+
+BACKBONE_MODEL_KEY = "shared_backbone"
+
+def _preprocess_frames(frames, app_config: dict):
+    """Preprocesses (N, H, W, 3) uint8 BGR frames into a model input batch."""
+    image_size_config = app_config.get('AI_MODEL_INPUT_SIZE', (224, 224))
+    cv_image_size = (image_size_config[1], image_size_config[0])
+    vggface_preprocess_version = int(app_config.get('AI_VGGFACE_PREPROCESS_VERSION', 1))
+    return np.stack([preprocess_face_image(frame, cv_image_size, vggface_preprocess_version) for frame in frames])
+
+def _decode_and_preprocess(image_bytes: bytes, app_config: dict):
+    """Decodes image bytes into a (1, H, W, 3) preprocessed batch, or None if undecodable.
+
+    With AI_FACE_CROP_ENABLED None is also returned when no face is found.
     """
-    Verifies if the provided image matches the specified user_id using their trained model.
+    started_at = time.perf_counter()
+    frame = decode_model_frame(image_bytes, app_config)
+    decoded_at = time.perf_counter()
+    VERIFY_STAGE_SECONDS.labels("decode").observe(decoded_at - started_at)
+    if frame is None:
+        return None
+    img_batch = _preprocess_frames(frame[np.newaxis, ...], app_config)
+    VERIFY_STAGE_SECONDS.labels("preprocess").observe(time.perf_counter() - decoded_at)
+    return img_batch
 
-    Args:
-        user_id (str): The ID of the user to verify against.
-        image_bytes (bytes): The image file in bytes.
-        app_config (dict): Application configuration.
-        logger: Optional logger instance.
+def _classifier_predict_fn(cached_model, app_config: dict):
+    """Returns a batch predict function for a cached per-user classifier.
 
-    Returns:
-        tuple: (is_match: bool, probability: float, message: str)
+    With AI_COMPILED_INFERENCE the model is traced once into fixed-signature
+    functions (kept on the cache entry) instead of going through Model.predict.
     """
-    if logger is None:
-        logger = current_app.logger if current_app else logging.getLogger(__name__)
+    if not app_config.get('AI_COMPILED_INFERENCE', True):
+        def predict(img_batch):
+            with cached_model.lock:
+                return cached_model.model.predict(img_batch, verbose=0)[:, 0]
+        return predict
 
+    def predict_compiled(img_batch):
+        with cached_model.lock:
+            if cached_model.compiled_predictor is None:
+                batch_buckets = app_config.get('AI_INFERENCE_BATCH_BUCKETS', DEFAULT_BATCH_BUCKETS)
+                cached_model.compiled_predictor = CompiledPredictor(cached_model.model, batch_buckets)
+            return cached_model.compiled_predictor(img_batch)[:, 0]
+    return predict_compiled
+
+def _run_inference(model_key, predict_fn, img_batch, app_config: dict):
+    """Runs predict_fn on img_batch, through the micro-batching executor when it is enabled."""
+    if app_config.get('AI_INFERENCE_EXECUTOR_ENABLED', True):
+        timeout = float(app_config.get('AI_INFERENCE_TIMEOUT_SECONDS', 30))
+        return get_inference_executor(app_config).predict(model_key, predict_fn, img_batch, timeout=timeout)
+    return predict_fn(img_batch)
+
+def _load_user_scorer(user_id: str, app_config: dict, logger):
+    """
+    Resolves the user's model for the configured verification mode.
+
+    Returns:
+        tuple: (score_fn, threshold, error_message). score_fn maps a preprocessed
+        (N, H, W, 3) batch to N probabilities (similarities in 'template' mode);
+        it is None and error_message is set if the model could not be loaded.
+    """
     # --- Configuration Loading ---
+    verification_mode = app_config.get('AI_VERIFICATION_MODE', 'classifier')
+    use_tflite = app_config.get('AI_INFERENCE_BACKEND', 'keras') == 'tflite'
     base_models_dir = app_config.get('MODELS_DIR')
-    model_name = app_config.get('AI_BEST_MODEL_FILENAME', 'best_vggface_model.keras') 
+    if verification_mode == 'head':
+        model_name = app_config.get('AI_HEAD_FILENAME', 'head_weights.npz')
+    elif verification_mode == 'template':
+        model_name = app_config.get('AI_TEMPLATE_FILENAME', 'embedding.npy')
+    elif use_tflite:
+        model_name = app_config.get('AI_TFLITE_FILENAME', 'model.tflite')
+    else:
+        model_name = app_config.get('AI_BEST_MODEL_FILENAME', 'best_vggface_model.keras')
     model_path = os.path.join(base_models_dir, user_id, model_name)
     
-    image_size_config = app_config.get('AI_MODEL_INPUT_SIZE', (224, 224)) 
-    cv_image_size = (image_size_config[1], image_size_config[0])
-
-    verification_threshold = float(app_config.get('AI_VERIFICATION_THRESHOLD', 0.5))
-    vggface_preprocess_version = int(app_config.get('AI_VGGFACE_PREPROCESS_VERSION', 1))
+    if verification_mode == 'template':
+        verification_threshold = float(app_config.get('AI_TEMPLATE_SIMILARITY_THRESHOLD', 0.75))
+    else:
+        verification_threshold = float(app_config.get('AI_VERIFICATION_THRESHOLD', 0.5))
 
-    logger.info(f"Attempting verification for user_id: {user_id}")
+    logger.info(f"Attempting verification for user_id: {user_id} (mode: {verification_mode})")
     logger.info(f"Loading model from: {model_path}")
 
     # --- Model Loading ---
     if not os.path.exists(model_path):
         msg = f"Verification failed: Model for user {user_id} not found at {model_path}."
         logger.error(msg)
-        return False, 0.0, msg
+        return None, verification_threshold, msg
 
+    load_started_at = time.perf_counter()
     try:
-        trained_model = load_model(model_path, compile=False) 
-        logger.info(f"Model for user {user_id} loaded successfully.")
+        if verification_mode == 'head':
+            cached_model = get_model_cache(app_config).get(user_id, model_path, loader=load_head_weights)
+            backbone = get_shared_backbone(app_config, logger=logger)
+        elif verification_mode == 'template':
+            cached_model = get_model_cache(app_config).get(user_id, model_path, loader=load_user_embedding)
+            backbone = get_shared_backbone(app_config, logger=logger)
+        elif use_tflite:
+            cached_model = get_model_cache(app_config).get(user_id, model_path, loader=load_tflite_model)
+        else:
+            cached_model = get_model_cache(app_config).get(user_id, model_path)
+        logger.info(f"Model for user {user_id} ready.")
+        VERIFY_STAGE_SECONDS.labels("model_load").observe(time.perf_counter() - load_started_at)
     except Exception as e:
         msg = f"Verification failed: Error loading model for user {user_id}: {e}"
         logger.error(msg, exc_info=True)
-        return False, 0.0, msg
+        return None, verification_threshold, msg
+
+    # --- Scoring Function ---
+    if verification_mode == 'head':
+        def score_fn(img_batch):
+            features = _run_inference(BACKBONE_MODEL_KEY, backbone.compute_features, img_batch, app_config)
+            return evaluate_head(cached_model.model, features)
+    elif verification_mode == 'template':
+        def score_fn(img_batch):
+            features = _run_inference(BACKBONE_MODEL_KEY, backbone.compute_features, img_batch, app_config)
+            return l2_normalize(features) @ cached_model.model
+    elif use_tflite:
+        def tflite_predict(batch):
+            return cached_model.model.predict(batch)[:, 0]
+
+        def score_fn(img_batch):
+            return _run_inference(cached_model.key, tflite_predict, img_batch, app_config)
+    else:
+        def score_fn(img_batch):
+            return _run_inference(cached_model.key, _classifier_predict_fn(cached_model, app_config), img_batch, app_config)
+
+    return score_fn, verification_threshold, None
+
+def warm_up_backbone(app_config: dict, batch_sizes, logger=None):
+    """Loads the shared backbone and runs one dummy batch per batch size."""
+    if logger is None:
+        logger = current_app.logger if current_app else logging.getLogger(__name__)
+    image_size = app_config.get('AI_MODEL_INPUT_SIZE', (224, 224))
+    backbone = get_shared_backbone(app_config, logger=logger)
+    for batch_size in batch_sizes:
+        _run_inference(BACKBONE_MODEL_KEY, backbone.compute_features, make_dummy_batch(batch_size, image_size), app_config)
+
+def warm_up_user_model(user_id: str, app_config: dict, batch_sizes, logger=None):
+    """Loads a user's model into the cache and runs one dummy batch per batch size.
+
+    Returns:
+        bool: True if the model was loaded and warmed, False otherwise.
+    """
+    if logger is None:
+        logger = current_app.logger if current_app else logging.getLogger(__name__)
+    score_fn, _, _ = _load_user_scorer(user_id, app_config, logger)
+    if score_fn is None:
+        return False
+    image_size = app_config.get('AI_MODEL_INPUT_SIZE', (224, 224))
+    for batch_size in batch_sizes:
+        score_fn(make_dummy_batch(batch_size, image_size))
+    return True
+
+def score_user_frames(user_id: str, frames, app_config: dict, logger=None):
+    """
+    Scores decoded frames against a user's model; the entry point of inference pool workers.
+
+    Args:
+        user_id (str): The ID of the user to score against.
+        frames (np.ndarray): (N, H, W, 3) uint8 BGR frames from face_detection.decode_model_frame.
+        app_config (dict): Application configuration.
+
+    Returns:
+        tuple: (scores: list of float or None, threshold: float, error_message: str or None)
+    """
+    if logger is None:
+        logger = current_app.logger if current_app else logging.getLogger(__name__)
+    score_fn, verification_threshold, error_message = _load_user_scorer(user_id, app_config, logger)
+    if score_fn is None:
+        return None, 0.0, error_message
+    scores = score_fn(_preprocess_frames(frames, app_config))
+    return [float(score) for score in scores], float(verification_threshold), None
+
+def verify_user_with_image(user_id: str, image_bytes: bytes, app_config: dict, logger=None):
+    """
+    Verifies if the provided image matches the specified user_id using their trained model.
+
+    In 'classifier' mode the user's full VGGFace classifier is evaluated. In 'head' mode
+    the shared backbone computes the face feature and only the user's small head is evaluated.
+    In 'template' mode the returned probability is the cosine similarity between the face
+    embedding and the user's enrolled template.
+
+    Args:
+        user_id (str): The ID of the user to verify against.
+        image_bytes (bytes): The image file in bytes.
+        app_config (dict): Application configuration.
+        logger: Optional logger instance.
+
+    Returns:
+        tuple: (is_match: bool, probability: float, message: str)
+    """
+    if logger is None:
+        logger = current_app.logger if current_app else logging.getLogger(__name__)
+
+    # --- Model Loading ---
+    score_fn, verification_threshold, error_message = _load_user_scorer(user_id, app_config, logger)
+    if score_fn is None:
+        return False, 0.0, error_message
 
     # --- Image Preprocessing ---
     try:
-        nparr = np.frombuffer(image_bytes, np.uint8)
-        img = cv.imdecode(nparr, cv.IMREAD_COLOR)
-        if img is None:
-            msg = "Verification failed: Could not decode image."
+        img_batch = _decode_and_preprocess(image_bytes, app_config)
+        if img_batch is None:
+            msg = "Verification failed: Could not decode image or detect a face."
             logger.error(msg)
             return False, 0.0, msg
-
-        img_rgb = cv.cvtColor(img, cv.COLOR_BGR2RGB)
-        img_resized = cv.resize(img_rgb, cv_image_size) 
-        img_to_preprocess = img_resized.astype(np.float32)
-
-        img_processed = vggface_preprocess_input(img_to_preprocess, version=vggface_preprocess_version) 
-        img_batch = np.expand_dims(img_processed, axis=0)
         logger.debug("Image preprocessed successfully for verification.")
 
     except Exception as e:
@@ -74,7 +235,9 @@ def verify_user_with_image(user_id: str, image_bytes: bytes, app_config: dict, l
 
     # --- Prediction ---
     try:
-        prediction_prob = trained_model.predict(img_batch, verbose=0)[0][0]
+        predict_started_at = time.perf_counter()
+        prediction_prob = float(score_fn(img_batch)[0])
+        VERIFY_STAGE_SECONDS.labels("predict").observe(time.perf_counter() - predict_started_at)
         logger.info(f"Raw prediction probability for user {user_id}: {prediction_prob:.4f}")
     except Exception as e:
         msg = f"Verification failed: Error during model prediction: {e}"
@@ -91,4 +254,142 @@ def verify_user_with_image(user_id: str, image_bytes: bytes, app_config: dict, l
         message = f"User {user_id} NOT VERIFIED. Probability: {prediction_prob:.4f} (Threshold: {verification_threshold})"
         logger.info(message)
         
-    return bool(is_match), float(prediction_prob), message
\ No newline at end of file
+    return bool(is_match), float(prediction_prob), message
+
+
+def verify_user_with_images(user_id: str, images_bytes: list, app_config: dict, aggregation: str = None, logger=None):
+    """
+    Verifies a user against several frames of one attempt.
+
+    Frames are decoded and preprocessed in parallel, then scored in chunks of
+    AI_MULTI_FRAME_CHUNK_SIZE. Scoring stops early once the aggregate decision
+    is settled (see frame_aggregation.is_decision_settled).
+
+    Args:
+        user_id (str): The ID of the user to verify against.
+        images_bytes (list): The image files in bytes.
+        app_config (dict): Application configuration.
+        aggregation (str): 'mean', 'median' or 'vote'; defaults to AI_MULTI_FRAME_AGGREGATION.
+        logger: Optional logger instance.
+
+    Returns:
+        tuple: (is_match: bool, aggregate_score: float, frame_scores: list, message: str).
+        frame_scores is aligned with images_bytes; frames that could not be decoded
+        or were skipped by the early exit are None.
+    """
+    if logger is None:
+        logger = current_app.logger if current_app else logging.getLogger(__name__)
+
+    aggregation = aggregation or app_config.get('AI_MULTI_FRAME_AGGREGATION', 'mean')
+    if aggregation not in AGGREGATION_METHODS:
+        return False, 0.0, [], f"Verification failed: Unknown aggregation '{aggregation}'."
+    chunk_size = max(1, int(app_config.get('AI_MULTI_FRAME_CHUNK_SIZE', 4)))
+    min_frames = int(app_config.get('AI_MULTI_FRAME_MIN_FRAMES', 2))
+    early_exit_margin = float(app_config.get('AI_MULTI_FRAME_EARLY_EXIT_MARGIN', 0.2))
+
+    # --- Model Loading ---
+    score_fn, verification_threshold, error_message = _load_user_scorer(user_id, app_config, logger)
+    if score_fn is None:
+        return False, 0.0, [], error_message
+
+    # --- Parallel Image Preprocessing ---
+    try:
+        preprocess = functools.partial(_decode_and_preprocess, app_config=app_config)
+        img_batches = list(get_decode_pool(app_config).map(preprocess, images_bytes))
+    except Exception as e:
+        msg = f"Verification failed: Error during image preprocessing: {e}"
+        logger.error(msg, exc_info=True)
+        return False, 0.0, [], msg
+
+    frame_scores = [None] * len(images_bytes)
+    decodable_frames = [i for i, batch in enumerate(img_batches) if batch is not None]
+    if not decodable_frames:
+        msg = "Verification failed: Could not decode or detect a face in any image."
+        logger.error(msg)
+        return False, 0.0, frame_scores, msg
+
+    # --- Chunked Prediction with Early Exit ---
+    scores = []
+    try:
+        for start in range(0, len(decodable_frames), chunk_size):
+            chunk = decodable_frames[start:start + chunk_size]
+            predict_started_at = time.perf_counter()
+            chunk_scores = score_fn(np.concatenate([img_batches[i] for i in chunk], axis=0))
+            VERIFY_STAGE_SECONDS.labels("predict").observe(time.perf_counter() - predict_started_at)
+            for frame_index, score in zip(chunk, chunk_scores):
+                frame_scores[frame_index] = float(score)
+                scores.append(float(score))
+            if is_decision_settled(scores, len(decodable_frames), verification_threshold,
+                                   aggregation, early_exit_margin, min_frames):
+                break
+    except Exception as e:
+        msg = f"Verification failed: Error during model prediction: {e}"
+        logger.error(msg, exc_info=True)
+        return False, 0.0, frame_scores, msg
+
+    # --- Decision Making ---
+    aggregate_score, is_match = aggregate_frame_scores(scores, verification_threshold, aggregation)
+    outcome = "VERIFIED" if is_match else "NOT VERIFIED"
+    message = (f"User {user_id} {outcome}. {aggregation.capitalize()} score: {aggregate_score:.4f} "
+               f"over {len(scores)} of {len(images_bytes)} frames (Threshold: {verification_threshold})")
+    logger.info(message)
+    return bool(is_match), aggregate_score, frame_scores, message
+
+
+def identify_user_with_image(image_bytes: bytes, app_config: dict, top_k: int = 5, logger=None):
+    """
+    Finds the enrolled users most similar to the face in the image (1:N identification).
+
+    Args:
+        image_bytes (bytes): The image file in bytes.
+        app_config (dict): Application configuration.
+        top_k (int): Number of candidates to return.
+        logger: Optional logger instance.
+
+    Returns:
+        tuple: (candidates: list of {"user_id", "similarity", "is_match"}, message: str)
+    """
+    if logger is None:
+        logger = current_app.logger if current_app else logging.getLogger(__name__)
+
+    similarity_threshold = float(app_config.get('AI_TEMPLATE_SIMILARITY_THRESHOLD', 0.75))
+
+    # --- Index Loading ---
+    index = get_embedding_index(app_config, logger=logger)
+    if index is None or len(index) == 0:
+        msg = "Identification failed: No users are enrolled in the identification index."
+        logger.warning(msg)
+        return [], msg
+
+    # --- Image Preprocessing ---
+    try:
+        img_batch = _decode_and_preprocess(image_bytes, app_config)
+        if img_batch is None:
+            msg = "Identification failed: Could not decode image or detect a face."
+            logger.error(msg)
+            return [], msg
+    except Exception as e:
+        msg = f"Identification failed: Error during image preprocessing: {e}"
+        logger.error(msg, exc_info=True)
+        return [], msg
+
+    # --- Embedding and Search ---
+    try:
+        predict_started_at = time.perf_counter()
+        backbone = get_shared_backbone(app_config, logger=logger)
+        features = _run_inference(BACKBONE_MODEL_KEY, backbone.compute_features, img_batch, app_config)
+        VERIFY_STAGE_SECONDS.labels("predict").observe(time.perf_counter() - predict_started_at)
+        embedding = l2_normalize(features)[0]
+        results = index.search(embedding, top_k=top_k)
+    except Exception as e:
+        msg = f"Identification failed: Error during embedding search: {e}"
+        logger.error(msg, exc_info=True)
+        return [], msg
+
+    candidates = [
+        {"user_id": user_id, "similarity": similarity, "is_match": similarity >= similarity_threshold}
+        for user_id, similarity in results
+    ]
+    message = f"Identification returned {len(candidates)} candidates from {len(index)} enrolled users."
+    logger.info(message)
+    return candidates, message
@@ -0,0 +1,171 @@
+import os
+import shutil
+import logging
+from concurrent.futures import wait, FIRST_COMPLETED
+import cv2 as cv
+import numpy as np
+
+from .frame_ingest import get_ingest_pool, ingest_decoded_frame
+from .frame_dedup import select_diverse_frames
+
+# Frame rate assumed when the container does not report one.
+DEFAULT_VIDEO_FPS = 30.0
+
+# Uploaded videos wait in this subfolder of the user's upload folder until their job samples them.
+PENDING_VIDEO_DIRNAME = 'videos'
+
+# Side of the grayscale thumbnails compared for motion-based sampling.
+_MOTION_THUMBNAIL_SIZE = 32
+
+
+def _motion_thumbnail(frame):
+    gray = cv.cvtColor(frame, cv.COLOR_BGR2GRAY)
+    return cv.resize(gray, (_MOTION_THUMBNAIL_SIZE, _MOTION_THUMBNAIL_SIZE), interpolation=cv.INTER_AREA).astype(np.int16)
+
+
+def sample_video_frames(video_path, app_config):
+    """
+    Streams frames out of a video file, one decoded frame at a time.
+
+    Candidate frames are taken at VIDEO_SAMPLE_FPS; skipped frames are only
+    grabbed, not converted. With VIDEO_SAMPLING_MODE 'motion' a candidate is
+    yielded only if it differs from the last yielded frame by at least
+    VIDEO_MOTION_MIN_DIFF (mean absolute difference of small grayscale
+    thumbnails, 0-255). At most VIDEO_MAX_FRAMES frames are yielded.
+
+    Yields:
+        tuple: (frame_number, BGR frame)
+
+    Raises:
+        ValueError: If the file cannot be opened as a video.
+    """
+    sample_fps = float(app_config.get('VIDEO_SAMPLE_FPS', 5.0))
+    max_frames = int(app_config.get('VIDEO_MAX_FRAMES', 100))
+    motion_mode = app_config.get('VIDEO_SAMPLING_MODE', 'motion') == 'motion'
+    min_motion = float(app_config.get('VIDEO_MOTION_MIN_DIFF', 4.0))
+
+    capture = cv.VideoCapture(video_path)
+    if not capture.isOpened():
+        raise ValueError("Could not open video")
+    try:
+        video_fps = capture.get(cv.CAP_PROP_FPS) or DEFAULT_VIDEO_FPS
+        stride = max(1, int(round(video_fps / sample_fps)))
+        last_thumbnail = None
+        yielded = 0
+        frame_number = 0
+        while yielded < max_frames:
+            if not capture.grab():
+                break
+            if frame_number % stride == 0:
+                ok, frame = capture.retrieve()
+                if ok:
+                    thumbnail = _motion_thumbnail(frame) if motion_mode else None
+                    if last_thumbnail is None or thumbnail is None or \
+                            np.abs(thumbnail - last_thumbnail).mean() >= min_motion:
+                        last_thumbnail = thumbnail
+                        yielded += 1
+                        yield frame_number, frame
+            frame_number += 1
+    finally:
+        capture.release()
+
+
+def pending_videos(source_image_dir):
+    """Returns the uploaded videos in source_image_dir that have not been sampled yet."""
+    video_dir = os.path.join(source_image_dir, PENDING_VIDEO_DIRNAME)
+    if not os.path.isdir(video_dir):
+        return []
+    return sorted(os.path.join(video_dir, name) for name in os.listdir(video_dir)
+                  if os.path.isfile(os.path.join(video_dir, name)))
+
+
+def _sample_into_frames(video_path, output_dir, app_config):
+    """
+    Samples a video into normalized JPEG frames in output_dir, named <video>_frame_<n>.jpg.
+
+    Frames are handed to the ingest pool with a bounded number in flight, so
+    decoded frames never pile up in memory.
+
+    Returns:
+        list: (path, dHash thumbnail) of the frames written, in frame order.
+        int: Number of sampled frames that were rejected (e.g. no face).
+    """
+    stem = os.path.splitext(os.path.basename(video_path))[0]
+    ingest_pool = get_ingest_pool(app_config)
+    max_in_flight = 2 * int(app_config.get('INGEST_WORKERS', 4))
+    in_flight = set()
+    submitted = []
+    for frame_number, frame in sample_video_frames(video_path, app_config):
+        if len(in_flight) >= max_in_flight:
+            _, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+        frame_path = os.path.join(output_dir, f"{stem}_frame_{frame_number}.jpg")
+        future = ingest_pool.submit(ingest_decoded_frame, frame, frame_path, app_config)
+        in_flight.add(future)
+        submitted.append((frame_path, future))
+
+    frames = []
+    rejected = 0
+    for frame_path, future in submitted:
+        thumbnail, error = future.result()
+        if error:
+            rejected += 1
+        else:
+            frames.append((frame_path, thumbnail))
+    return frames, rejected
+
+
+def ingest_pending_videos(user_id, source_image_dir, app_config, logger=None, progress_callback=None):
+    """
+    Samples the videos uploaded for a user into frames next to their uploaded images.
+    Runs as the first stage of the user's training job, so the upload request never decodes video.
+
+    Frames go through the same ingest path as uploaded images (face crop or downscale)
+    and, with INGEST_DEDUP_ENABLED, near-duplicates within a video are dropped. Each
+    video is then removed, or moved to INGEST_ORIGINALS_FOLDER with INGEST_KEEP_ORIGINALS.
+    progress_callback, if given, is called as (videos done, total) after each video.
+
+    Returns:
+        bool: False if no pending video could be read, True otherwise.
+        str: Message indicating status.
+    """
+    if logger is None:
+        logger = logging.getLogger(__name__)
+    videos = pending_videos(source_image_dir)
+    if not videos:
+        return True, "No videos to sample."
+
+    frames_saved = duplicates_dropped = frames_rejected = unreadable = 0
+    for video_index, video_path in enumerate(videos):
+        try:
+            frames, rejected = _sample_into_frames(video_path, source_image_dir, app_config)
+        except ValueError as e:
+            logger.warning(f"Could not sample video {video_path} for user {user_id}: {e}")
+            frames, rejected = [], 0
+            unreadable += 1
+        frames_rejected += rejected
+
+        if frames and app_config.get('INGEST_DEDUP_ENABLED', False):
+            kept = select_diverse_frames([thumbnail for _, thumbnail in frames],
+                                         int(app_config.get('INGEST_DEDUP_MAX_DISTANCE', 5)),
+                                         app_config.get('INGEST_DEDUP_MAX_FRAMES'))
+            for index in set(range(len(frames))) - set(kept):
+                os.remove(frames[index][0])
+            duplicates_dropped += len(frames) - len(kept)
+            frames_saved += len(kept)
+        else:
+            frames_saved += len(frames)
+
+        if frames and app_config.get('INGEST_KEEP_ORIGINALS', False):
+            originals_folder = os.path.join(os.path.abspath(app_config.get('INGEST_ORIGINALS_FOLDER', 'uploads_originals')),
+                                            os.path.basename(os.path.normpath(source_image_dir)))
+            os.makedirs(originals_folder, exist_ok=True)
+            shutil.move(video_path, os.path.join(originals_folder, os.path.basename(video_path)))
+        else:
+            os.remove(video_path)
+        if progress_callback is not None:
+            progress_callback(video_index + 1, len(videos))
+
+    msg = (f"Sampled {frames_saved} frames from {len(videos)} videos for user {user_id} "
+           f"({duplicates_dropped} near-duplicates dropped, {frames_rejected} rejected, {unreadable} unreadable).")
+    logger.info(msg)
+    return unreadable < len(videos), msg
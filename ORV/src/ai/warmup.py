@@ -0,0 +1,153 @@
+import time
+import threading
+import logging
+import numpy as np
+
+module_logger = logging.getLogger(__name__)
+
+
+class ReadinessState:
+    """Tracks the startup warm-up so load balancers can gate traffic on it."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.ready = False
+        self.degraded = False
+        self.stage = "not_started"
+        self.error = None
+        self.attempts = 0
+        self.warmed_users = []
+        self.started_at = None
+        self.finished_at = None
+
+    def update(self, **fields):
+        with self._lock:
+            for name, value in fields.items():
+                setattr(self, name, value)
+
+    def snapshot(self):
+        with self._lock:
+            duration = None
+            if self.started_at is not None:
+                duration = (self.finished_at or time.time()) - self.started_at
+            return {
+                "ready": self.ready,
+                "degraded": self.degraded,
+                "stage": self.stage,
+                "error": self.error,
+                "attempts": self.attempts,
+                "warmed_users": list(self.warmed_users),
+                "warmup_seconds": duration,
+            }
+
+
+readiness = ReadinessState()
+
+
+def warm_up_inference(app_config: dict, logger=None):
+    """
+    Loads the shared backbone and the configured hot users' models, then runs
+    dummy inferences at every batch-size bucket so TF graph building and kernel
+    selection happen before the first real request.
+
+    Returns:
+        bool: True if warm-up completed, False otherwise.
+        str: Message indicating status.
+    """
+    if logger is None:
+        logger = module_logger
+
+    verification_mode = app_config.get('AI_VERIFICATION_MODE', 'classifier')
+    batch_sizes = tuple(app_config.get('AI_INFERENCE_BATCH_BUCKETS', (1, 2, 4, 8, 16)))
+    hot_users = list(app_config.get('AI_PRELOAD_USER_IDS', []))
+    readiness.update(stage="warming_up", started_at=time.time(), error=None)
+
+    try:
+        # --- Out-of-process Inference: the Pool Workers Warm Themselves Up ---
+        if int(app_config.get('AI_INFERENCE_POOL_PROCESSES', 0)) > 0:
+            from .inference_pool import get_inference_pool
+            readiness.update(stage="starting_inference_pool")
+            if not get_inference_pool(app_config).wait_until_ready():
+                raise RuntimeError("Inference pool workers did not become ready.")
+            readiness.update(ready=True, stage="ready", finished_at=time.time())
+            return True, "Inference pool workers are ready."
+
+        # Imported here so that serving /ready and /health never waits for TensorFlow.
+        from .verification_manager import warm_up_user_model, warm_up_backbone
+
+        if verification_mode in ('head', 'template'):
+            readiness.update(stage="loading_backbone")
+            warm_up_backbone(app_config, batch_sizes, logger=logger)
+
+        warmed_users = []
+        for user_id in hot_users:
+            readiness.update(stage=f"loading_user:{user_id}")
+            if warm_up_user_model(user_id, app_config, batch_sizes, logger=logger):
+                warmed_users.append(user_id)
+            else:
+                logger.warning(f"Warm-up skipped for user {user_id}: model could not be loaded.")
+    except Exception as e:
+        logger.error(f"Inference warm-up failed: {e}", exc_info=True)
+        readiness.update(stage="failed", error=str(e), finished_at=time.time())
+        return False, f"Warm-up failed: {e}"
+
+    readiness.update(ready=True, stage="ready", warmed_users=warmed_users, finished_at=time.time())
+    msg = f"Inference warm-up completed ({len(warmed_users)} hot users, batch sizes {batch_sizes})."
+    logger.info(msg)
+    return True, msg
+
+
+def prepare_shared_artifacts(app_config: dict, logger=None):
+    """Exports the TFLite backbone that worker processes memory-map, before any worker starts."""
+    from .backbone import ensure_tflite_backbone
+    ensure_tflite_backbone(app_config, logger=logger or module_logger)
+
+
+def warm_up_with_retries(app_config: dict, logger=None, sleep=time.sleep):
+    """
+    Runs warm_up_inference until it succeeds, waiting AI_WARMUP_RETRY_BACKOFF_SECONDS
+    (doubling, up to AI_WARMUP_RETRY_MAX_BACKOFF_SECONDS) between attempts.
+
+    After AI_WARMUP_MAX_ATTEMPTS failures the worker is marked ready but degraded:
+    it takes traffic and models are loaded lazily by the first requests.
+    """
+    if logger is None:
+        logger = module_logger
+    max_attempts = max(1, int(app_config.get('AI_WARMUP_MAX_ATTEMPTS', 5)))
+    backoff = float(app_config.get('AI_WARMUP_RETRY_BACKOFF_SECONDS', 5.0))
+    max_backoff = float(app_config.get('AI_WARMUP_RETRY_MAX_BACKOFF_SECONDS', 60.0))
+
+    for attempt in range(1, max_attempts + 1):
+        readiness.update(attempts=attempt)
+        success, message = warm_up_inference(app_config, logger=logger)
+        if success:
+            return True, message
+        if attempt < max_attempts:
+            logger.warning(f"Warm-up attempt {attempt} of {max_attempts} failed; retrying in {backoff:.0f} s.")
+            sleep(backoff)
+            backoff = min(backoff * 2, max_backoff)
+
+    readiness.update(ready=True, degraded=True, stage="degraded", finished_at=time.time())
+    msg = f"Warm-up failed {max_attempts} times; serving without it, models load on first use."
+    logger.error(msg)
+    return False, msg
+
+
+def start_warmup(app):
+    """Runs warm-up (with retries) in a background thread, or marks the app ready if warm-up is disabled."""
+    if not app.config.get('AI_WARMUP_ON_STARTUP', True) or app.config.get('TESTING', False):
+        readiness.update(ready=True, stage="skipped")
+        return None
+
+    warmup_thread = threading.Thread(
+        target=warm_up_with_retries,
+        args=(dict(app.config), app.logger),
+        name="inference-warmup",
+        daemon=True
+    )
+    warmup_thread.start()
+    return warmup_thread
+
+
+def make_dummy_batch(batch_size, image_size):
+    return np.zeros((batch_size, image_size[0], image_size[1], 3), dtype=np.float32)
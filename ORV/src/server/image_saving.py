@@ -1,5 +1,11 @@
 import os
+import uuid
+import shutil
+import hashlib
 from werkzeug.utils import secure_filename
+from werkzeug.http import parse_options_header
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.sansio.multipart import MultipartDecoder, Field, File, Data, Epilogue, NeedData
 from flask import current_app
 
 # --- Helper Function: File Extension Validation ---
@@ -8,114 +14,449 @@ def _allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in current_app.config['ALLOWED_EXTENSIONS']
 
-# --- Helper Function: Individual File Saving ---
-def _save_individual_files(files, user_id, user_upload_folder):
-    """Saves a list of uploaded files to the specified user folder,
-    validating file types and generating secure filenames."""
-    saved_files_info = []
-    errors = []
-    for file_index, file_storage in enumerate(files):
-        if file_storage and file_storage.filename: 
-            if _allowed_file(file_storage.filename):
-                original_extension = os.path.splitext(file_storage.filename)[1]
-                filename = secure_filename(f"frame_{file_index}{original_extension}")
-                
-                try:
-                    file_path = os.path.join(user_upload_folder, filename)
-                    file_storage.save(file_path) 
-                    saved_files_info.append({"filename": filename, "path": file_path, "original_filename": file_storage.filename})
-                except Exception as e:
-                    errors.append({"original_filename": file_storage.filename, "error": str(e)})
+def _allowed_video(filename):
+    """Checks if the file extension is an allowed video container (VIDEO_ALLOWED_EXTENSIONS)."""
+    return '.' in filename and \
+           filename.rsplit('.', 1)[1].lower() in current_app.config.get('VIDEO_ALLOWED_EXTENSIONS', set())
+
+# --- Helper Function: Upload Result ---
+def _upload_failure(status_code, error, rejected_files=None):
+    response_payload = {"error": error}
+    if rejected_files:
+        response_payload["rejected_files"] = rejected_files
+    return {
+        "status_code": status_code,
+        "response_payload": response_payload,
+        "upload_successful": False
+    }
+
+# --- Helper Class: Part Being Received ---
+class _UploadPart:
+    __slots__ = ("kind", "name", "value", "original_filename", "filename", "original_name", "folder",
+                 "part_path", "handle", "sha256", "size", "max_bytes")
+
+    def __init__(self, kind, name=None):
+        self.kind = kind
+        self.name = name
+        self.value = bytearray()
+        self.handle = None
+        self.size = 0
+
+# --- Helper Class: Streaming Upload Writer ---
+class _UploadWriter:
+    """Writes the parts of one upload request to disk as they stream in.
+
+    Each 'images' part is written in chunks to <folder>/frame_{i}<ext>.part while it is
+    hashed, and renamed into place once complete, so only one chunk is held in memory.
+    Parts that arrive before the userId field go to a per-request staging folder and
+    are moved (renamed, not copied) into the user's folder at the end.
+
+    With AI_FACE_CROP_ENABLED or INGEST_NORMALIZE_ENABLED each completed part is
+    instead handed to the ingest thread pool, which decodes it once and stores the
+    face crop or a downscaled JPEG while the next parts are still streaming in.
+    Frames that cannot be decoded or contain no face are reported as errors.
+
+    A 'video' part is streamed to a temporary file the same way and stored as-is in the
+    user's videos/ subfolder; the user's training job samples it into frames, so the
+    request never decodes video."""
+
+    def __init__(self, base_upload_folder, max_file_bytes, max_field_bytes, app_config):
+        self.base_upload_folder = base_upload_folder
+        self.max_file_bytes = max_file_bytes
+        self.max_video_bytes = int(app_config.get('UPLOAD_MAX_VIDEO_BYTES', 128 * 1024 * 1024))
+        self.max_field_bytes = max_field_bytes
+        self.app_config = app_config
+        self.process_frames = bool(app_config.get('AI_FACE_CROP_ENABLED', False) or
+                                   app_config.get('INGEST_NORMALIZE_ENABLED', False))
+        self.keep_originals = self.process_frames and app_config.get('INGEST_KEEP_ORIGINALS', False)
+        self.fields = {}
+        self.user_id = None
+        self.user_upload_folder = None
+        self.staging_folder = None
+        self.saved_files_info = []
+        self.saved_videos = []
+        self.errors = []
+        self.images_parts = 0
+        self.video_parts = 0
+        self.selected_files = 0
+        self._part = None
+        self._ingesting = []
+        self._thumbnails = []
+        # Every file this request has put in place, so a failed request can take them back out.
+        self._written_paths = []
+
+    # --- Part Lifecycle ---
+    def start_field(self, name):
+        self._part = _UploadPart("field", name)
+
+    def start_file(self, name, filename):
+        if name == 'video':
+            self._start_video(filename)
+            return
+        if name != 'images':
+            self._part = _UploadPart("skip")
+            return
+        file_index = self.images_parts
+        self.images_parts += 1
+        if not filename:
+            self._part = _UploadPart("skip")
+            return
+        self.selected_files += 1
+        if not _allowed_file(filename):
+            self.errors.append({"filename": filename, "error": "File type not allowed"})
+            self._part = _UploadPart("skip")
+            return
+
+        original_extension = os.path.splitext(filename)[1]
+        part = _UploadPart("file", name)
+        part.original_filename = filename
+        part.filename = secure_filename(f"frame_{file_index}{'.jpg' if self.process_frames else original_extension}")
+        part.original_name = secure_filename(f"frame_{file_index}{original_extension}")
+        part.folder = self.user_upload_folder or self._staging()
+        part.part_path = os.path.join(part.folder, part.filename + '.part')
+        part.handle = open(part.part_path, 'wb')
+        part.sha256 = hashlib.sha256()
+        part.max_bytes = self.max_file_bytes
+        self._part = part
+
+    def _start_video(self, filename):
+        video_index = self.video_parts
+        self.video_parts += 1
+        if not filename:
+            self._part = _UploadPart("skip")
+            return
+        self.selected_files += 1
+        if not _allowed_video(filename):
+            self.errors.append({"filename": filename, "error": "Video type not allowed"})
+            self._part = _UploadPart("skip")
+            return
+
+        part = _UploadPart("video", 'video')
+        part.original_filename = filename
+        part.original_name = secure_filename(f"video{video_index}{os.path.splitext(filename)[1]}")
+        part.folder = self.user_upload_folder or self._staging()
+        part.part_path = os.path.join(part.folder, part.original_name + '.part')
+        part.handle = open(part.part_path, 'wb')
+        part.sha256 = hashlib.sha256()
+        part.max_bytes = self.max_video_bytes
+        self._part = part
+
+    def write(self, data):
+        part = self._part
+        if part.kind == "field":
+            if len(part.value) + len(data) > self.max_field_bytes:
+                raise RequestEntityTooLarge()
+            part.value.extend(data)
+        elif part.kind in ("file", "video"):
+            if part.size + len(data) > part.max_bytes:
+                self._close_part(remove=True)
+                self.errors.append({"original_filename": part.original_filename,
+                                    "error": f"File exceeds the {part.max_bytes} byte limit"})
+                part.kind = "skip"
+                return
+            part.handle.write(data)
+            part.sha256.update(data)
+            part.size += len(data)
+
+    def finish_part(self):
+        part, self._part = self._part, None
+        if part.kind == "field":
+            self.fields[part.name] = part.value.decode('utf-8', 'replace')
+            if part.name == 'userId' and self.user_upload_folder is None and self.fields[part.name]:
+                self.user_id = self.fields[part.name]
+                self.user_upload_folder = self._user_folder(self.user_id)
+        elif part.kind == "video":
+            part.handle.close()
+            self._store_video(part)
+        elif part.kind == "file":
+            part.handle.close()
+            file_info = {
+                "filename": part.filename,
+                "path": os.path.join(part.folder, part.filename),
+                "original_filename": part.original_filename,
+                "sha256": part.sha256.hexdigest(),
+                "size_bytes": part.size,
+            }
+            if not self.process_frames:
+                os.replace(part.part_path, file_info["path"])
+                self._written_paths.append(file_info["path"])
+                self.saved_files_info.append(file_info)
+                self._thumbnails.append(None)
+                return
+            if self.keep_originals:
+                file_info["original_path"] = os.path.join(self._originals_folder(), part.original_name)
+                self._written_paths.append(file_info["original_path"])
+            self._written_paths.append(file_info["path"])
+            # Imported here so the web tier does not load OpenCV until the first upload.
+            from src.ai.frame_ingest import get_ingest_pool, ingest_frame
+            future = get_ingest_pool(self.app_config).submit(
+                ingest_frame, part.part_path, file_info["path"], self.app_config, file_info.get("original_path"))
+            self._ingesting.append((file_info, future))
+
+    def _store_video(self, part):
+        """Moves a completed video part into the videos/ subfolder, where the user's training job samples it."""
+        # Imported here so the web tier does not load OpenCV until the first upload.
+        from src.ai.video_sampling import PENDING_VIDEO_DIRNAME
+
+        video_sha256 = part.sha256.hexdigest()
+        stem, extension = os.path.splitext(part.original_name)
+        # The content hash keeps a clip from overwriting one of an earlier upload that is still waiting.
+        filename = f"{stem}_{video_sha256[:12]}{extension}"
+        video_folder = os.path.join(part.folder, PENDING_VIDEO_DIRNAME)
+        os.makedirs(video_folder, exist_ok=True)
+        video_info = {
+            "filename": filename,
+            "path": os.path.join(video_folder, filename),
+            "original_filename": part.original_filename,
+            "sha256": video_sha256,
+            "size_bytes": part.size,
+        }
+        os.replace(part.part_path, video_info["path"])
+        self._written_paths.append(video_info["path"])
+        self.saved_videos.append(video_info)
+
+    def wait_for_ingest(self):
+        """Collects the ingest pool results, in upload order."""
+        ingesting, self._ingesting = self._ingesting, []
+        for file_info, future in ingesting:
+            try:
+                thumbnail, ingest_error = future.result()
+            except Exception as e:
+                thumbnail, ingest_error = None, str(e)
+            if ingest_error:
+                self.errors.append({"original_filename": file_info["original_filename"], "error": ingest_error})
             else:
-                errors.append({"filename": file_storage.filename, "error": "File type not allowed"})
-        elif file_storage and not file_storage.filename:
-            pass
-    return saved_files_info, errors
+                self._thumbnails.append(thumbnail)
+                self.saved_files_info.append(file_info)
+
+    def drop_near_duplicates(self, max_distance, max_frames):
+        """Deletes frames whose dHash is close to an already kept frame, keeping at most max_frames,
+        together with their kept originals. Frames stored as received have no hash and are always kept.
+        Returns the number of frames dropped."""
+        hashed = [index for index, thumbnail in enumerate(self._thumbnails) if thumbnail is not None]
+        if not hashed:
+            return 0
+        from src.ai.frame_dedup import select_diverse_frames
+        selected = select_diverse_frames([self._thumbnails[i] for i in hashed], max_distance, max_frames)
+        dropped = set(hashed) - {hashed[i] for i in selected}
+        for index in dropped:
+            info = self.saved_files_info[index]
+            for path in (info["path"], info.get("original_path")):
+                if path and os.path.exists(path):
+                    os.remove(path)
+        self.saved_files_info = [info for index, info in enumerate(self.saved_files_info) if index not in dropped]
+        self._thumbnails = [thumbnail for index, thumbnail in enumerate(self._thumbnails) if index not in dropped]
+        return len(dropped)
+
+    # --- Folders ---
+    def _staging(self):
+        if self.staging_folder is None:
+            self.staging_folder = os.path.join(self.base_upload_folder, '.incoming', uuid.uuid4().hex)
+            os.makedirs(self.staging_folder)
+        return self.staging_folder
+
+    def _user_folder(self, user_id):
+        user_upload_folder = os.path.join(self.base_upload_folder, secure_filename(str(user_id)))
+        os.makedirs(user_upload_folder, exist_ok=True)
+        return user_upload_folder
+
+    def _originals_folder(self):
+        """Cold storage for received files (INGEST_KEEP_ORIGINALS); staged until the userId is known."""
+        if self.user_id is None:
+            return os.path.join(self._staging(), 'originals')
+        originals_folder = os.path.abspath(self.app_config.get('INGEST_ORIGINALS_FOLDER', 'uploads_originals'))
+        return os.path.join(originals_folder, secure_filename(str(self.user_id)))
+
+    def finalize(self):
+        """Moves frames, videos and originals that were staged before the userId arrived into the user's folders."""
+        if self.staging_folder is None:
+            return
+        for info in self.saved_files_info:
+            if os.path.dirname(info["path"]) == self.staging_folder:
+                final_path = os.path.join(self.user_upload_folder, info["filename"])
+                os.replace(info["path"], final_path)
+                self._written_paths.append(final_path)
+                info["path"] = final_path
+        for info in self.saved_videos:
+            if os.path.dirname(os.path.dirname(info["path"])) == self.staging_folder:
+                video_folder = os.path.join(self.user_upload_folder, os.path.basename(os.path.dirname(info["path"])))
+                os.makedirs(video_folder, exist_ok=True)
+                final_path = os.path.join(video_folder, info["filename"])
+                os.replace(info["path"], final_path)
+                self._written_paths.append(final_path)
+                info["path"] = final_path
+
+        staged_originals = os.path.join(self.staging_folder, 'originals')
+        if os.path.isdir(staged_originals):
+            originals_folder = self._originals_folder()
+            os.makedirs(originals_folder, exist_ok=True)
+            for name in os.listdir(staged_originals):
+                shutil.move(os.path.join(staged_originals, name), os.path.join(originals_folder, name))
+                self._written_paths.append(os.path.join(originals_folder, name))
+            for info in self.saved_files_info:
+                if info.get("original_path", "").startswith(staged_originals):
+                    info["original_path"] = os.path.join(originals_folder, os.path.basename(info["original_path"]))
+        shutil.rmtree(self.staging_folder, ignore_errors=True)
+
+    def discard(self):
+        """Removes a partially written part and every frame and original this request stored,
+        so a failed upload leaves nothing behind for the next training run."""
+        if self._part is not None and self._part.kind in ("file", "video"):
+            self._close_part(remove=True)
+        for _, future in self._ingesting:
+            future.exception()
+        self._ingesting = []
+        for path in self._written_paths:
+            if os.path.exists(path):
+                os.remove(path)
+        self._written_paths = []
+        if self.staging_folder is not None:
+            shutil.rmtree(self.staging_folder, ignore_errors=True)
+
+    def _close_part(self, remove):
+        self._part.handle.close()
+        if remove and os.path.exists(self._part.part_path):
+            os.remove(self._part.part_path)
+
+# --- Helper Function: Multipart Streaming ---
+def _stream_multipart(input_stream, boundary, writer, chunk_size, max_parts):
+    """Feeds the request body through Werkzeug's incremental multipart decoder, chunk by chunk."""
+    decoder = MultipartDecoder(boundary.encode('latin-1'), max_parts=max_parts)
+    while True:
+        chunk = input_stream.read(chunk_size)
+        decoder.receive_data(chunk or None)
+        event = decoder.next_event()
+        while not isinstance(event, (Epilogue, NeedData)):
+            if isinstance(event, Field):
+                writer.start_field(event.name)
+            elif isinstance(event, File):
+                writer.start_file(event.name, event.filename)
+            elif isinstance(event, Data):
+                writer.write(event.data)
+                if not event.more_data:
+                    writer.finish_part()
+            event = decoder.next_event()
+        if isinstance(event, Epilogue):
+            return
+        if not chunk:
+            raise ValueError("Multipart body ended before its closing boundary")
 
 # --- Main Function: Image Upload Handling ---
-def handle_image_upload(request_form, request_files):
+def handle_image_upload(request):
     """
-    Processes image upload request: validates input, creates directories, saves files.
+    Processes image upload request: streams the multipart body straight to the user's
+    upload folder, enforcing per-file (UPLOAD_MAX_FILE_BYTES) and per-request
+    (MAX_CONTENT_LENGTH) size limits while reading.
     Returns a structured dictionary with status and payload.
     """
-    # --- Input Validation: User ID and Files ---
-    user_id = request_form.get('userId')
-    if not user_id:
-        return {
-            "status_code": 400,
-            "response_payload": {"error": "No userId part in the request"},
-            "upload_successful": False
-        }
+    config = current_app.config
 
-    if 'images' not in request_files:
-        return {
-            "status_code": 400,
-            "response_payload": {"error": "No images part in the request"},
-            "upload_successful": False
-        }
+    # --- Input Validation: Content Type ---
+    mimetype, options = parse_options_header(request.content_type or '')
+    boundary = options.get('boundary')
+    if mimetype != 'multipart/form-data' or not boundary:
+        return _upload_failure(400, "Expected a multipart/form-data request")
+
+    # --- Directory Setup: Base Upload Folder ---
+    base_upload_folder_abs = os.path.abspath(config['BASE_UPLOAD_FOLDER'])
 
-    files = request_files.getlist('images') 
-    if not files or all(f.filename == '' for f in files): 
-        return {
-            "status_code": 400,
-            "response_payload": {"error": "No selected files"},
-            "upload_successful": False
-        }
-    
-    # --- Directory Setup: Base and User-Specific Upload Folders ---
-    base_upload_folder_abs = os.path.abspath(current_app.config['BASE_UPLOAD_FOLDER'])
-    
     if not os.path.exists(base_upload_folder_abs):
         try:
             os.makedirs(base_upload_folder_abs)
         except OSError as e:
             current_app.logger.error(f"Could not create base upload directory {base_upload_folder_abs}: {e}")
-            return {
-                "status_code": 500,
-                "response_payload": {"error": "Server error: Could not create base upload directory"},
-                "upload_successful": False
-            }
+            return _upload_failure(500, "Server error: Could not create base upload directory")
 
-    user_upload_folder_abs = os.path.join(base_upload_folder_abs, secure_filename(str(user_id)))
-    if not os.path.exists(user_upload_folder_abs):
-        try:
-            os.makedirs(user_upload_folder_abs)
-        except OSError as e:
-            current_app.logger.error(f"Could not create directory for user {user_id} at {user_upload_folder_abs}: {e}")
-            return {
-                "status_code": 500,
-                "response_payload": {"error": f"Server error: Could not create directory for user {user_id}"},
-                "upload_successful": False
-            }
-    
-    # --- File Saving Logic ---
-    saved_files_info, errors = _save_individual_files(files, user_id, user_upload_folder_abs)
+    # --- Streaming the Body to Disk ---
+    writer = _UploadWriter(
+        base_upload_folder_abs,
+        max_file_bytes=int(config.get('UPLOAD_MAX_FILE_BYTES', 16 * 1024 * 1024)),
+        max_field_bytes=int(config.get('MAX_FORM_MEMORY_SIZE') or 500_000),
+        app_config=config
+    )
+    try:
+        _stream_multipart(
+            request.stream, boundary, writer,
+            chunk_size=int(config.get('UPLOAD_CHUNK_BYTES', 64 * 1024)),
+            max_parts=config.get('MAX_FORM_PARTS', 1000)
+        )
+        writer.wait_for_ingest()
+    except RequestEntityTooLarge:
+        writer.discard()
+        current_app.logger.warning("Image upload rejected: request body exceeds the configured size limit.")
+        return _upload_failure(413, f"Request body exceeds the {config.get('MAX_CONTENT_LENGTH')} byte limit")
+    except ValueError as e:
+        writer.discard()
+        return _upload_failure(400, f"Malformed multipart body: {e}")
+    except OSError as e:
+        writer.discard()
+        current_app.logger.error(f"Could not write uploaded images to {base_upload_folder_abs}: {e}")
+        return _upload_failure(500, "Server error: Could not save uploaded images")
+
+    # --- Input Validation: User ID and Files ---
+    user_id = writer.fields.get('userId')
+    if not user_id:
+        writer.discard()
+        return _upload_failure(400, "No userId part in the request")
+    if writer.images_parts == 0 and writer.video_parts == 0:
+        writer.discard()
+        return _upload_failure(400, "No images or video part in the request")
+    if writer.selected_files == 0:
+        writer.discard()
+        return _upload_failure(400, "No selected files")
+
+    # --- Near-duplicate Removal ---
+    duplicates_dropped = 0
+    try:
+        if config.get('INGEST_DEDUP_ENABLED', False):
+            duplicates_dropped = writer.drop_near_duplicates(
+                int(config.get('INGEST_DEDUP_MAX_DISTANCE', 5)), config.get('INGEST_DEDUP_MAX_FRAMES'))
+            if duplicates_dropped:
+                current_app.logger.info(
+                    f"Dropped {duplicates_dropped} near-duplicate frames from the upload for user {user_id}.")
+        writer.finalize()
+    except OSError as e:
+        writer.discard()
+        current_app.logger.error(f"Could not move staged images for user {user_id}: {e}")
+        return _upload_failure(500, f"Server error: Could not save images for user {user_id}")
+
+    saved_files_info, saved_videos, errors = writer.saved_files_info, writer.saved_videos, writer.errors
+    user_upload_folder_abs = writer.user_upload_folder
 
     # --- Response Preparation ---
-    upload_successful_flag = len(saved_files_info) > 0 
+    # Stored videos count as a success; their frames are sampled by the user's training job.
+    upload_successful_flag = len(saved_files_info) > 0 or len(saved_videos) > 0
 
     if upload_successful_flag:
-        if errors: 
+        if errors:
             current_app.logger.warning(
                 f"Image upload for user {user_id} had partial success: "
-                f"{len(saved_files_info)} saved, {len(errors)} errors. Details: {errors}"
+                f"{len(saved_files_info)} frames and {len(saved_videos)} videos saved, "
+                f"{len(errors)} errors. Details: {errors}"
             )
-        
+
+        response_payload = {"message": f"Images uploaded successfully for user {user_id}.",
+                            "frames_saved": len(saved_files_info),
+                            "videos_queued": len(saved_videos),
+                            "duplicates_dropped": duplicates_dropped}
+        if errors:
+            response_payload["rejected_files"] = errors
         return {
             "status_code": 200,
-            "response_payload": {"message": f"Images uploaded successfully for user {user_id}."},
+            "response_payload": response_payload,
             "upload_successful": True,
             "user_id": user_id,
-            "user_image_folder_path": user_upload_folder_abs 
+            "user_image_folder_path": user_upload_folder_abs,
+            "saved_files": saved_files_info
         }
-    else: 
+    else:
         current_app.logger.error(
             f"Image upload failed for user {user_id}. No files were saved. Errors: {errors}"
         )
         return {
-            "status_code": 400, 
-            "response_payload": {"error": "Image upload failed. No files were successfully saved."},
+            "status_code": 400,
+            "response_payload": {"error": "Image upload failed. No files were successfully saved.", "rejected_files": errors},
             "upload_successful": False,
             "user_id": user_id,
             "user_image_folder_path": None
-        }
\ No newline at end of file
+        }
@@ -1,12 +1,17 @@
-from flask import request, jsonify, Blueprint, current_app
+from flask import request, jsonify, Blueprint, current_app, g, Response, url_for
+from werkzeug.utils import secure_filename
 from .image_saving import handle_image_upload 
 import sys
 import os
+import time
 import logging
 
 # --- AI Module Imports ---
-from src.ai.training_pipeline import start_user_training_pipeline
-from src.ai.verification_manager import verify_user_with_image
+# Modules that pull in TensorFlow, Keras or OpenCV are imported inside the routes
+# that need them, so app start-up, tests and non-AI routes never pay for them.
+from src.ai.warmup import readiness
+from src.ai import model_cache, inference_executor, training_jobs
+from src.ai.metrics import registry, HTTP_REQUEST_SECONDS, HTTP_REQUESTS, VERIFY_STAGE_SECONDS, UPLOAD_STAGE_SECONDS
 
 module_logger = logging.getLogger(__name__) 
 
@@ -19,6 +24,33 @@ if PROJECT_ROOT not in sys.path:
 # --- Blueprint Definition ---
 api_bp = Blueprint('api', __name__)
 
+# --- Helper Function: Verification Backend Selection ---
+def _verification_module(app_config):
+    """Returns pooled_verification when the out-of-process inference pool is enabled, else verification_manager."""
+    if int(app_config.get('AI_INFERENCE_POOL_PROCESSES', 0)) > 0:
+        from src.ai import pooled_verification
+        return pooled_verification
+    from src.ai import verification_manager
+    return verification_manager
+
+# --- Request Timing for /metrics ---
+@api_bp.before_request
+def _start_request_timer():
+    g.request_started_at = time.perf_counter()
+
+@api_bp.after_request
+def _record_request_metrics(response):
+    endpoint = request.endpoint or "unknown"
+    HTTP_REQUEST_SECONDS.labels(endpoint).observe(time.perf_counter() - g.request_started_at)
+    HTTP_REQUESTS.labels(endpoint, str(response.status_code)).inc()
+    return response
+
+# --- Route: /metrics (GET) ---
+@api_bp.route('/metrics', methods=['GET'])
+def metrics_route():
+    """Per-stage latency histograms and counters in the Prometheus text format."""
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
 # --- Route: /api/data (GET) ---
 @api_bp.route('/api/data', methods=['GET'])
 def get_data():
@@ -27,12 +59,45 @@ def get_data():
     return jsonify(sample_data) 
 
 
+# --- Route: /ready (GET) ---
+@api_bp.route('/ready', methods=['GET'])
+def ready_route():
+    """Readiness probe: 200 once startup warm-up has finished, 503 before that."""
+    state = readiness.snapshot()
+    return jsonify(state), 200 if state["ready"] else 503
+
+# --- Route: /health (GET) ---
+@api_bp.route('/health', methods=['GET'])
+def health_route():
+    """Liveness probe with model cache occupancy, inference executor counters and training queue depth."""
+    cache = model_cache.get_model_cache(current_app.config)
+    payload = {
+        "status": "ok",
+        "readiness": readiness.snapshot(),
+        "model_cache": cache.stats(),
+        "training_queue": training_jobs.get_job_queue(current_app.config).stats(),
+    }
+    executor_stats = inference_executor.get_executor_stats()
+    if executor_stats is not None:
+        payload["inference_executor"] = executor_stats
+    if int(current_app.config.get('AI_INFERENCE_POOL_PROCESSES', 0)) > 0:
+        from src.ai.inference_pool import get_pool_stats
+        pool_stats = get_pool_stats()
+        if pool_stats is not None:
+            payload["inference_pool"] = pool_stats
+    return jsonify(payload), 200
+
+
 # --- Route: /user/updateImages (POST) ---
 @api_bp.route('/user/updateImages', methods=['POST'])
 def update_images_route():
-    """Handles image uploads for a user and triggers AI training."""
+    """Handles image uploads for a user and queues data preparation and AI training (202 with a job id)."""
+    from src.ai.training_pipeline import start_user_training_pipeline
+
     # --- Image Upload Processing ---
-    upload_result = handle_image_upload(request.form, request.files)
+    save_started_at = time.perf_counter()
+    upload_result = handle_image_upload(request)
+    UPLOAD_STAGE_SECONDS.labels("save").observe(time.perf_counter() - save_started_at)
 
     response_payload = upload_result["response_payload"]
     status_code = upload_result["status_code"]
@@ -44,24 +109,39 @@ def update_images_route():
         
         current_app.logger.info(f"Images saved for user {user_id} at {user_uploaded_images_dir}. Attempting to trigger training pipeline.")
         
-        training_initiated, training_message = start_user_training_pipeline(
+        training_initiated, training_message, job_id = start_user_training_pipeline(
             user_id, 
             user_uploaded_images_dir
         )
         
         response_payload["training_initiation_status"] = training_message
-        if not training_initiated:
+        if training_initiated:
+            # Data preparation and training continue in the background; the client polls the job.
+            response_payload["job_id"] = job_id
+            response_payload["job_status_url"] = url_for('api.job_status_route', job_id=job_id)
+            status_code = 202
+        else:
             current_app.logger.error(f"Failed to initiate training pipeline for user {user_id}: {training_message}")
     
     # --- Response Generation ---
     return jsonify(response_payload), status_code 
 
+# --- Route: /user/jobs/<job_id> (GET) ---
+@api_bp.route('/user/jobs/<job_id>', methods=['GET'])
+def job_status_route(job_id):
+    """Reports the state, queue position, stage, progress and per-stage timings of a training job."""
+    job = training_jobs.get_job_queue(current_app.config).snapshot(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job id"}), 404
+    return jsonify(job), 200
+
 # --- Route: /user/verify (POST) ---
 @api_bp.route('/user/verify', methods=['POST'])
 def verify_image_route():
     """Handles image-based user verification using AI."""
     logger = current_app.logger
     app_config = current_app.config
+    verify_user_with_image = _verification_module(app_config).verify_user_with_image
 
     # --- Input Validation ---
     if 'userId' not in request.form:
@@ -83,6 +163,7 @@ def verify_image_route():
     # --- Image Processing and AI Verification ---
     try:
         image_bytes = image_file.read() 
+        VERIFY_STAGE_SECONDS.labels("parse").observe(time.perf_counter() - g.request_started_at)
         if not image_bytes:
             logger.warning(f"Verification attempt for user {user_id} failed: Image file is empty.")
             return jsonify({"error": "Image file is empty"}), 400
@@ -106,4 +187,132 @@ def verify_image_route():
 
     except Exception as e:
         logger.error(f"Error during verification process for user {user_id}: {e}", exc_info=True)
-        return jsonify({"error": "Server error during verification process."}), 500
\ No newline at end of file
+        return jsonify({"error": "Server error during verification process."}), 500
+
+# --- Route: /user/verifyFrames (POST) ---
+@api_bp.route('/user/verifyFrames', methods=['POST'])
+def verify_frames_route():
+    """Handles verification of one attempt from several frames with an aggregated decision."""
+    logger = current_app.logger
+    app_config = current_app.config
+    verify_user_with_images = _verification_module(app_config).verify_user_with_images
+
+    # --- Input Validation ---
+    if 'userId' not in request.form:
+        logger.warning("Multi-frame verification failed: 'userId' missing from form data.")
+        return jsonify({"error": "userId is required"}), 400
+
+    user_id = request.form['userId']
+
+    image_files = [f for f in request.files.getlist('images') if f.filename != '']
+    if not image_files:
+        logger.warning(f"Multi-frame verification for user {user_id} failed: no 'images' file parts.")
+        return jsonify({"error": "At least one image file is required"}), 400
+
+    max_frames = int(app_config.get('AI_MULTI_FRAME_MAX_FRAMES', 10))
+    if len(image_files) > max_frames:
+        return jsonify({"error": f"At most {max_frames} frames are allowed"}), 400
+
+    # --- Image Processing and AI Verification ---
+    try:
+        images_bytes = [f.read() for f in image_files]
+        VERIFY_STAGE_SECONDS.labels("parse").observe(time.perf_counter() - g.request_started_at)
+        if not all(images_bytes):
+            logger.warning(f"Multi-frame verification for user {user_id} failed: an image file is empty.")
+            return jsonify({"error": "Image file is empty"}), 400
+
+        logger.info(f"Received {len(images_bytes)} frames for verification for user_id: {user_id}.")
+
+        is_match, aggregate_score, frame_scores, message = verify_user_with_images(
+            user_id=user_id,
+            images_bytes=images_bytes,
+            app_config=dict(app_config),
+            aggregation=request.form.get('aggregation'),
+            logger=logger
+        )
+
+        # --- Response Generation ---
+        return jsonify({
+            "user_id": user_id,
+            "is_match": is_match,
+            "probability": aggregate_score,
+            "frame_probabilities": frame_scores,
+            "message": message
+        }), 200
+
+    except Exception as e:
+        logger.error(f"Error during multi-frame verification for user {user_id}: {e}", exc_info=True)
+        return jsonify({"error": "Server error during verification process."}), 500
+
+# --- Route: /user/identify (POST) ---
+@api_bp.route('/user/identify', methods=['POST'])
+def identify_image_route():
+    """Handles 1:N identification: returns the enrolled users most similar to the image."""
+    from src.ai.verification_manager import identify_user_with_image
+
+    logger = current_app.logger
+    app_config = current_app.config
+
+    # --- Input Validation ---
+    if 'image' not in request.files:
+        logger.warning("Identification attempt failed: 'image' file part missing.")
+        return jsonify({"error": "Image file is required"}), 400
+
+    image_file = request.files['image']
+
+    if image_file.filename == '':
+        logger.warning("Identification attempt failed: No image selected.")
+        return jsonify({"error": "No selected image file"}), 400
+
+    try:
+        top_k = int(request.form.get('topK', app_config.get('AI_IDENTIFY_TOP_K', 5)))
+    except ValueError:
+        return jsonify({"error": "topK must be an integer"}), 400
+    if top_k < 1:
+        return jsonify({"error": "topK must be at least 1"}), 400
+
+    # --- Image Processing and AI Identification ---
+    try:
+        image_bytes = image_file.read()
+        if not image_bytes:
+            logger.warning("Identification attempt failed: Image file is empty.")
+            return jsonify({"error": "Image file is empty"}), 400
+
+        candidates, message = identify_user_with_image(
+            image_bytes=image_bytes,
+            app_config=dict(app_config),
+            top_k=top_k,
+            logger=logger
+        )
+
+        # --- Response Generation ---
+        return jsonify({
+            "candidates": candidates,
+            "message": message
+        }), 200
+
+    except Exception as e:
+        logger.error(f"Error during identification process: {e}", exc_info=True)
+        return jsonify({"error": "Server error during identification process."}), 500
+
+# --- Route: /user/deleteEnrollment (POST) ---
+@api_bp.route('/user/deleteEnrollment', methods=['POST'])
+def delete_enrollment_route():
+    """Removes a user's enrolled template and their identification index entry."""
+    if not request.form.get('userId'):
+        return jsonify({"error": "userId is required"}), 400
+    # Sanitized like the upload folder name, so the id cannot reach outside MODELS_DIR.
+    user_id = secure_filename(request.form['userId'])
+    if not user_id:
+        return jsonify({"error": "userId is not a valid user id"}), 400
+
+    from src.ai.enrollment_manager import remove_user_template
+    try:
+        removed, message = remove_user_template(user_id, dict(current_app.config), logger=current_app.logger)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"Error removing enrollment for user {user_id}: {e}", exc_info=True)
+        return jsonify({"error": "Server error while removing enrollment."}), 500
+
+    return jsonify({"user_id": user_id, "message": message}), 200 if removed else 404
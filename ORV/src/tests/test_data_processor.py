@@ -0,0 +1,61 @@
+import os
+import cv2 as cv
+import numpy as np
+
+from src.ai.data_processor import score_frame_quality, select_quality_frames, split_user_images_for_training
+
+QUALITY_CONFIG = {"AI_FACE_CROP_ENABLED": True, "AI_QUALITY_FILTER_ENABLED": True, "AI_QUALITY_MIN_FRAMES": 2}
+
+
+def _textured(seed, size=224):
+    rng = np.random.default_rng(seed)
+    return cv.resize(rng.integers(40, 215, (size // 8, size // 8, 3), dtype=np.uint8), (size, size),
+                     interpolation=cv.INTER_NEAREST)
+
+
+def _write_frames(directory, frames):
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for name, frame in frames.items():
+        paths.append(os.path.join(directory, name))
+        cv.imwrite(paths[-1], frame)
+    return paths
+
+
+def test_blur_lowers_sharpness_and_exposure_is_measured():
+    sharp = cv.cvtColor(_textured(0, 128), cv.COLOR_BGR2GRAY)
+    blurred = cv.GaussianBlur(sharp, (15, 15), 5)
+    dark = (sharp // 8).astype(np.uint8)
+    blown_out = np.where(sharp > 80, 255, sharp).astype(np.uint8)
+    scores = score_frame_quality(np.stack([sharp, blurred, dark, blown_out]))
+    assert scores["sharpness"][0] > 10 * scores["sharpness"][1]
+    assert scores["brightness"][2] < 40 < scores["brightness"][0]
+    assert scores["clipped"][0] == 0.0 and scores["clipped"][3] > 0.5
+
+
+def test_low_quality_frames_are_dropped_but_a_minimum_is_kept(tmp_path):
+    paths = _write_frames(str(tmp_path), {
+        "good_0.png": _textured(0),
+        "good_1.png": _textured(1),
+        "blurry.png": cv.GaussianBlur(_textured(2), (31, 31), 10),
+        "dark.png": (_textured(3) // 10).astype(np.uint8),
+    })
+    kept, dropped = select_quality_frames(paths, QUALITY_CONFIG)
+    assert sorted(os.path.basename(p) for p in kept) == ["good_0.png", "good_1.png"]
+    assert dropped == {paths[2]: "blurry", paths[3]: "too dark"}
+
+    kept, _ = select_quality_frames(paths, dict(QUALITY_CONFIG, AI_QUALITY_MIN_FRAMES=3))
+    assert len(kept) == 3
+
+
+def test_split_leaves_out_low_quality_frames(tmp_path):
+    source_dir = str(tmp_path / "uploads")
+    _write_frames(source_dir, {f"good_{i}.png": _textured(i) for i in range(4)})
+    _write_frames(source_dir, {"blurry.png": cv.GaussianBlur(_textured(9), (31, 31), 10)})
+    ok, message, _ = split_user_images_for_training(
+        "u1", source_dir, str(tmp_path / "data"), 0.5, 0.25, app_config=QUALITY_CONFIG)
+    assert ok, message
+    split_files = [f for split in ("train", "validation", "test")
+                   for f in os.listdir(tmp_path / "data" / split / "u1")]
+    assert sorted(split_files) == [f"good_{i}.png" for i in range(4)]
+    assert "1 low-quality left out" in message
@@ -0,0 +1,132 @@
+import os
+import multiprocessing
+import numpy as np
+import pytest
+from src.ai import embedding_index
+from src.ai.embedding_index import EmbeddingIndex, get_embedding_index, update_embedding_index
+
+def _random_embeddings(count, dim=16, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def test_search_returns_nearest_users_in_order():
+    vectors = _random_embeddings(50)
+    index = EmbeddingIndex(dim=16)
+    for i, vector in enumerate(vectors):
+        index.add(f"user{i}", vector)
+    results = index.search(vectors[7], top_k=3)
+    assert results[0][0] == "user7"
+    assert abs(results[0][1] - 1.0) < 1e-5
+    assert results[0][1] >= results[1][1] >= results[2][1]
+
+def test_remove_keeps_remaining_users_searchable():
+    vectors = _random_embeddings(5)
+    index = EmbeddingIndex(dim=16)
+    for i, vector in enumerate(vectors):
+        index.add(f"user{i}", vector)
+    assert index.remove("user1")
+    assert not index.remove("user1")
+    assert "user1" not in index and len(index) == 4
+    assert index.search(vectors[4], top_k=1)[0][0] == "user4"
+
+def test_save_and_memory_mapped_load(tmp_path):
+    vectors = _random_embeddings(10)
+    index = EmbeddingIndex(dim=16, dtype=np.float16)
+    for i, vector in enumerate(vectors):
+        index.add(f"user{i}", vector)
+    index.save(str(tmp_path))
+
+    loaded = EmbeddingIndex.load(str(tmp_path))
+    assert loaded.user_ids == index.user_ids
+    assert loaded.search(vectors[3], top_k=1)[0][0] == "user3"
+    loaded.add("new_user", vectors[0])
+    assert len(loaded) == 11
+
+def test_quantizer_is_saved_with_the_rest_of_the_index(tmp_path):
+    vectors = _random_embeddings(40, seed=2)
+    index = EmbeddingIndex(dim=16, num_lists=4)
+    for i, vector in enumerate(vectors):
+        index.add(f"user{i}", vector)
+    index.save(str(tmp_path))
+    assert sorted(os.listdir(tmp_path)) == ["assignments.npy", "centroids.npy", "embeddings.npy", "user_ids.json"]
+    loaded = EmbeddingIndex.load(str(tmp_path), num_lists=4)
+    assert np.array_equal(loaded._centroids, index._centroids)
+
+    index.num_lists = 0
+    index.train_quantizer()
+    index.save(str(tmp_path))
+    assert sorted(os.listdir(tmp_path)) == ["assignments.npy", "embeddings.npy", "user_ids.json"]
+
+def test_ivf_mode_finds_exact_match():
+    vectors = _random_embeddings(200, seed=1)
+    index = EmbeddingIndex(dim=16, num_lists=8, num_probe=2)
+    for i, vector in enumerate(vectors):
+        index.add(f"user{i}", vector)
+    assert index.train_quantizer()
+    for i in (0, 57, 199):
+        assert index.search(vectors[i], top_k=1)[0][0] == f"user{i}"
+
+def test_search_probes_further_lists_when_the_closest_were_emptied():
+    vectors = _random_embeddings(40, seed=3)
+    index = EmbeddingIndex(dim=16, num_lists=4, num_probe=1)
+    for i, vector in enumerate(vectors):
+        index.add(f"user{i}", vector)
+    assert index.train_quantizer()
+    nearest_list = int(np.argmax(index._centroids @ vectors[0]))
+    for user_id in [u for u in index.user_ids if index._assignments[index._row_of[u]] == nearest_list]:
+        index.remove(user_id)
+    results = index.search(vectors[0], top_k=3)
+    assert len(results) == 3
+    assert results == sorted(results, key=lambda result: -result[1])
+
+def test_quantizer_is_retrained_when_lists_become_uneven():
+    vectors = _random_embeddings(40, seed=4)
+    index = EmbeddingIndex(dim=16, num_lists=4)
+    for i, vector in enumerate(vectors):
+        index.add(f"user{i}", vector)
+    centroids = index._centroids
+    for i, vector in enumerate(_random_embeddings(200, seed=5) * 0.05 + vectors[0]):
+        index.add(f"clone{i}", vector)
+    assert index._centroids is not centroids
+
+@pytest.fixture
+def shared_index(monkeypatch):
+    monkeypatch.setattr(embedding_index, "_shared_index", None)
+    monkeypatch.setattr(embedding_index, "_shared_index_version", None)
+
+def _add(user_id, vector):
+    def add(index):
+        index.add(user_id, vector)
+        return True
+    return add
+
+def _enroll_in_process(models_dir, user_ids):
+    """Runs in a spawned process, like a training job enrolling users."""
+    app_config = {"MODELS_DIR": models_dir}
+    for user_id, vector in zip(user_ids, _random_embeddings(len(user_ids), seed=len(user_ids))):
+        update_embedding_index(app_config, _add(user_id, vector), dim=16)
+
+def test_index_saved_by_another_process_is_reloaded(tmp_path, shared_index):
+    app_config = {"MODELS_DIR": str(tmp_path)}
+    vectors = _random_embeddings(2)
+    update_embedding_index(app_config, _add("alice", vectors[0]), dim=16)
+    assert get_embedding_index(app_config).user_ids == ["alice"]
+
+    other_process = EmbeddingIndex.load(str(tmp_path / "_index"))
+    other_process.add("bob", vectors[1])
+    other_process.save(str(tmp_path / "_index"))
+    assert get_embedding_index(app_config).search(vectors[1], top_k=1)[0][0] == "bob"
+
+def test_concurrent_updates_from_processes_are_all_kept(tmp_path, shared_index):
+    context = multiprocessing.get_context('spawn')
+    processes = [context.Process(target=_enroll_in_process, args=(str(tmp_path), [f"p{p}_user{i}" for i in range(5)]))
+                 for p in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    index = get_embedding_index({"MODELS_DIR": str(tmp_path)})
+    assert sorted(index.user_ids) == sorted(f"p{p}_user{i}" for p in range(4) for i in range(5))
+    assert update_embedding_index({"MODELS_DIR": str(tmp_path)}, lambda index: index.remove("p0_user0"))
+    assert len(get_embedding_index({"MODELS_DIR": str(tmp_path)})) == 19
@@ -0,0 +1,109 @@
+import os
+import cv2 as cv
+import numpy as np
+import pytest
+
+# Enrollment imports the VGGFace stack; only the backbone itself is replaced below.
+pytest.importorskip("tensorflow")
+pytest.importorskip("keras_vggface")
+
+from src.ai import enrollment_manager, verification_manager, embedding_index
+from src.ai.enrollment_manager import (compute_image_embeddings, enroll_user_template, get_template_path,
+                                       save_user_embedding, load_user_embedding, remove_user_template)
+
+COLORS = {"red": (0, 0, 255), "green": (0, 255, 0), "blue": (255, 0, 0)}
+
+
+class _StubBackbone:
+    """Stands in for the VGGFace backbone: the feature of an image is its mean color."""
+    feature_dim = 3
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def compute_features(self, img_batch):
+        self.batch_sizes.append(len(img_batch))
+        return img_batch.mean(axis=(1, 2)) + np.array([200.0, 210.0, 220.0])
+
+
+@pytest.fixture
+def backbone(monkeypatch):
+    stub = _StubBackbone()
+    monkeypatch.setattr(enrollment_manager, "get_shared_backbone", lambda app_config, logger=None: stub)
+    monkeypatch.setattr(verification_manager, "get_shared_backbone", lambda app_config, logger=None: stub)
+    monkeypatch.setattr(embedding_index, "_shared_index", None)
+    monkeypatch.setattr(embedding_index, "_shared_index_version", None)
+    return stub
+
+
+@pytest.fixture
+def app_config(tmp_path):
+    return {
+        "MODELS_DIR": str(tmp_path / "models"),
+        "AI_VERIFICATION_MODE": "template",
+        "AI_FACE_CROP_ENABLED": False,
+        "AI_INFERENCE_EXECUTOR_ENABLED": False,
+        "AI_EMBEDDING_BATCH_SIZE": 2,
+        "AI_TEMPLATE_SIMILARITY_THRESHOLD": 0.99,
+    }
+
+
+def _write_images(directory, color, count):
+    os.makedirs(directory, exist_ok=True)
+    for i in range(count):
+        cv.imwrite(os.path.join(directory, f"frame_{i}.png"), np.full((32, 32, 3), COLORS[color], dtype=np.uint8))
+    return str(directory)
+
+
+def test_embeddings_are_batched_and_normalized(backbone, app_config, tmp_path):
+    image_dir = _write_images(tmp_path / "images", "red", 3)
+    paths = sorted(os.path.join(image_dir, f) for f in os.listdir(image_dir)) + [str(tmp_path / "missing.png")]
+    embeddings = compute_image_embeddings(paths, app_config)
+    assert embeddings.shape == (3, 3)
+    np.testing.assert_allclose(np.linalg.norm(embeddings, axis=1), 1.0, rtol=1e-5)
+    assert backbone.batch_sizes == [2, 1]
+
+
+def test_template_round_trip(app_config):
+    template = np.array([0.6, 0.8, 0.0], dtype=np.float32)
+    template_path = get_template_path("alice", app_config)
+    save_user_embedding(template_path, template)
+    np.testing.assert_array_equal(load_user_embedding(template_path), template)
+    assert os.listdir(os.path.dirname(template_path)) == ["embedding.npy"]
+
+
+def test_enrolled_template_scores_the_user_and_rejects_others(backbone, app_config, tmp_path):
+    success, message = enroll_user_template("alice", _write_images(tmp_path / "alice", "red", 4), app_config)
+    assert success, message
+    assert "alice" in embedding_index.get_embedding_index(app_config)
+
+    frames = np.stack([np.full((32, 32, 3), COLORS[c], dtype=np.uint8) for c in ("red", "blue")])
+    scores, threshold, error = verification_manager.score_user_frames("alice", frames, app_config)
+    assert error is None
+    assert scores[0] >= threshold > scores[1]
+
+
+def test_enrollment_without_images_fails(backbone, app_config, tmp_path):
+    os.makedirs(tmp_path / "empty")
+    success, _ = enroll_user_template("bob", str(tmp_path / "empty"), app_config)
+    assert not success
+    assert not os.path.exists(get_template_path("bob", app_config))
+
+
+def test_removed_user_is_no_longer_enrolled(backbone, app_config, tmp_path):
+    enroll_user_template("carol", _write_images(tmp_path / "carol", "green", 2), app_config)
+    removed, _ = remove_user_template("carol", app_config)
+    assert removed
+    assert not os.path.exists(get_template_path("carol", app_config))
+    assert "carol" not in embedding_index.get_embedding_index(app_config)
+    scores, _, error = verification_manager.score_user_frames("carol", np.zeros((1, 32, 32, 3), np.uint8), app_config)
+    assert scores is None and "not found" in error
+
+
+def test_user_id_outside_models_dir_is_rejected(app_config, tmp_path):
+    outside = tmp_path / "outside" / "embedding.npy"
+    outside.parent.mkdir()
+    np.save(outside, np.ones(4, np.float32))
+    with pytest.raises(ValueError):
+        remove_user_template("../outside", app_config)
+    assert outside.exists()
@@ -0,0 +1,23 @@
+import cv2 as cv
+import numpy as np
+
+from src.ai.face_detection import crop_face, decode_face_crop
+
+
+def test_crop_face_is_square_padded_and_resized():
+    img = np.zeros((480, 640, 3), dtype=np.uint8)
+    img[200:300, 300:400] = 255
+    crop = crop_face(img, (300, 200, 100, 100), output_size=(224, 224), padding=0.5)
+    assert crop.shape == (224, 224, 3)
+    # The face occupies the middle half of the padded crop.
+    assert crop[112, 112].min() == 255
+    assert crop[10, 10].max() == 0
+
+
+def test_frame_without_face_is_rejected():
+    ok, encoded = cv.imencode('.jpg', np.full((480, 640, 3), 127, dtype=np.uint8))
+    assert ok
+    face_crop, error = decode_face_crop(encoded.tobytes(), {})
+    assert face_crop is None
+    assert error == "No face detected"
+    assert decode_face_crop(b"not an image", {}) == (None, "Could not decode image")
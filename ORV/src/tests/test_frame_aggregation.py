@@ -0,0 +1,21 @@
+import pytest
+from src.ai.frame_aggregation import aggregate_frame_scores, is_decision_settled
+
+def test_aggregation_methods():
+    scores = [0.9, 0.2, 0.8]
+    mean_score, mean_match = aggregate_frame_scores(scores, 0.5, 'mean')
+    assert mean_score == pytest.approx(19 / 30) and mean_match
+    assert aggregate_frame_scores(scores, 0.5, 'median')[0] == pytest.approx(0.8)
+    vote_score, vote_match = aggregate_frame_scores(scores, 0.5, 'vote')
+    assert vote_score == pytest.approx(2 / 3) and vote_match
+    assert not aggregate_frame_scores([0.9, 0.1], 0.5, 'vote')[1]
+
+def test_confident_mean_exits_early():
+    assert is_decision_settled([0.95, 0.97], total_frames=8, threshold=0.5, margin=0.2)
+    assert not is_decision_settled([0.6, 0.55], total_frames=8, threshold=0.5, margin=0.2)
+    assert not is_decision_settled([0.99], total_frames=8, threshold=0.5, min_frames=2)
+
+def test_vote_exits_once_majority_is_decided():
+    assert not is_decision_settled([0.9, 0.9], total_frames=5, threshold=0.5, method='vote')
+    assert is_decision_settled([0.9, 0.9, 0.9], total_frames=5, threshold=0.5, method='vote')
+    assert is_decision_settled([0.1, 0.2], total_frames=4, threshold=0.5, method='vote')
@@ -0,0 +1,28 @@
+import numpy as np
+
+from src.ai.frame_dedup import dhash_bits, hamming_distances, select_diverse_frames
+
+
+def _thumbnail(seed):
+    return np.random.default_rng(seed).integers(0, 255, (8, 9), dtype=np.uint8)
+
+
+def test_hamming_distances_between_dhashes():
+    base = _thumbnail(0)
+    flipped = base.copy()
+    flipped[0] = flipped[0, ::-1]
+    distances = hamming_distances(dhash_bits(np.stack([base, base, flipped])))
+    assert distances[0, 1] == 0
+    assert distances[0, 2] == distances[2, 0] > 0
+    assert (np.diag(distances) == 0).all()
+
+
+def test_near_duplicates_are_dropped_and_the_cap_keeps_diverse_frames():
+    base = _thumbnail(0)
+    nearly_same = np.clip(base.astype(int) + 1, 0, 255).astype(np.uint8)
+    thumbnails = [base, nearly_same, _thumbnail(1), base, _thumbnail(2), _thumbnail(3)]
+    assert select_diverse_frames(thumbnails, max_distance=5) == [0, 2, 4, 5]
+
+    capped = select_diverse_frames(thumbnails, max_distance=5, max_frames=2)
+    assert len(capped) == 2 and capped[0] == 0
+    assert select_diverse_frames([], max_distance=5) == []
@@ -0,0 +1,67 @@
+import numpy as np
+from src.ai.head_model import (extract_head_weights, evaluate_head, save_head_weights, load_head_weights,
+                               head_accuracy, promote_head)
+
+class _FakeLayer:
+    def __init__(self, weights, epsilon=None):
+        self._weights = weights
+        if epsilon is not None:
+            self.epsilon = epsilon
+
+    def get_weights(self):
+        return self._weights
+
+class _FakeClassifier:
+    """Exposes the fc1/bn1/classifier layers the way a Keras model does."""
+    def __init__(self, rng, feature_dim=8, hidden_dim=4):
+        self.fc1 = [rng.normal(size=(feature_dim, hidden_dim)), rng.normal(size=hidden_dim)]
+        self.bn1 = [rng.uniform(0.5, 1.5, hidden_dim), rng.normal(size=hidden_dim),
+                    rng.normal(size=hidden_dim), rng.uniform(0.5, 2.0, hidden_dim)]
+        self.clf = [rng.normal(size=(hidden_dim, 1)), rng.normal(size=1)]
+        self.layers = {"fc1": _FakeLayer(self.fc1), "bn1": _FakeLayer(self.bn1, epsilon=1e-3),
+                       "classifier": _FakeLayer(self.clf)}
+
+    def get_layer(self, name):
+        return self.layers[name]
+
+    def reference_predict(self, features):
+        hidden = features @ self.fc1[0] + self.fc1[1]
+        gamma, beta, mean, var = self.bn1
+        hidden = np.maximum(gamma * (hidden - mean) / np.sqrt(var + 1e-3) + beta, 0)
+        logits = hidden @ self.clf[0][:, 0] + self.clf[1][0]
+        return 1 / (1 + np.exp(-logits))
+
+def test_folded_head_matches_unfolded_layers():
+    rng = np.random.default_rng(0)
+    model = _FakeClassifier(rng)
+    features = rng.normal(size=(5, 8)).astype(np.float32)
+    probs = evaluate_head(extract_head_weights(model), features)
+    np.testing.assert_allclose(probs, model.reference_predict(features), rtol=1e-4, atol=1e-5)
+
+def test_head_round_trip(tmp_path):
+    rng = np.random.default_rng(1)
+    head = extract_head_weights(_FakeClassifier(rng))
+    head_path = str(tmp_path / "user" / "head_weights.npz")
+    save_head_weights(head, head_path)
+    loaded = load_head_weights(head_path)
+    assert set(loaded) == set(head)
+    for name in head:
+        np.testing.assert_array_equal(loaded[name], head[name])
+
+def test_retrained_head_replaces_the_live_head_only_if_it_scores_better(tmp_path):
+    rng = np.random.default_rng(2)
+    live_head = extract_head_weights(_FakeClassifier(rng))
+    head_path = str(tmp_path / "user" / "head_weights.npz")
+    save_head_weights(live_head, head_path)
+    features = rng.normal(size=(20, 8)).astype(np.float32)
+    labels = (evaluate_head(live_head, features) >= 0.5).astype(np.float32)
+    worse_head = dict(live_head, output_kernel=-live_head["output_kernel"], output_bias=-live_head["output_bias"])
+    assert head_accuracy(worse_head, features, labels) < 1.0
+
+    promoted, _ = promote_head(worse_head, head_path, features, labels)
+    assert not promoted
+    np.testing.assert_array_equal(load_head_weights(head_path)["output_kernel"], live_head["output_kernel"])
+
+    promoted, _ = promote_head(worse_head, head_path)
+    assert promoted
+    np.testing.assert_array_equal(load_head_weights(head_path)["output_kernel"], worse_head["output_kernel"])
@@ -0,0 +1,28 @@
+import cv2 as cv
+import numpy as np
+
+from src.ai.image_decoding import read_jpeg_size, choose_reduced_decode_flag, decode_image_for_size
+
+
+def _encode(width, height, ext='.jpg'):
+    img = np.full((height, width, 3), 127, dtype=np.uint8)
+    ok, encoded = cv.imencode(ext, img)
+    assert ok
+    return encoded.tobytes()
+
+
+def test_read_jpeg_size_parses_header_and_rejects_other_formats():
+    assert read_jpeg_size(_encode(1920, 1080)) == (1920, 1080)
+    assert read_jpeg_size(_encode(64, 48, '.png')) is None
+    assert read_jpeg_size(b"") is None
+
+
+def test_reduced_decode_keeps_at_least_target_size():
+    assert choose_reduced_decode_flag((4000, 3000), (224, 224))[0] == 8
+    assert choose_reduced_decode_flag((640, 480), (224, 224))[0] == 2
+    assert choose_reduced_decode_flag((300, 300), (224, 224))[0] == 1
+
+    img = decode_image_for_size(_encode(1920, 1080), (224, 224))
+    assert img.shape == (270, 480, 3)
+    assert decode_image_for_size(_encode(64, 48, '.png'), (224, 224)).shape == (48, 64, 3)
+    assert decode_image_for_size(b"not an image", (224, 224)) is None
@@ -0,0 +1,174 @@
+import io
+import os
+import hashlib
+import cv2 as cv
+import numpy as np
+import pytest
+from flask import request
+from werkzeug.test import EnvironBuilder
+
+from main import create_app
+from src.server.image_saving import handle_image_upload
+from src.ai.video_sampling import pending_videos, ingest_pending_videos
+
+
+@pytest.fixture
+def app(tmp_path):
+    return create_app({
+        "TESTING": True,
+        "BASE_UPLOAD_FOLDER": str(tmp_path / "uploads"),
+        "AI_FACE_CROP_ENABLED": False,
+        "INGEST_NORMALIZE_ENABLED": False,
+        "INGEST_ORIGINALS_FOLDER": str(tmp_path / "originals"),
+        "UPLOAD_MAX_FILE_BYTES": 1000,
+        "MAX_CONTENT_LENGTH": 10_000,
+        "UPLOAD_CHUNK_BYTES": 64,
+    })
+
+
+def _upload(app, **request_kwargs):
+    with app.test_request_context('/user/updateImages', method='POST', **request_kwargs):
+        return handle_image_upload(request)
+
+
+def test_frames_are_streamed_to_the_user_folder_and_hashed(app):
+    frames = [os.urandom(700), os.urandom(300)]
+    result = _upload(app, data={
+        "userId": "alice",
+        "images": [(io.BytesIO(frame), f"f{i}.jpg") for i, frame in enumerate(frames)],
+    })
+    assert result["status_code"] == 200
+    assert sorted(os.listdir(result["user_image_folder_path"])) == ["frame_0.jpg", "frame_1.jpg"]
+    for info, frame in zip(result["saved_files"], frames):
+        with open(info["path"], 'rb') as f:
+            assert f.read() == frame
+        assert info["sha256"] == hashlib.sha256(frame).hexdigest()
+
+
+def test_oversized_file_is_rejected_and_the_rest_kept(app):
+    result = _upload(app, data={
+        "userId": "bob",
+        "images": [(io.BytesIO(os.urandom(1500)), "big.jpg"), (io.BytesIO(os.urandom(200)), "ok.jpg")],
+    })
+    assert result["status_code"] == 200
+    assert os.listdir(result["user_image_folder_path"]) == ["frame_1.jpg"]
+    assert "byte limit" in result["response_payload"]["rejected_files"][0]["error"]
+
+
+def test_request_over_content_length_is_refused_before_reading(app):
+    result = _upload(app, data={
+        "userId": "carol",
+        "images": [(io.BytesIO(os.urandom(900)), f"f{i}.jpg") for i in range(12)],
+    })
+    assert result["status_code"] == 413
+    assert not os.path.exists(os.path.join(app.config["BASE_UPLOAD_FOLDER"], "carol"))
+
+
+def test_frames_sent_before_user_id_are_moved_into_place(app):
+    frame = os.urandom(500)
+    body = (b'--b\r\nContent-Disposition: form-data; name="images"; filename="a.jpg"\r\n'
+            b'Content-Type: image/jpeg\r\n\r\n' + frame +
+            b'\r\n--b\r\nContent-Disposition: form-data; name="userId"\r\n\r\ndave\r\n--b--\r\n')
+    result = _upload(app, data=body, content_type='multipart/form-data; boundary=b')
+    assert result["status_code"] == 200
+    with open(os.path.join(app.config["BASE_UPLOAD_FOLDER"], "dave", "frame_0.jpg"), 'rb') as f:
+        assert f.read() == frame
+    assert os.listdir(os.path.join(app.config["BASE_UPLOAD_FOLDER"], ".incoming")) == []
+
+
+def test_frames_are_downscaled_at_ingest_and_originals_kept(app):
+    app.config.update(INGEST_NORMALIZE_ENABLED=True, INGEST_KEEP_ORIGINALS=True,
+                      UPLOAD_MAX_FILE_BYTES=10_000_000, MAX_CONTENT_LENGTH=20_000_000)
+    rng = np.random.default_rng(0)
+    ok, encoded = cv.imencode('.png', rng.integers(0, 255, (720, 1280, 3), dtype=np.uint8))
+    result = _upload(app, data={
+        "userId": "erin",
+        "images": [(io.BytesIO(encoded.tobytes()), "big.png"), (io.BytesIO(b"not an image"), "bad.jpg")],
+    })
+    assert result["status_code"] == 200
+    assert os.listdir(result["user_image_folder_path"]) == ["frame_0.jpg"]
+    assert cv.imread(result["saved_files"][0]["path"]).shape == (256, 455, 3)
+    assert os.listdir(os.path.join(app.config["INGEST_ORIGINALS_FOLDER"], "erin")) == ["frame_0.png"]
+    assert result["response_payload"]["rejected_files"][0]["error"] == "Could not decode image"
+
+
+def test_near_duplicate_frames_are_dropped_at_ingest(app):
+    app.config.update(INGEST_NORMALIZE_ENABLED=True, UPLOAD_MAX_FILE_BYTES=10_000_000, MAX_CONTENT_LENGTH=20_000_000)
+    rng = np.random.default_rng(1)
+    frames = [rng.integers(0, 255, (300, 400, 3), dtype=np.uint8) for _ in range(2)]
+    sequence = [frames[0], frames[0], frames[1], frames[0]]
+    result = _upload(app, data={
+        "userId": "frank",
+        "images": [(io.BytesIO(cv.imencode('.png', f)[1].tobytes()), f"f{i}.png") for i, f in enumerate(sequence)],
+    })
+    assert result["status_code"] == 200
+    assert result["response_payload"]["duplicates_dropped"] == 2
+    assert sorted(os.listdir(result["user_image_folder_path"])) == ["frame_0.jpg", "frame_2.jpg"]
+
+
+def test_originals_of_dropped_near_duplicates_are_removed(app):
+    app.config.update(INGEST_NORMALIZE_ENABLED=True, INGEST_KEEP_ORIGINALS=True,
+                      UPLOAD_MAX_FILE_BYTES=10_000_000, MAX_CONTENT_LENGTH=20_000_000)
+    frame = np.random.default_rng(1).integers(0, 255, (300, 400, 3), dtype=np.uint8)
+    result = _upload(app, data={
+        "userId": "frank",
+        "images": [(io.BytesIO(cv.imencode('.png', frame)[1].tobytes()), f"f{i}.png") for i in range(3)],
+    })
+    assert result["status_code"] == 200
+    assert result["response_payload"]["duplicates_dropped"] == 2
+    assert os.listdir(result["user_image_folder_path"]) == ["frame_0.jpg"]
+    assert os.listdir(os.path.join(app.config["INGEST_ORIGINALS_FOLDER"], "frank")) == ["frame_0.png"]
+
+
+def _write_video(path, frames=30):
+    writer = cv.VideoWriter(str(path), cv.VideoWriter_fourcc(*'MJPG'), 30.0, (640, 480))
+    rng = np.random.default_rng(2)
+    for _ in range(frames):
+        writer.write(rng.integers(0, 255, (480, 640, 3), dtype=np.uint8))
+    writer.release()
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def test_video_part_is_stored_for_the_training_job(app, tmp_path):
+    app.config.update(UPLOAD_MAX_FILE_BYTES=10_000_000, MAX_CONTENT_LENGTH=20_000_000)
+    video = _write_video(tmp_path / "clip.avi")
+    result = _upload(app, data={"userId": "gina", "video": (io.BytesIO(video), "clip.avi")})
+    assert result["status_code"] == 200
+    assert result["response_payload"]["frames_saved"] == 0
+    assert result["response_payload"]["videos_queued"] == 1
+    video_name = f"video0_{hashlib.sha256(video).hexdigest()[:12]}.avi"
+    assert pending_videos(result["user_image_folder_path"]) == \
+        [os.path.join(result["user_image_folder_path"], "videos", video_name)]
+
+
+def test_pending_videos_are_sampled_into_frames(app, tmp_path):
+    app.config.update(INGEST_NORMALIZE_ENABLED=True, INGEST_DEDUP_ENABLED=False, VIDEO_SAMPLING_MODE='rate')
+    user_folder = tmp_path / "uploads" / "gina"
+    (user_folder / "videos").mkdir(parents=True)
+    _write_video(user_folder / "videos" / "video0_abc.avi")
+    progress = []
+    ok, msg = ingest_pending_videos("gina", str(user_folder), app.config,
+                                    progress_callback=lambda done, total: progress.append((done, total)))
+    assert ok, msg
+    assert sorted(os.listdir(user_folder)) == sorted([f"video0_abc_frame_{n}.jpg" for n in range(0, 30, 6)] + ["videos"])
+    assert cv.imread(str(user_folder / "video0_abc_frame_0.jpg")).shape == (256, 341, 3)
+    assert pending_videos(str(user_folder)) == []
+    assert progress == [(1, 1)]
+
+
+def test_frames_of_a_chunked_request_over_the_limit_are_removed(app):
+    # Without Content-Length the limit can only trip mid-stream, after some frames are complete.
+    body = b'--b\r\nContent-Disposition: form-data; name="userId"\r\n\r\nhank\r\n'
+    for i in range(12):
+        body += (f'--b\r\nContent-Disposition: form-data; name="images"; filename="f{i}.jpg"\r\n'
+                 f'Content-Type: image/jpeg\r\n\r\n').encode() + os.urandom(900) + b'\r\n'
+    body += b'--b--\r\n'
+    environ = EnvironBuilder('/user/updateImages', method='POST', input_stream=io.BytesIO(body),
+                             content_type='multipart/form-data; boundary=b').get_environ()
+    del environ['CONTENT_LENGTH']
+    environ['wsgi.input_terminated'] = True
+    with app.request_context(environ):
+        result = handle_image_upload(request)
+    assert result["status_code"] == 413
+    assert os.listdir(os.path.join(app.config["BASE_UPLOAD_FOLDER"], "hank")) == []
@@ -0,0 +1,51 @@
+import threading
+import numpy as np
+import pytest
+from src.ai.inference_executor import InferenceExecutor
+
+@pytest.fixture
+def executor():
+    executor = InferenceExecutor(max_batch_size=8, max_wait_ms=50)
+    yield executor
+    executor.shutdown()
+
+def test_concurrent_requests_share_one_batch(executor):
+    batch_sizes = []
+    def predict_fn(batch):
+        batch_sizes.append(len(batch))
+        return batch.sum(axis=1)
+
+    results = {}
+    start = threading.Barrier(4)
+    def worker(i):
+        start.wait()
+        results[i] = executor.predict("model", predict_fn, np.full((1, 3), i, dtype=np.float32), timeout=5)
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sum(batch_sizes) == 4
+    assert len(batch_sizes) < 4
+    for i in range(4):
+        np.testing.assert_array_equal(results[i], [3 * i])
+
+def test_different_models_are_not_stacked(executor):
+    seen = []
+    def make_fn(name):
+        def predict_fn(batch):
+            seen.append((name, len(batch)))
+            return batch[:, 0]
+        return predict_fn
+    future_a = executor.submit("a", make_fn("a"), np.ones((2, 1)))
+    future_b = executor.submit("b", make_fn("b"), np.zeros((1, 1)))
+    np.testing.assert_array_equal(future_a.result(timeout=5), [1, 1])
+    np.testing.assert_array_equal(future_b.result(timeout=5), [0])
+    assert sorted(seen) == [("a", 2), ("b", 1)]
+
+def test_prediction_errors_reach_the_caller(executor):
+    def failing_fn(batch):
+        raise ValueError("model exploded")
+    with pytest.raises(ValueError, match="model exploded"):
+        executor.predict("model", failing_fn, np.ones((1, 1)), timeout=5)
@@ -0,0 +1,59 @@
+import os
+import numpy as np
+import pytest
+
+from src.ai.inference_pool import InferencePool
+
+FRAME_SHAPE = (8, 8, 3)
+
+
+def mean_intensity_scorer(user_id, frames, app_config):
+    """Scorer run inside the pool workers; exits the process for user 'crash'."""
+    if user_id == "crash":
+        os._exit(3)
+    if user_id == "fail":
+        raise ValueError("bad user")
+    return [float(frame.mean()) for frame in frames], os.getpid()
+
+
+@pytest.fixture
+def pool():
+    pool = InferencePool(
+        num_processes=2,
+        frame_shape=FRAME_SHAPE,
+        num_slots=8,
+        scorer_path='src.tests.test_inference_pool:mean_intensity_scorer',
+        app_config={"TESTING": True},
+    )
+    assert pool.wait_until_ready(timeout=30)
+    yield pool
+    pool.shutdown()
+
+
+def _frames(*values):
+    return np.stack([np.full(FRAME_SHAPE, v, dtype=np.uint8) for v in values])
+
+
+def test_frames_are_scored_in_worker_processes(pool):
+    scores, worker_pid = pool.score("alice", _frames(10, 200, 7), timeout=10)
+    assert scores == [10.0, 200.0, 7.0]
+    assert worker_pid != os.getpid()
+    assert pool.stats()["free_slots"] == 8
+
+    with pytest.raises(RuntimeError, match="bad user"):
+        pool.score("fail", _frames(1), timeout=10)
+    with pytest.raises(ValueError):
+        pool.score("alice", _frames(*range(9)), timeout=10)
+
+
+def test_crashed_worker_fails_its_request_and_is_restarted(pool):
+    with pytest.raises(RuntimeError, match="exited"):
+        pool.score("crash", _frames(1), timeout=10)
+    assert pool.wait_until_ready(timeout=30)
+
+    results = [pool.submit("bob", _frames(i), timeout=10) for i in range(6)]
+    assert [f.result(timeout=10)[0] for f in results] == [[float(i)] for i in range(6)]
+    stats = pool.stats()
+    assert stats["restarts"] == 1
+    assert stats["alive"] == 2
+    assert stats["free_slots"] == 8
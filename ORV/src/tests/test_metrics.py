@@ -0,0 +1,25 @@
+from src.ai.metrics import MetricsRegistry
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("stage_seconds", "Stage time.", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        histogram.labels("decode").observe(value)
+    lines = registry.render().splitlines()
+    assert 'stage_seconds_bucket{stage="decode",le="0.1"} 1' in lines
+    assert 'stage_seconds_bucket{stage="decode",le="1.0"} 3' in lines
+    assert 'stage_seconds_bucket{stage="decode",le="+Inf"} 4' in lines
+    assert 'stage_seconds_count{stage="decode"} 4' in lines
+    assert 'stage_seconds_sum{stage="decode"} 6.05' in lines
+
+
+def test_counter_children_are_reused_and_labels_escaped():
+    registry = MetricsRegistry()
+    counter = registry.counter("lookups_total", "Lookups.", ("result",))
+    assert counter.labels("hit") is counter.labels("hit")
+    counter.labels("hit").inc()
+    counter.labels('a"b').inc(2)
+    body = registry.render()
+    assert 'lookups_total{result="hit"} 1.0' in body
+    assert 'lookups_total{result="a\\"b"} 2.0' in body
@@ -0,0 +1,99 @@
+import os
+import threading
+import time
+import numpy as np
+import pytest
+from src.ai.model_cache import ModelCache
+
+def _write_model_file(path, size):
+    with open(path, 'wb') as f:
+        f.write(b'\0' * size)
+
+@pytest.fixture
+def load_calls():
+    return []
+
+@pytest.fixture
+def cache(load_calls):
+    """A cache whose 'models' are arrays the size of the file on disk."""
+    def loader(path):
+        load_calls.append(path)
+        return {"weights": np.zeros(os.path.getsize(path), dtype=np.uint8)}
+    return ModelCache(loader=loader, max_bytes=250)
+
+def test_repeated_get_hits_cache(cache, load_calls, tmp_path):
+    model_path = tmp_path / "model.keras"
+    _write_model_file(model_path, 100)
+    first = cache.get("alice", str(model_path))
+    second = cache.get("alice", str(model_path))
+    assert first is second
+    assert len(load_calls) == 1
+    assert cache.stats()["hits"] == 1
+
+def test_rewritten_file_is_reloaded(cache, load_calls, tmp_path):
+    model_path = tmp_path / "model.keras"
+    _write_model_file(model_path, 100)
+    first = cache.get("alice", str(model_path))
+    _write_model_file(model_path, 120)
+    second = cache.get("alice", str(model_path))
+    assert first is not second
+    assert len(load_calls) == 2
+    assert cache.stats()["current_bytes"] == 120
+
+def test_lru_eviction_under_budget(cache, tmp_path):
+    paths = {}
+    for user in ("a", "b", "c"):
+        paths[user] = tmp_path / f"{user}.keras"
+        _write_model_file(paths[user], 100)
+    cache.get("a", str(paths["a"]))
+    cache.get("b", str(paths["b"]))
+    cache.get("a", str(paths["a"]))
+    cache.get("c", str(paths["c"]))
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["evictions"] == 1
+    assert stats["current_bytes"] <= cache.max_bytes
+
+def test_concurrent_misses_load_once(tmp_path):
+    model_path = tmp_path / "model.keras"
+    _write_model_file(model_path, 10)
+    load_calls = []
+    def slow_loader(path):
+        load_calls.append(path)
+        time.sleep(0.05)
+        return {"weights": np.zeros(10, dtype=np.uint8)}
+    cache = ModelCache(loader=slow_loader, max_bytes=1000)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("alice", str(model_path)))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(load_calls) == 1
+    assert all(r is results[0] for r in results)
+
+def test_file_rewritten_during_load_is_reloaded_next_time(tmp_path):
+    model_path = tmp_path / "model.keras"
+    _write_model_file(model_path, 10)
+    load_calls = []
+    def rewriting_loader(path):
+        load_calls.append(path)
+        if len(load_calls) == 1:
+            # Training replaces the file while the old one is being read.
+            _write_model_file(path, 20)
+        return {"weights": np.zeros(10, dtype=np.uint8)}
+    cache = ModelCache(loader=rewriting_loader, max_bytes=1000)
+    first = cache.get("alice", str(model_path))
+    second = cache.get("alice", str(model_path))
+    assert first is not second
+    assert len(load_calls) == 2
+
+def test_failed_load_releases_its_loading_lock(tmp_path):
+    model_path = tmp_path / "model.keras"
+    _write_model_file(model_path, 10)
+    def failing_loader(path):
+        raise OSError("corrupt model")
+    cache = ModelCache(loader=failing_loader, max_bytes=1000)
+    with pytest.raises(OSError):
+        cache.get("alice", str(model_path))
+    assert cache._loading_locks == {}
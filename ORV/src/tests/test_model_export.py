@@ -0,0 +1,23 @@
+import numpy as np
+import pytest
+
+tf = pytest.importorskip("tensorflow")
+pytest.importorskip("keras_vggface")
+
+from src.ai.model_export import export_tflite_model, load_tflite_model
+
+
+def test_tflite_batches_run_in_one_invoke_and_match_per_image(tmp_path):
+    inputs = tf.keras.Input(shape=(4, 4, 3))
+    outputs = tf.keras.layers.Dense(2)(tf.keras.layers.Flatten()(inputs))
+    model = tf.keras.Model(inputs, outputs)
+    model_path = str(tmp_path / "model.tflite")
+    export_tflite_model(model, model_path, quantization='none')
+
+    tflite_model = load_tflite_model(model_path)
+    batch = np.random.default_rng(0).normal(size=(5, 4, 4, 3)).astype(np.float32)
+    batched = tflite_model.predict(batch)
+    assert batched.shape == (5, 2)
+    single = np.concatenate([tflite_model.predict(img[np.newaxis]) for img in batch])
+    np.testing.assert_allclose(batched, single, rtol=1e-5, atol=1e-5)
+    np.testing.assert_allclose(batched, model.predict(batch, verbose=0), rtol=1e-4, atol=1e-4)
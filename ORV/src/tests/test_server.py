@@ -1,12 +1,20 @@
+import os
+import sys
+import json
+import subprocess
 import pytest
 from main import create_app
 
+# Import and construction of the app must stay cheap; the AI stack loads on first use.
+CREATE_APP_BUDGET_SECONDS = 1.0
+HEAVY_MODULES = ("tensorflow", "keras", "keras_vggface", "cv2")
+
 @pytest.fixture
-def app():
+def app(tmp_path):
     """Create and configure a new app instance for each test."""
-    app = create_app()
-    app.config.update({
+    app = create_app({
         "TESTING": True,
+        "AI_JOB_DB_PATH": str(tmp_path / "jobs.sqlite3"),
     })
     yield app
 
@@ -22,4 +30,65 @@ def test_api_data_route(client):
     json_data = response.get_json()
     assert json_data is not None, "Response JSON should not be None"
     assert json_data.get("message") == "Hello from the server!"
-    assert "items" in json_data
\ No newline at end of file
+    assert "items" in json_data
+
+def test_ready_route_reports_ready_when_warmup_skipped(client):
+    """Test the /ready route; warm-up is skipped under TESTING."""
+    response = client.get('/ready')
+    assert response.status_code == 200
+    assert response.get_json()["ready"] is True
+
+def test_health_route_reports_cache_occupancy(client):
+    """Test the /health route."""
+    response = client.get('/health')
+    assert response.status_code == 200
+    json_data = response.get_json()
+    assert json_data["status"] == "ok"
+    assert "entries" in json_data["model_cache"]
+
+
+def test_create_app_does_not_import_ai_stack():
+    """main.create_app must not import TensorFlow/Keras/OpenCV and must start within budget."""
+    script = (
+        "import sys, time, json\n"
+        "start = time.perf_counter()\n"
+        "from main import create_app\n"
+        "create_app({'TESTING': True})\n"
+        "elapsed = time.perf_counter() - start\n"
+        f"heavy = [m for m in {HEAVY_MODULES!r} if m in sys.modules]\n"
+        "print(json.dumps({'elapsed': elapsed, 'heavy': heavy}))\n"
+    )
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+    result = subprocess.run(
+        [sys.executable, "-c", script], cwd=project_root, capture_output=True, text=True, check=True,
+        env={**os.environ, "PYTHONPATH": project_root}
+    )
+    measurement = json.loads(result.stdout.strip().splitlines()[-1])
+    assert measurement["heavy"] == []
+    assert measurement["elapsed"] < CREATE_APP_BUDGET_SECONDS
+
+def test_delete_enrollment_rejects_a_traversal_user_id(client):
+    """/user/deleteEnrollment refuses ids that sanitize to nothing instead of joining them into a path."""
+    response = client.post('/user/deleteEnrollment', data={"userId": "../.."})
+    assert response.status_code == 400
+    assert client.post('/user/deleteEnrollment', data={}).status_code == 400
+
+
+def test_tflite_backend_without_exported_models_falls_back_to_keras(tmp_path):
+    """Classifier mode cannot serve TFLite unless training exports it, so create_app uses Keras."""
+    app = create_app({"TESTING": True, "AI_JOB_DB_PATH": str(tmp_path / "jobs.sqlite3"),
+                      "AI_VERIFICATION_MODE": "classifier", "AI_INFERENCE_BACKEND": "tflite",
+                      "AI_EXPORT_TFLITE": False})
+    assert app.config["AI_INFERENCE_BACKEND"] == "keras"
+
+
+def test_metrics_route(client):
+    """/metrics renders request counters and histograms in the Prometheus text format."""
+    client.get('/api/data')
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    body = response.get_data(as_text=True)
+    assert '# TYPE orv_http_request_seconds histogram' in body
+    assert 'orv_http_requests_total{endpoint="api.get_data",status="200"}' in body
+    assert 'orv_http_request_seconds_bucket{endpoint="api.get_data",le="+Inf"}' in body
@@ -0,0 +1,20 @@
+import os
+from unittest import mock
+
+from src.ai.thread_limits import resolve_thread_limits, apply_thread_limits
+
+
+def test_unset_intra_op_threads_are_split_across_workers():
+    with mock.patch('os.cpu_count', return_value=8):
+        assert resolve_thread_limits({}, num_workers=4) == (2, 1)
+        assert resolve_thread_limits({}, num_workers=16) == (1, 1)
+    assert resolve_thread_limits({'AI_TF_INTRA_OP_THREADS': 3, 'AI_TF_INTER_OP_THREADS': 2}, 4) == (3, 2)
+
+
+def test_apply_sets_environment_and_tflite_threads():
+    app_config = {'AI_TF_INTRA_OP_THREADS': 2, 'AI_TFLITE_NUM_THREADS': None}
+    with mock.patch.dict(os.environ, {}):
+        assert apply_thread_limits(app_config, num_workers=2) == (2, 1)
+        assert os.environ['TF_NUM_INTRAOP_THREADS'] == '2'
+        assert os.environ['TF_NUM_INTEROP_THREADS'] == '1'
+    assert app_config['AI_TFLITE_NUM_THREADS'] == 2
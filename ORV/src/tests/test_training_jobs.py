@@ -0,0 +1,151 @@
+import time
+import threading
+import pytest
+
+from main import create_app
+from src.ai.metrics import registry
+from src.ai.training_jobs import JobQueue, JobReporter, TrainingWorkerPool, TRAINING_STAGES, get_job_queue
+
+
+@pytest.fixture
+def job_queue(tmp_path):
+    return JobQueue(str(tmp_path / "jobs.sqlite3"), max_attempts=2, retry_backoff_seconds=0.0, lease_seconds=60.0)
+
+
+def test_jobs_are_claimed_by_priority_then_fifo(job_queue):
+    first = job_queue.enqueue("alice", "/uploads/alice", TRAINING_STAGES)
+    second = job_queue.enqueue("bob", "/uploads/bob", TRAINING_STAGES)
+    urgent = job_queue.enqueue("carol", "/uploads/carol", TRAINING_STAGES, priority=10)
+    assert job_queue.snapshot(second)["queue_position"] == 2
+
+    assert [job_queue.claim()["job_id"] for _ in range(3)] == [urgent, first, second]
+    assert job_queue.claim() is None
+    assert job_queue.stats()["running"] == 3
+
+
+def test_waiting_job_for_the_same_images_is_reused(job_queue):
+    job_id = job_queue.enqueue("alice", "/uploads/alice", TRAINING_STAGES)
+    assert job_queue.enqueue("alice", "/uploads/alice", TRAINING_STAGES, priority=5) == job_id
+    assert job_queue.snapshot(job_id)["priority"] == 5
+    assert job_queue.stats()["queued"] == 1
+
+
+def test_running_jobs_are_capped_across_queue_handles(tmp_path):
+    # Two handles on one database stand in for two gunicorn workers.
+    first_process = JobQueue(str(tmp_path / "jobs.sqlite3"), max_running=1)
+    second_process = JobQueue(str(tmp_path / "jobs.sqlite3"), max_running=1)
+    first_process.enqueue("alice", "/uploads/alice", TRAINING_STAGES)
+    second_process.enqueue("bob", "/uploads/bob", TRAINING_STAGES)
+
+    running = first_process.claim()
+    assert second_process.claim() is None
+    first_process.complete(running["lease_id"], True, "trained")
+    assert second_process.claim()["user_id"] == "bob"
+
+
+def test_user_with_a_running_job_is_skipped(job_queue):
+    first = job_queue.enqueue("alice", "/uploads/alice", TRAINING_STAGES)
+    job_queue.claim()
+    second = job_queue.enqueue("alice", "/uploads/alice", TRAINING_STAGES)
+    other = job_queue.enqueue("bob", "/uploads/bob", TRAINING_STAGES)
+    assert second != first
+    assert job_queue.claim()["job_id"] == other
+    assert job_queue.claim() is None
+
+
+def test_stage_progress_and_completion_are_reported(job_queue):
+    job_id = job_queue.enqueue("alice", "/uploads/alice", TRAINING_STAGES)
+    reporter = JobReporter(job_queue, job_queue.claim()["lease_id"])
+    reporter.start_stage("split")
+    reporter.finish_stage("split", 0.5, message="split done")
+    reporter.start_stage("augment")
+    reporter.report_progress(1, 2)
+    job = job_queue.snapshot(job_id)
+    assert (job["state"], job["stage"], job["progress"]) == ("running", "augment", 0.625)
+    assert job["timings"]["split"] == 0.5
+
+    job_queue.complete(reporter._lease_id, True, "trained")
+    job = job_queue.snapshot(job_id)
+    assert (job["state"], job["stage"], job["progress"], job["message"]) == ("succeeded", "done", 1.0, "trained")
+
+
+def test_reporter_knows_when_its_lease_was_handed_on(tmp_path):
+    job_queue = JobQueue(str(tmp_path / "jobs.sqlite3"), lease_seconds=0.0)
+    job_queue.enqueue("alice", "/uploads/alice", TRAINING_STAGES)
+    reporter = JobReporter(job_queue, job_queue.claim()["lease_id"])
+    assert reporter.holds_lease()
+    time.sleep(0.01)
+    job_queue.claim()
+    assert not reporter.holds_lease()
+
+
+def test_training_phases_reported_by_a_job_are_observed(job_queue):
+    job_queue.enqueue("alice", "/uploads/alice", TRAINING_STAGES)
+    reporter = JobReporter(job_queue, job_queue.claim()["lease_id"])
+    reporter.record_phase("reported_phase", 1.5)
+    assert 'orv_training_phase_seconds_count{phase="reported_phase"} 1' in registry.render().splitlines()
+
+
+def test_crashed_job_is_retried_until_out_of_attempts(job_queue):
+    job_id = job_queue.enqueue("alice", "/uploads/alice", TRAINING_STAGES)
+    job_queue.fail_attempt(job_queue.claim()["lease_id"], "boom")
+    assert job_queue.snapshot(job_id)["state"] == "queued"
+
+    retry = job_queue.claim()
+    assert retry["attempts"] == 2
+    job_queue.fail_attempt(retry["lease_id"], "boom")
+    assert job_queue.snapshot(job_id)["state"] == "failed"
+
+
+def test_job_with_an_expired_lease_is_requeued_and_the_old_worker_ignored(tmp_path):
+    job_queue = JobQueue(str(tmp_path / "jobs.sqlite3"), lease_seconds=0.0)
+    job_id = job_queue.enqueue("alice", "/uploads/alice", TRAINING_STAGES)
+    stale = job_queue.claim()
+    time.sleep(0.01)
+    fresh = job_queue.claim()
+    assert fresh["job_id"] == job_id and fresh["attempts"] == 2
+
+    job_queue.complete(stale["lease_id"], False, "stale result")
+    assert job_queue.snapshot(job_id)["state"] == "running"
+
+
+def test_worker_pool_runs_queued_jobs_with_bounded_concurrency(job_queue):
+    active, peak, done = [0], [0], threading.Event()
+    lock = threading.Lock()
+
+    def runner(job, reporter):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+        if job["user_id"] == "crash":
+            raise RuntimeError("boom")
+        return True, "ok"
+
+    job_ids = [job_queue.enqueue(f"user{i}", f"/uploads/user{i}", TRAINING_STAGES) for i in range(4)]
+    crash_id = job_queue.enqueue("crash", "/uploads/crash", TRAINING_STAGES)
+    pool = TrainingWorkerPool(job_queue, runner, num_workers=2, poll_seconds=0.01)
+    pool.start()
+    try:
+        deadline = time.time() + 10
+        while time.time() < deadline and job_queue.snapshot(crash_id)["state"] != "failed":
+            time.sleep(0.02)
+    finally:
+        pool.shutdown(timeout=5)
+    assert all(job_queue.snapshot(job_id)["state"] == "succeeded" for job_id in job_ids)
+    assert job_queue.snapshot(crash_id)["attempts"] == 2
+    assert peak[0] == 2
+
+
+def test_job_status_route(tmp_path):
+    app = create_app({"TESTING": True, "AI_JOB_DB_PATH": str(tmp_path / "jobs.sqlite3")})
+    job_id = get_job_queue(app.config).enqueue("bob", "/uploads/bob", TRAINING_STAGES)
+    client = app.test_client()
+
+    response = client.get(f'/user/jobs/{job_id}')
+    assert response.status_code == 200
+    assert response.get_json()["user_id"] == "bob"
+    assert client.get('/user/jobs/unknown').status_code == 404
+    assert client.get('/health').get_json()["training_queue"]["queued"] == 1
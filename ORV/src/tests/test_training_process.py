@@ -0,0 +1,89 @@
+import os
+import time
+import logging
+import pytest
+
+from src.ai import training_process
+from src.ai.training_process import run_job_in_subprocess
+
+JOB = {"job_id": "job1", "user_id": "alice", "source_dir": "/uploads/alice", "stages": ("train",)}
+
+
+def reporting_runner(job, reporter, app_config, logger):
+    """Job runner executed in the training process."""
+    reporter.start_stage("train")
+    reporter.report_progress(1, 2)
+    reporter.record_phase("head", 0.125)
+    logger.info(f"training {job['user_id']} in {os.getpid()}")
+    reporter.finish_stage("train", 0.25, message="trained")
+    return True, f"done in {os.getpid()} with {os.environ['OMP_NUM_THREADS']} threads"
+
+
+def crashing_runner(job, reporter, app_config, logger):
+    os._exit(3)
+
+
+def allocating_runner(job, reporter, app_config, logger):
+    return True, len(bytearray(2 * 1024 * 1024 * 1024))
+
+
+def sleeping_runner(job, reporter, app_config, logger):
+    time.sleep(60)
+    return True, "slept"
+
+
+class RecordingReporter:
+    def __init__(self, holds_lease=True):
+        self.calls = []
+        self._holds_lease = holds_lease
+
+    def holds_lease(self):
+        return self._holds_lease
+
+    def __getattr__(self, name):
+        return lambda *args: self.calls.append((name,) + args)
+
+
+def _config(runner, **overrides):
+    return dict({"AI_JOB_RUNNER": f"src.tests.test_training_process:{runner}", "AI_JOB_TF_INTRA_OP_THREADS": 2},
+                **overrides)
+
+
+def test_job_runs_in_a_child_process_and_streams_reports_and_logs(caplog):
+    reporter = RecordingReporter()
+    logger = logging.getLogger("test_training_process")
+    with caplog.at_level(logging.INFO, logger="test_training_process"):
+        success, message = run_job_in_subprocess(JOB, reporter, _config("reporting_runner"), logger)
+    assert success
+    assert f"done in {os.getpid()}" not in message
+    assert message.endswith("with 2 threads")
+    assert reporter.calls == [("start_stage", "train"), ("report_progress", 1, 2), ("record_phase", "head", 0.125),
+                              ("finish_stage", "train", 0.25, "trained")]
+    assert any("training alice in" in record.getMessage() for record in caplog.records)
+
+
+def test_default_thread_share_counts_serving_workers_and_concurrent_jobs():
+    config = _config("reporting_runner", AI_JOB_TF_INTRA_OP_THREADS=None, SERVER_WORKERS=3, AI_JOB_WORKERS=1)
+    success, message = run_job_in_subprocess(JOB, RecordingReporter(), config)
+    assert message.endswith(f"with {max(1, (os.cpu_count() or 1) // 4)} threads")
+
+
+def test_crashed_process_raises():
+    with pytest.raises(RuntimeError, match="exited with code 3"):
+        run_job_in_subprocess(JOB, RecordingReporter(), _config("crashing_runner"))
+
+
+@pytest.mark.skipif(os.name != "posix", reason="memory caps use POSIX rlimits")
+def test_memory_limit_fails_the_job_without_a_retry():
+    success, message = run_job_in_subprocess(JOB, RecordingReporter(),
+                                             _config("allocating_runner", AI_JOB_MEMORY_LIMIT_MB=1024))
+    assert not success
+    assert "ran out of memory" in message
+
+
+def test_process_is_stopped_when_the_job_loses_its_lease(monkeypatch):
+    monkeypatch.setattr(training_process, "LEASE_CHECK_SECONDS", 0.1)
+    started_at = time.monotonic()
+    with pytest.raises(RuntimeError, match="lost its lease"):
+        run_job_in_subprocess(JOB, RecordingReporter(holds_lease=False), _config("sleeping_runner"))
+    assert time.monotonic() - started_at < 30
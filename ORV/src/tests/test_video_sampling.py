@@ -0,0 +1,41 @@
+import cv2 as cv
+import numpy as np
+import pytest
+
+from src.ai.video_sampling import sample_video_frames
+
+
+def _write_video(path, frames, fps=30.0):
+    height, width = frames[0].shape[:2]
+    writer = cv.VideoWriter(str(path), cv.VideoWriter_fourcc(*'MJPG'), fps, (width, height))
+    for frame in frames:
+        writer.write(frame)
+    writer.release()
+    return str(path)
+
+
+def _moving_frames(count):
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 255, (96, 128, 3), dtype=np.uint8) for _ in range(count)]
+
+
+def test_frames_are_sampled_at_the_configured_rate(tmp_path):
+    video = _write_video(tmp_path / "clip.avi", _moving_frames(60))
+    config = {"VIDEO_SAMPLING_MODE": "rate", "VIDEO_SAMPLE_FPS": 5.0}
+    assert [n for n, _ in sample_video_frames(video, config)] == list(range(0, 60, 6))
+
+
+def test_motion_mode_skips_a_static_scene_and_caps_the_count(tmp_path):
+    still = np.full((96, 128, 3), 120, dtype=np.uint8)
+    video = _write_video(tmp_path / "still.avi", [still] * 30 + _moving_frames(30))
+    config = {"VIDEO_SAMPLING_MODE": "motion", "VIDEO_SAMPLE_FPS": 30.0, "VIDEO_MAX_FRAMES": 20}
+    numbers = [n for n, _ in sample_video_frames(video, config)]
+    assert numbers[:2] == [0, 30]
+    assert len(numbers) == 20
+
+
+def test_unreadable_file_raises(tmp_path):
+    path = tmp_path / "clip.mp4"
+    path.write_bytes(b"not a video")
+    with pytest.raises(ValueError):
+        list(sample_video_frames(str(path), {}))
@@ -0,0 +1,43 @@
+import pytest
+
+from src.ai import warmup
+from src.ai.warmup import readiness, warm_up_with_retries
+
+
+@pytest.fixture(autouse=True)
+def reset_readiness():
+    readiness.update(ready=False, degraded=False, stage="not_started", error=None, attempts=0)
+    yield
+    readiness.update(ready=True, degraded=False, stage="skipped", error=None, attempts=0)
+
+
+def _flaky_warm_up(failures):
+    calls = []
+
+    def fake_warm_up(app_config, logger=None):
+        calls.append(1)
+        if len(calls) <= failures:
+            readiness.update(stage="failed", error="backbone not found")
+            return False, "Warm-up failed"
+        readiness.update(ready=True, stage="ready", error=None)
+        return True, "ok"
+    return fake_warm_up
+
+
+def test_failed_warm_up_is_retried_with_backoff(monkeypatch):
+    monkeypatch.setattr(warmup, "warm_up_inference", _flaky_warm_up(failures=2))
+    sleeps = []
+    success, _ = warm_up_with_retries({"AI_WARMUP_RETRY_BACKOFF_SECONDS": 1.0}, sleep=sleeps.append)
+    assert success
+    assert sleeps == [1.0, 2.0]
+    state = readiness.snapshot()
+    assert (state["ready"], state["degraded"], state["attempts"]) == (True, False, 3)
+
+
+def test_worker_becomes_ready_degraded_after_the_last_attempt(monkeypatch):
+    monkeypatch.setattr(warmup, "warm_up_inference", _flaky_warm_up(failures=10))
+    success, _ = warm_up_with_retries({"AI_WARMUP_MAX_ATTEMPTS": 3}, sleep=lambda seconds: None)
+    assert not success
+    state = readiness.snapshot()
+    assert (state["ready"], state["degraded"], state["stage"]) == (True, True, "degraded")
+    assert state["error"] == "backbone not found"
@@ -0,0 +1,9 @@
+"""
+WSGI entry point for the production server (see gunicorn.conf.py).
+
+The app is created without the inference warm-up: with preload_app it is
+imported once in the master process, and warm-up runs in each worker after fork.
+"""
+from main import create_app
+
+app = create_app(defer_warmup=True)